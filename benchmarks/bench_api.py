@@ -0,0 +1,112 @@
+import sys
+import os
+import io
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import contextlib
+from urllib.parse import quote
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import make_bootstrap_payload, make_fixtures_payload, make_predictions
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history
+from src.scoring import calculate_leaderboard_fast
+from src.schema import compact_frames
+from src.instrumentation import get_stage_metrics
+from src.api_server import build_api_index, serve
+
+# benchmarks/bench_api.py
+# Load test for src/api_server.py: a synthetic league is scored once, served on a
+# local port, and hammered by concurrent keep-alive clients asking for leaderboards,
+# user histories and team errors, first unconditionally (200) and then with the
+# ETag they were given (304). Also checks the leaderboard was never recomputed.
+#
+# python benchmarks/bench_api.py --users 1000 --clients 50 --requests 200
+
+def _start_server(index):
+    """Runs the API in a background thread's event loop; returns the bound port."""
+    ready = threading.Event()
+    port = {}
+
+    def on_started(bound_port):
+        port['value'] = bound_port
+        ready.set()
+
+    threading.Thread(target=lambda: asyncio.run(serve(index, port=0, on_started=on_started)), daemon=True).start()
+    ready.wait(30)
+    return port['value']
+
+async def _client(port, paths, n_requests, etags, conditional, statuses, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for _ in range(n_requests):
+            path = rng.choice(paths)
+            headers = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+            if conditional and path in etags:
+                headers += f"If-None-Match: {etags[path]}\r\n"
+            writer.write((headers + "\r\n").encode())
+            await writer.drain()
+
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+            status = int(head[0].split(' ')[1])
+            response_headers = dict(line.split(': ', 1) for line in head[1:] if ': ' in line)
+            await reader.readexactly(int(response_headers.get('Content-Length', 0)))
+            etags[path] = response_headers.get('ETag', etags.get(path))
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def _load(port, paths, n_clients, n_requests, etags, conditional):
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(port, paths, n_requests, etags, conditional, statuses, seed)
+        for seed in range(n_clients)
+    ])
+    elapsed = time.perf_counter() - start
+    total = n_clients * n_requests
+    return {'requests': total, 'seconds': round(elapsed, 3), 'requests_per_s': round(total / elapsed), 'statuses': statuses}
+
+def run(n_users=1_000, n_gw=19, n_clients=50, n_requests=200, seed=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_teams, df_fixtures = payloads_to_frames(make_bootstrap_payload(), make_fixtures_payload(n_gw, seed=seed))
+        df_league = get_league_history(df_fixtures, df_teams)
+        df_predictions = make_predictions(n_users, seed=seed)
+        df_league, df_leaderboard, df_merged = compact_frames(df_league, *calculate_leaderboard_fast(df_league, df_predictions))
+
+    index = build_api_index(df_leaderboard, df_merged, version='bench')
+    port = _start_server(index)
+    scoring_runs = get_stage_metrics().set_index('stage')['runs'].get('calculate_leaderboard_fast')
+
+    names = df_leaderboard['name'].astype(str).unique().tolist()
+    paths = ['/gameweeks', '/leaderboard', '/team-errors']
+    paths += [f"/leaderboard/{gw}" for gw in range(1, n_gw + 1)]
+    paths += [f"/team-errors/{gw}" for gw in range(1, n_gw + 1)]
+    paths += [f"/users/{quote(name)}/history" for name in names[:200]]
+
+    etags = {}
+    results = {
+        'users': n_users, 'gameweeks': n_gw, 'clients': n_clients,
+        'full': asyncio.run(_load(port, paths, n_clients, n_requests, etags, conditional=False)),
+        'conditional': asyncio.run(_load(port, paths, n_clients, n_requests, etags, conditional=True)),
+    }
+    results['responses_built'] = len(index['responses'])
+    results['leaderboard_recomputed'] = bool(get_stage_metrics().set_index('stage')['runs'].get('calculate_leaderboard_fast') != scoring_runs)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the JSON API on a synthetic league.")
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200, help="requests per client")
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, n_clients=args.clients, n_requests=args.requests), indent=2))
+
+if __name__ == '__main__':
+    main()
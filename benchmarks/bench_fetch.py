@@ -0,0 +1,60 @@
+import sys
+import os
+import json
+import time
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import make_bootstrap_payload, make_fixtures_payload
+from benchmarks.mock_fpl_server import MockFPLServer
+from src.api_cache import get_json
+from src.data_loader import fetch_endpoints, ENDPOINTS
+
+# benchmarks/bench_fetch.py
+# Measures the FPL fetch layer against the local mock server:
+# sequential vs concurrent fetch, recovery from transient errors, and serving
+# the cached copy while the API is down.
+# Run with: python benchmarks/bench_fetch.py
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def run(latency=0.3):
+    results = {}
+    payloads = {'bootstrap-static/': make_bootstrap_payload(), 'fixtures/': make_fixtures_payload(20)}
+
+    # 1. sequential vs concurrent, cold cache each time
+    with MockFPLServer(payloads, latency=latency) as server:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results['sequential_s'] = _timed(lambda: [
+                get_json(endpoint, base_url=server.base_url, ttl=0, cache_dir=cache_dir, replay_dir=None)
+                for endpoint in ENDPOINTS
+            ])
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results['concurrent_s'] = _timed(lambda: fetch_endpoints(
+                base_url=server.base_url, ttl=0, cache_dir=cache_dir, replay_dir=None))
+
+    # 2. first two requests fail with a 503, retries recover
+    with MockFPLServer(payloads, fail_first=2) as server:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results['retry_recovery_s'] = _timed(lambda: fetch_endpoints(
+                base_url=server.base_url, ttl=0, cache_dir=cache_dir, replay_dir=None))
+            results['retry_requests'] = len(server.requests)
+
+    # 3. warm cache, then the API goes down: the last good payload is served
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with MockFPLServer(payloads) as server:
+            fetch_endpoints(base_url=server.base_url, ttl=0, cache_dir=cache_dir, replay_dir=None)
+            base_url = server.base_url
+        start = time.perf_counter()
+        data = fetch_endpoints(base_url=base_url, ttl=0, cache_dir=cache_dir, replay_dir=None, retries=1)
+        results['api_down_fallback_s'] = time.perf_counter() - start
+        results['api_down_served_cached'] = len(data['fixtures/']) == len(payloads['fixtures/'])
+
+    return results
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,173 @@
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.generators import make_bootstrap_payload, make_fixtures_payload, make_predictions
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history, calculate_leaderboard
+from src.scoring import calculate_leaderboard_fast, score_predictions, get_merged_view
+from src.aggregates import build_crowd_aggregates, get_gameweek_errors
+
+# benchmarks/bench_pipeline.py
+# Times the hot paths of the pipeline and the UI helpers on synthetic seasons and
+# leagues of 7 up to 100k players, and writes the results as JSON so runs can be
+# compared between versions.
+#
+# python benchmarks/bench_pipeline.py --out bench_output.json
+# python benchmarks/bench_pipeline.py --quick            (small scales only)
+# python benchmarks/bench_pipeline.py --compare old.json (exit 1 if a stage got >25% slower)
+
+SEASONS = {'early': 5, 'mid': 19, 'full': 38} # finished gameweeks
+USER_SCALES = [7, 100, 1_000, 10_000, 100_000]
+QUICK_USER_SCALES = [7, 100, 1_000]
+# df_merged has gameweeks x teams x users rows (76M for a full season of 100k players), so
+# the stages that build it are capped; above the cap the deep dive reads one player's rows
+MAX_USERS = {'calculate_leaderboard': 10_000, 'calculate_leaderboard_fast': 10_000}
+
+def _time(fn, repeat):
+    """Best wall time over `repeat` runs (pipeline prints are swallowed)."""
+    best, result = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _optional_import(module):
+    """UI modules need plotly/streamlit; report them as skipped when those aren't installed."""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return __import__(module, fromlist=['_']), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _stage_record(stage, season, n_gw, n_users, seconds=None, rows=None, skipped=None):
+    return {'stage': stage, 'season': season, 'gameweeks': n_gw, 'users': n_users,
+            'seconds': seconds, 'rows': rows, 'skipped': skipped}
+
+def run(user_scales=USER_SCALES, seasons=SEASONS, repeat=3, seed=0):
+    plotting, plotting_error = _optional_import('src.plotting')
+    ui, ui_error = _optional_import('src.ui_components')
+    records = []
+
+    for season, n_gw in seasons.items():
+        df_teams, df_fixtures = payloads_to_frames(make_bootstrap_payload(), make_fixtures_payload(n_gw, seed=seed, n_postponed=2))
+        seconds, df_league = _time(lambda: get_league_history(df_fixtures, df_teams), repeat)
+        records.append(_stage_record('get_league_history', season, n_gw, None, seconds, len(df_league)))
+        last_gw = df_league['gameweek'].max()
+
+        for n_users in user_scales:
+            df_predictions = make_predictions(n_users, seed=seed)
+            # the big scales are slow enough that one run is representative
+            reps = repeat if n_users <= 1_000 else 1
+
+            with_merged = n_users <= MAX_USERS['calculate_leaderboard_fast']
+            if with_merged:
+                seconds, (df_leaderboard, df_merged) = _time(lambda: calculate_leaderboard_fast(df_league, df_predictions), reps)
+                records.append(_stage_record('calculate_leaderboard_fast', season, n_gw, n_users, seconds, len(df_leaderboard)))
+            else:
+                records.append(_stage_record('calculate_leaderboard_fast', season, n_gw, n_users, skipped='above MAX_USERS'))
+            seconds, (df_leaderboard, _) = _time(lambda: calculate_leaderboard_fast(df_league, df_predictions, return_merged=False), reps)
+            records.append(_stage_record('calculate_leaderboard_fast_no_merged', season, n_gw, n_users, seconds, len(df_leaderboard)))
+
+            if n_users <= MAX_USERS['calculate_leaderboard']:
+                seconds, _ = _time(lambda: calculate_leaderboard(df_league, df_predictions), reps)
+                records.append(_stage_record('calculate_leaderboard', season, n_gw, n_users, seconds, len(df_leaderboard)))
+            else:
+                records.append(_stage_record('calculate_leaderboard', season, n_gw, n_users, skipped='above MAX_USERS'))
+
+            df_current_lb = df_leaderboard[df_leaderboard['gameweek'] == last_gw]
+            user_name = df_current_lb.iloc[0]['name']
+            if with_merged:
+                df_user = df_merged[(df_merged['gameweek'] == last_gw) & (df_merged['name'] == user_name)]
+            else:
+                df_user = get_merged_view(score_predictions(df_league, df_predictions), df_predictions, [last_gw], [user_name])
+            # the meta analysis reads the crowd aggregates instead of df_merged
+            seconds, crowd = _time(lambda: build_crowd_aggregates(df_league, df_predictions), reps)
+            records.append(_stage_record('build_crowd_aggregates', season, n_gw, n_users, seconds, len(crowd['gameweeks'])))
+            team_errors = get_gameweek_errors(crowd, last_gw)
+            df_user = df_user[['position', 'team', 'predicted_position', 'predicted_difference', 'proximity_score',
+                               'perfect_match_score', 'boldness_score', 'total_score']]
+
+            ui_stages = {
+                'plot_leaderboard_bar': (plotting, plotting_error, lambda: plotting.plot_leaderboard_bar(df_current_lb, last_gw)),
+                'plot_crowd_error': (plotting, plotting_error, lambda: plotting.plot_crowd_error(team_errors)),
+                'plot_rank_history': (plotting, plotting_error, lambda: plotting.plot_rank_history(df_leaderboard, user_name, last_gw)),
+                # a Styler does its work when rendered, so time the HTML it produces
+                'style_leaderboard': (ui, ui_error, lambda: ui.style_leaderboard(
+                    df_current_lb[['rank', 'name', 'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score']]).to_html()),
+                'style_user_deep_dive': (ui, ui_error, lambda: ui.style_user_deep_dive(df_user).to_html()),
+                'style_user_deep_dive_alt': (ui, ui_error, lambda: ui.style_user_deep_dive_alt(df_user).to_html()),
+            }
+            for stage, (module, error, fn) in ui_stages.items():
+                if module is None:
+                    records.append(_stage_record(stage, season, n_gw, n_users, skipped=error))
+                    continue
+                seconds, _ = _time(fn, reps)
+                records.append(_stage_record(stage, season, n_gw, n_users, seconds))
+
+            print(f"{season} season, {n_users} users done")
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': records,
+    }
+
+def compare(report, baseline_path, threshold=0.25, min_delta=0.01):
+    """Stages that got more than `threshold` (and at least min_delta seconds) slower than a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    keys = ['stage', 'season', 'users']
+    df_new = pd.DataFrame(report['results']).dropna(subset=['seconds'])
+    df_old = pd.DataFrame(baseline['results']).dropna(subset=['seconds'])
+    for df in (df_new, df_old):
+        df['users'] = df['users'].fillna(0).astype(int)
+    df = pd.merge(df_old[keys + ['seconds']], df_new[keys + ['seconds']], on=keys, suffixes=('_old', '_new'))
+    df['change'] = df['seconds_new'] / df['seconds_old'] - 1
+    slower = (df['change'] > threshold) & (df['seconds_new'] - df['seconds_old'] > min_delta)
+    return df[slower].sort_values('change', ascending=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction pipeline on synthetic data.")
+    parser.add_argument('--out', default='bench_output.json', help="where to write the JSON results")
+    parser.add_argument('--quick', action='store_true', help="only the small user scales")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help="previous results file to check for regressions")
+    args = parser.parse_args()
+
+    report = run(QUICK_USER_SCALES if args.quick else USER_SCALES, repeat=args.repeat)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    df = pd.DataFrame(report['results'])
+    df['users'] = df['users'].fillna(0).astype(int) # 0 = stage doesn't depend on league size
+    print(df.pivot_table(index=['stage', 'season'], columns='users', values='seconds', dropna=False).round(4).to_string())
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        df_slower = compare(report, args.compare)
+        if len(df_slower):
+            print("Regressions (>25% slower):")
+            print(df_slower.round(4).to_string(index=False))
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+if __name__ == '__main__':
+    main()
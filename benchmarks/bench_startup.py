@@ -0,0 +1,129 @@
+import sys
+import os
+import ast
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import io
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import make_bootstrap_payload, make_fixtures_payload, make_predictions
+
+# benchmarks/bench_startup.py
+# Cold-start budget for the app. Every measurement runs in a fresh interpreter:
+# - import_s: importing the modules streamlit_app.py imports at the top, on top of streamlit
+# - first_render_s: a full first run of streamlit_app.py (AppTest) rendering from a snapshot
+# and checks that the heavy optional dependencies are not loaded before they are used.
+#
+# python benchmarks/bench_startup.py                 (exit 1 when over budget)
+# python benchmarks/bench_startup.py --import-budget 0.5 --render-budget 3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'streamlit_app.py')
+# only needed once a chart is drawn or the API is called
+LAZY_MODULES = ['plotly', 'requests', 'streamlit_echarts']
+IMPORT_BUDGET = 0.75 # seconds, on top of streamlit itself
+RENDER_BUDGET = 4.0 # seconds, interpreter start to first full render (1,000 players)
+
+IMPORT_SCRIPT = """
+import sys, time, json
+import streamlit
+before = set(sys.modules)
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+# only count what the app's own imports pulled in (some streamlit versions load plotly themselves)
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {lazy!r} if m in sys.modules and m not in before]}}))
+"""
+
+RENDER_SCRIPT = """
+import time, json
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+print(json.dumps({{'seconds': time.perf_counter() - start, 'exception': [str(e.value) for e in at.exception]}}))
+"""
+
+def get_startup_imports(app_path=APP_PATH):
+    """The module-level import statements of the app, as source lines (streamlit excluded)."""
+    with open(app_path) as f:
+        tree = ast.parse(f.read())
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module]
+            if not any(name.split('.')[0] == 'streamlit' for name in names):
+                lines.append(ast.unparse(node))
+    return lines
+
+def _run(script, cwd=ROOT):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, '-c', script], cwd=cwd, env=env, capture_output=True, text=True, timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def _write_app_dir(app_dir, n_users=1_000):
+    """A working folder with a fresh snapshot of a synthetic league, so the first render needs no network."""
+    from src.data_loader import payloads_to_frames
+    from src.data_transform import get_league_history
+    from src.scoring import calculate_leaderboard_fast
+    from src.schema import compact_frames
+    from src.snapshot_store import write_snapshot
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_teams, df_fixtures = payloads_to_frames(make_bootstrap_payload(), make_fixtures_payload(19))
+        df_league = get_league_history(df_fixtures, df_teams)
+        frames = compact_frames(df_league, *calculate_leaderboard_fast(df_league, make_predictions(n_users)))
+        write_snapshot(dict(zip(['df_league', 'df_leaderboard', 'df_merged'], frames)), 'bench',
+                       os.path.join(app_dir, 'data', 'snapshots'))
+    shutil.copytree(os.path.join(ROOT, 'assets'), os.path.join(app_dir, 'assets'))
+
+def run(repeat=3, n_users=1_000):
+    imports = get_startup_imports()
+    import_runs = [_run(IMPORT_SCRIPT.format(imports='\n'.join(imports), lazy=LAZY_MODULES)) for _ in range(repeat)]
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        _write_app_dir(app_dir, n_users)
+        render_runs = [_run(RENDER_SCRIPT.format(app=APP_PATH), cwd=app_dir) for _ in range(repeat)]
+
+    return {
+        'imports': imports,
+        'import_s': statistics.median(r['seconds'] for r in import_runs),
+        'eagerly_loaded': import_runs[0]['loaded'],
+        'first_render_s': statistics.median(r['seconds'] for r in render_runs),
+        'render_exceptions': render_runs[0]['exception'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the app against a budget.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET)
+    parser.add_argument('--render-budget', type=float, default=RENDER_BUDGET)
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.users)
+    print(json.dumps(report, indent=2))
+
+    problems = []
+    if report['import_s'] > args.import_budget:
+        problems.append(f"imports took {report['import_s']:.2f}s (budget {args.import_budget}s)")
+    if report['first_render_s'] > args.render_budget:
+        problems.append(f"first render took {report['first_render_s']:.2f}s (budget {args.render_budget}s)")
+    if report['eagerly_loaded']:
+        problems.append(f"loaded at import time: {', '.join(report['eagerly_loaded'])}")
+    if report['render_exceptions']:
+        problems.append(f"first render raised: {report['render_exceptions']}")
+    if problems:
+        print("Over budget: " + '; '.join(problems))
+        sys.exit(1)
+    print("Cold start within budget")
+
+if __name__ == '__main__':
+    main()
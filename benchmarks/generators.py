@@ -0,0 +1,94 @@
+import os
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+# benchmarks/generators.py
+# Synthetic FPL payloads and prediction files, so the pipeline can be timed at any
+# scale without the live API. Payloads have the same shape as the real endpoints
+# (after pruning), so they can also be served by MockFPLServer or written as replay files.
+
+TEAM_NAMES = [
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Burnley', 'Chelsea',
+    'Crystal Palace', 'Everton', 'Fulham', 'Leeds', 'Liverpool', 'Man City', 'Man Utd',
+    'Newcastle', "Nott'm Forest", 'Spurs', 'Sunderland', 'West Ham', 'Wolves'
+]
+SEASON_START = dt.date(2025, 8, 16)
+
+def make_bootstrap_payload(n_teams=20):
+    names = TEAM_NAMES[:n_teams] + [f'Team {i}' for i in range(len(TEAM_NAMES), n_teams)]
+    return {'teams': [{'id': i + 1, 'name': name} for i, name in enumerate(names)]}
+
+def _round_robin(n_teams):
+    """Double round robin (circle method): list of gameweeks, each a list of (home, away) team ids."""
+    ids = list(range(1, n_teams + 1))
+    rounds = []
+    for r in range(n_teams - 1):
+        pairs = [(ids[i], ids[-1 - i]) for i in range(n_teams // 2)]
+        rounds.append([(a, b) if r % 2 == 0 else (b, a) for a, b in pairs])
+        ids = [ids[0]] + [ids[-1]] + ids[1:-1]
+    return rounds + [[(b, a) for a, b in gw] for gw in rounds]
+
+def make_fixtures_payload(n_finished_gw=38, n_teams=20, seed=0, n_postponed=0, n_in_play=0):
+    """
+    A season of fixtures with the first n_finished_gw gameweeks played.
+    n_postponed matches from early gameweeks are moved to (and played in) a later week;
+    n_in_play matches of the next gameweek are started with a score but not finished.
+    """
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for gw, matches in enumerate(_round_robin(n_teams), start=1):
+        for home, away in matches:
+            kickoff = SEASON_START + dt.timedelta(days=7 * (gw - 1) + int(rng.integers(0, 3)))
+            fixtures.append({
+                'id': len(fixtures) + 1, 'event': gw, 'kickoff_time': f'{kickoff.isoformat()}T14:00:00Z',
+                'team_h': home, 'team_a': away, 'finished': False, 'finished_provisional': False,
+                'started': False, 'minutes': 0, 'team_h_score': None, 'team_a_score': None,
+            })
+
+    # rearranged matches are played a few weeks after their original gameweek
+    matches_per_gw = n_teams // 2
+    for i in range(min(n_postponed, max(n_finished_gw - 4, 0))):
+        fixture = fixtures[i * matches_per_gw]
+        new_date = SEASON_START + dt.timedelta(days=7 * (fixture['event'] + 2) + 1)
+        fixture['kickoff_time'] = f'{new_date.isoformat()}T19:45:00Z'
+
+    last_date = SEASON_START + dt.timedelta(days=7 * n_finished_gw)
+    for fixture in fixtures:
+        if fixture['event'] <= n_finished_gw and fixture['kickoff_time'][:10] < last_date.isoformat():
+            fixture.update(finished=True, finished_provisional=True, started=True, minutes=90,
+                           team_h_score=int(rng.poisson(1.5)), team_a_score=int(rng.poisson(1.2)))
+
+    in_play = [f for f in fixtures if f['event'] == n_finished_gw + 1][:n_in_play]
+    for fixture in in_play:
+        fixture.update(started=True, minutes=int(rng.integers(1, 90)),
+                       team_h_score=int(rng.poisson(0.8)), team_a_score=int(rng.poisson(0.6)))
+    return fixtures
+
+def make_predictions(n_users, n_teams=20, seed=0, teams=None):
+    """Prediction frame (name, team, predicted_position): every user ranks every team once."""
+    rng = np.random.default_rng(seed)
+    teams = teams or [t['name'] for t in make_bootstrap_payload(n_teams)['teams']]
+    # users agree roughly with a shared "form guide" so the crowd stats aren't flat noise
+    base = np.arange(len(teams), dtype=float)
+    noise = rng.normal(0, 4, size=(n_users, len(teams)))
+    positions = np.argsort(np.argsort(base[None, :] + noise, axis=1), axis=1) + 1
+    width = len(str(n_users))
+    return pd.DataFrame({
+        'name': np.repeat([f'Player {i:0{width}d}' for i in range(n_users)], len(teams)),
+        'team': np.tile(teams, n_users),
+        'predicted_position': positions.ravel(),
+    })
+
+def write_predictions_csv(path, n_users, n_teams=20, seed=0):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    make_predictions(n_users, n_teams, seed).to_csv(path, index=False)
+    return path
+
+def make_season(n_finished_gw=38, n_users=7, seed=0, **fixture_kwargs):
+    """(bootstrap, fixtures, df_predictions) for one synthetic season."""
+    bootstrap = make_bootstrap_payload()
+    fixtures = make_fixtures_payload(n_finished_gw, seed=seed, **fixture_kwargs)
+    df_predictions = make_predictions(n_users, seed=seed)
+    return bootstrap, fixtures, df_predictions
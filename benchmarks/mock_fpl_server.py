@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# benchmarks/mock_fpl_server.py
+# Local stand-in for the FPL API. Serves fixed payloads with an ETag, and can add
+# latency or fail the first N requests so the fetch layer can be measured offline.
+
+class MockFPLServer:
+    def __init__(self, payloads, latency=0.0, fail_first=0, fail_status=503):
+        """payloads maps endpoint ('fixtures/') to the JSON-serialisable body."""
+        self.bodies = {f"/{endpoint}": json.dumps(data).encode() for endpoint, data in payloads.items()}
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so connection pooling shows up
+
+            def do_GET(self):
+                with mock._lock:
+                    mock.requests.append((self.path, self.headers.get('If-None-Match')))
+                    failing = len(mock.requests) <= mock.fail_first
+                time.sleep(mock.latency)
+
+                if failing:
+                    return self._send(mock.fail_status, b'')
+                if self.path not in mock.bodies:
+                    return self._send(404, b'')
+                if self.headers.get('If-None-Match') == '"mock"':
+                    return self._send(304, b'')
+                self._send(200, mock.bodies[self.path], {'ETag': '"mock"', 'Content-Type': 'application/json'})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
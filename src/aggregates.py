@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+# src/aggregates.py
+# Crowd statistics kept as sufficient statistics instead of recomputed from df_merged.
+# Per team: how many players picked it, and the sum and sum of squares of their picks.
+# Every player is scored against the same table, so a team's crowd error at a gameweek
+# follows from those and the team's position alone:
+#     sum(position - pick)      = n * position - sum
+#     sum((position - pick)^2)  = n * position^2 - 2 * position * sum + sum_sq
+# New predictions are an O(teams) update (per gameweek too), a new gameweek is one row, and
+# the meta analysis reads teams x gameweeks numbers instead of scanning users x teams x gameweeks.
+# Everything is integer, so the sums are exact and an unchanged crowd gives a std of exactly 0.
+#
+# crowd = {'teams', 'count', 'sum', 'sum_sq',                          <- per team
+#          'gameweeks', 'positions', 'gw_count', 'gw_error', 'gw_error_sq'}  <- per gameweek x team
+
+STAT_COLS = ['count', 'sum', 'sum_sq']
+
+def new_crowd_aggregates(teams):
+    """Empty aggregates for teams (the column order of every matrix passed in later)."""
+    n_teams = len(teams)
+    return {
+        'teams': pd.Index(teams),
+        'count': np.zeros(n_teams, dtype='int64'),
+        'sum': np.zeros(n_teams, dtype='int64'),
+        'sum_sq': np.zeros(n_teams, dtype='int64'),
+        'gameweeks': np.array([], dtype='int64'),
+        'positions': np.zeros((0, n_teams), dtype='int64'),
+        'gw_count': np.zeros((0, n_teams), dtype='int64'),
+        'gw_error': np.zeros((0, n_teams), dtype='int64'),
+        'gw_error_sq': np.zeros((0, n_teams), dtype='int64'),
+    }
+
+def _gameweek_stats(positions, count, total, sum_sq):
+    """(count, sum of errors, sum of squared errors) per gameweek x team; teams without a position yet count nothing."""
+    placed = positions > 0
+    gw_count = np.where(placed, count[None, :], 0)
+    gw_error = np.where(placed, positions * count[None, :] - total[None, :], 0)
+    gw_error_sq = np.where(placed, positions ** 2 * count[None, :] - 2 * positions * total[None, :] + sum_sq[None, :], 0)
+    return gw_count, gw_error, gw_error_sq
+
+def add_predictions(crowd, predictions, sign=1):
+    """
+    Folds a users x teams matrix of picks (0 = no pick, columns in crowd['teams'] order) into
+    the aggregates, every gameweek included. sign=-1 takes entries back out (withdrawn or replaced).
+    """
+    predictions = np.asarray(predictions, dtype='int64')
+    has_pick = predictions > 0
+    delta = (
+        sign * has_pick.sum(axis=0),
+        sign * predictions.sum(axis=0),
+        sign * (predictions ** 2).sum(axis=0),
+    )
+    for key, value in zip(STAT_COLS, delta):
+        crowd[key] = crowd[key] + value
+    # the per-gameweek sums are linear in the per-team ones, so the change adds on directly
+    for key, value in zip(['gw_count', 'gw_error', 'gw_error_sq'], _gameweek_stats(crowd['positions'], *delta)):
+        crowd[key] = crowd[key] + value
+    return crowd
+
+def add_gameweek(crowd, gameweek, positions):
+    """Adds (or replaces) one gameweek's table: positions per team in crowd['teams'] order, 0 = not placed."""
+    positions = np.asarray(positions, dtype='int64')[None, :]
+    row = _gameweek_stats(positions, crowd['count'], crowd['sum'], crowd['sum_sq'])
+    keep = crowd['gameweeks'] != gameweek
+    order = np.argsort(np.r_[crowd['gameweeks'][keep], gameweek], kind='stable')
+    crowd['gameweeks'] = np.r_[crowd['gameweeks'][keep], gameweek][order]
+    for key, value in zip(['positions', 'gw_count', 'gw_error', 'gw_error_sq'], (positions,) + row):
+        crowd[key] = np.vstack([crowd[key][keep], value])[order]
+    return crowd
+
+def add_league_table(crowd, df_league):
+    """add_gameweek for every gameweek of a long df_league frame."""
+    teams = crowd['teams']
+    for gw, df_gw in df_league.groupby('gameweek', sort=True):
+        positions = np.zeros(len(teams), dtype='int64')
+        columns = teams.get_indexer(df_gw['team'].astype(str))
+        positions[columns[columns >= 0]] = df_gw['position'].to_numpy()[columns >= 0]
+        add_gameweek(crowd, int(gw), positions)
+    return crowd
+
+def _mean_std(count, total, sum_sq):
+    """Mean and sample std from the sums; exact numerator, so a constant column gives std 0."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt((count * sum_sq - total ** 2) / (count * (count - 1)))
+    return mean, std
+
+def get_crowd_mean_std(crowd):
+    """Mean and std of the crowd's pick per team (std of 0 replaced with 1, NaN below 2 picks)."""
+    mean, std = _mean_std(crowd['count'], crowd['sum'], crowd['sum_sq'])
+    std[crowd['count'] < 2] = np.nan
+    std[std == 0] = 1.0
+    return mean, std
+
+def crowd_table(crowd):
+    """df_crowd layout (team, crowd_mean, crowd_std), as src/schema.py and calculate_leaderboard use it."""
+    mean, std = get_crowd_mean_std(crowd)
+    return pd.DataFrame({'team': crowd['teams'], 'crowd_mean': mean, 'crowd_std': std})
+
+def get_gameweek_errors(crowd, gameweek):
+    """
+    The crowd's error per team at one gameweek: position, mean pick, mean and std of
+    position - pick, and how many players picked the team. Teams without a position are left out.
+    """
+    row = int(np.searchsorted(crowd['gameweeks'], gameweek))
+    if row >= len(crowd['gameweeks']) or crowd['gameweeks'][row] != gameweek:
+        raise KeyError(f"Gameweek {gameweek} is not in the crowd aggregates")
+    placed = crowd['positions'][row] > 0
+    count = crowd['gw_count'][row][placed]
+    error_mean, error_std = _mean_std(count, crowd['gw_error'][row][placed], crowd['gw_error_sq'][row][placed])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        predicted = crowd['sum'][placed] / count
+    return pd.DataFrame({
+        'team': crowd['teams'][placed],
+        'position': crowd['positions'][row][placed],
+        'predicted_position': predicted,
+        'predicted_difference': error_mean,
+        'error_std': error_std,
+        'count': count,
+    })
+
+def build_crowd_aggregates(df_league, df_predictions):
+    """Aggregates from a long df_league and df_predictions (name, team, predicted_position)."""
+    teams = pd.Index(np.sort(df_league['team'].astype(str).unique()))
+    df_known = df_predictions[df_predictions['team'].isin(teams)]
+    t = teams.get_indexer(df_known['team'].astype(str))
+    picks = df_known['predicted_position'].to_numpy(dtype='int64')
+    crowd = new_crowd_aggregates(teams)
+    # the same sums add_predictions takes from a matrix, straight from the long rows
+    delta = [np.bincount(t, weights=w, minlength=len(teams)).astype('int64') for w in (picks > 0, picks, picks ** 2)]
+    for key, value in zip(STAT_COLS, delta):
+        crowd[key] = value
+    return add_league_table(crowd, df_league)
+
+def crowd_aggregates_from_merged(df_merged):
+    """Aggregates from df_merged alone, for frames stored without them (a scan, the fallback only)."""
+    latest = df_merged['gameweek'].max()
+    df_picks = df_merged.loc[df_merged['gameweek'] == latest, ['name', 'team', 'predicted_position']]
+    df_league = df_merged.groupby(['gameweek', 'team'], observed=True, sort=False)['position'].first().reset_index()
+    return build_crowd_aggregates(df_league, df_picks)
+
+def crowd_to_frame(crowd):
+    """The per-team sums as a small frame (team, count, sum, sum_sq), e.g. for a snapshot."""
+    return pd.DataFrame({'team': crowd['teams'], **{key: crowd[key] for key in STAT_COLS}})
+
+def trim_gameweeks(crowd, last_gameweek):
+    """Drops the gameweeks after last_gameweek (open gameweeks that are about to be recomputed)."""
+    keep = crowd['gameweeks'] <= last_gameweek
+    for key in ['gameweeks', 'positions', 'gw_count', 'gw_error', 'gw_error_sq']:
+        crowd[key] = crowd[key][keep]
+    return crowd
+
+def crowd_from_frame(df_crowd_stats, df_league):
+    """Aggregates back from crowd_to_frame and the league table they were built with."""
+    crowd = new_crowd_aggregates(pd.Index(df_crowd_stats['team'].astype(str)))
+    for key in STAT_COLS:
+        crowd[key] = df_crowd_stats[key].to_numpy(dtype='int64')
+    return add_league_table(crowd, df_league)
+
+def crowd_from_snapshot(frames):
+    """Aggregates for a loaded snapshot: from its df_crowd_stats, or rebuilt from df_merged when it has none."""
+    if 'df_crowd_stats' in frames and 'df_league' in frames:
+        return crowd_from_frame(frames['df_crowd_stats'], frames['df_league'])
+    return crowd_aggregates_from_merged(frames['df_merged'])
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+
+from src.fpl_client import request_with_retry
+from src.instrumentation import count
+
+# src/api_cache.py
+# Small on-disk cache for the FPL API. Responses are pruned to the fields the pipeline
+# uses, revalidated with ETag/Last-Modified once the TTL runs out, and can be replayed
+# from recorded JSON files with no network at all.
+
+BASE_URL = os.environ.get('FPL_BASE_URL', 'https://fantasy.premierleague.com/api/')
+CACHE_DIR = os.path.join('data', 'cache', 'api')
+CACHE_TTL = int(os.environ.get('FPL_CACHE_TTL', 3600))  # seconds
+# set FPL_REPLAY_DIR to a folder of recorded payloads (bootstrap-static.json, fixtures.json) to run offline
+REPLAY_DIR = os.environ.get('FPL_REPLAY_DIR')
+
+FIXTURE_FIELDS = [
+    'id', 'event', 'kickoff_time', 'finished', 'finished_provisional', 'started', 'minutes',
+    'team_h', 'team_a', 'team_h_score', 'team_a_score'
+]
+
+def _prune_bootstrap(data):
+    # only teams[id, name] is used from the multi-megabyte bootstrap payload
+    return {'teams': [{'id': t['id'], 'name': t['name']} for t in data['teams']]}
+
+def _prune_fixtures(data):
+    return [{k: f[k] for k in FIXTURE_FIELDS if k in f} for f in data]
+
+PRUNERS = {
+    'bootstrap-static/': _prune_bootstrap,
+    'fixtures/': _prune_fixtures,
+}
+
+def _slug(endpoint):
+    return endpoint.strip('/').replace('/', '_')
+
+def prune_payload(endpoint, data):
+    pruner = PRUNERS.get(endpoint)
+    return pruner(data) if pruner else data
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    # write then rename so a crash never leaves half a file behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def load_cached(endpoint, cache_dir=CACHE_DIR):
+    """Returns (payload, meta) from the cache or (None, None) if nothing usable is stored."""
+    data_path = os.path.join(cache_dir, f"{_slug(endpoint)}.json")
+    meta_path = os.path.join(cache_dir, f"{_slug(endpoint)}.meta.json")
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+    try:
+        return _read_json(data_path), _read_json(meta_path)
+    except (OSError, ValueError):
+        return None, None
+
+def store_cached(endpoint, data, meta, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_json(os.path.join(cache_dir, f"{_slug(endpoint)}.json"), data)
+    _write_json(os.path.join(cache_dir, f"{_slug(endpoint)}.meta.json"), meta)
+
+def replay_json(endpoint, replay_dir=REPLAY_DIR):
+    """Serves a recorded payload from disk instead of calling the API."""
+    path = os.path.join(replay_dir, f"{_slug(endpoint)}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Missing recorded payload at {path}")
+    return prune_payload(endpoint, _read_json(path))
+
+def get_json(endpoint, base_url=BASE_URL, ttl=CACHE_TTL, cache_dir=CACHE_DIR, replay_dir=REPLAY_DIR,
+             session=None, timeout=10, retries=None):
+    """
+    Fetches one API endpoint through the cache.
+    Fresh entries (younger than ttl) are served straight from disk, stale ones are
+    revalidated with a conditional request and only re-downloaded when they changed.
+    If the API is down the last good payload is served, however old it is.
+    """
+    if replay_dir:
+        return replay_json(endpoint, replay_dir)
+
+    cached, meta = load_cached(endpoint, cache_dir)
+    if cached is not None and time.time() - meta.get('fetched_at', 0) < ttl:
+        count('fpl_api_cache_hits', endpoint=endpoint)
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    import requests # only needed once we actually go to the network
+
+    retry_args = {} if retries is None else {'retries': retries}
+    try:
+        response = request_with_retry(f'{base_url}{endpoint}', headers=headers, timeout=timeout,
+                                      session=session, **retry_args)
+        count('fpl_api_requests', endpoint=endpoint, status=response.status_code)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if cached is None:
+            raise
+        age_hours = (time.time() - meta.get('fetched_at', 0)) / 3600
+        print(f"API Error for {endpoint}, serving cached copy from {age_hours:.1f}h ago: {e}")
+        return cached
+
+    if response.status_code == 304 and cached is not None:
+        meta['fetched_at'] = time.time()
+        store_cached(endpoint, cached, meta, cache_dir)
+        return cached
+
+    count('fpl_api_bytes', len(response.content), endpoint=endpoint)
+    data = prune_payload(endpoint, response.json())
+    meta = {
+        'url': f'{base_url}{endpoint}',
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'fetched_at': time.time(),
+    }
+    store_cached(endpoint, data, meta, cache_dir)
+    return data
+
+def record_payloads(replay_dir, base_url=BASE_URL, endpoints=('bootstrap-static/', 'fixtures/')):
+    """Saves the current (pruned) API responses so they can be replayed offline later."""
+    os.makedirs(replay_dir, exist_ok=True)
+    for endpoint in endpoints:
+        response = request_with_retry(f'{base_url}{endpoint}')
+        response.raise_for_status()
+        data = prune_payload(endpoint, response.json())
+        _write_json(os.path.join(replay_dir, f"{_slug(endpoint)}.json"), data)
+        print(f"Recorded {endpoint} to {replay_dir}")
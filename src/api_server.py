@@ -0,0 +1,235 @@
+import json
+import asyncio
+import hashlib
+import argparse
+from urllib.parse import urlsplit, unquote, parse_qs
+
+import numpy as np
+
+from src.snapshot_store import SNAPSHOT_DIR, load_snapshot, latest_version
+from src.views import build_view_index, get_gameweek_view, LEADERBOARD_COLS
+from src.aggregates import crowd_from_snapshot
+
+# src/api_server.py
+# Read-only JSON API over the processed frames for other clients (chat bot, TV display).
+# The frames are loaded once from the latest snapshot and indexed; responses are built
+# on the first request and kept, so nothing is recomputed per request. Every response
+# has a strong ETag derived from the data version, and If-None-Match gets a bodiless 304.
+#
+#     GET /gameweeks
+#     GET /leaderboard               (latest gameweek)  /leaderboard/<gameweek>
+#         ?offset=0&limit=50         one page of the table (up to MAX_PAGE_SIZE rows)
+#     GET /users/<name>/history
+#     GET /team-errors               (latest gameweek)  /team-errors/<gameweek>
+#     GET /health
+#
+# python -m src.api_server --port 8502
+
+HOST = '127.0.0.1'
+PORT = 8502
+RELOAD_INTERVAL = 60 # seconds between checks for a newer snapshot
+MAX_PAGE_SIZE = 500
+HISTORY_COLS = ['gameweek', 'rank', 'total_score', 'rank_movement']
+TEAM_ERROR_COLS = ['team', 'position', 'predicted_position', 'predicted_difference', 'mean_error']
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _records(df):
+    return json.loads(df.to_json(orient='records'))
+
+def build_api_index(df_leaderboard, df_merged, version, crowd=None):
+    """Everything the routes need, keyed for lookups. Response bodies are filled in lazily."""
+    views = build_view_index(df_leaderboard, df_merged, crowd)
+    return {
+        'version': version,
+        'views': views,
+        'df_leaderboard': df_leaderboard,
+        'user_rows': {str(name): rows for name, rows in df_leaderboard.groupby('name', observed=True).indices.items()},
+        'responses': {}, # path -> (body, etag, payload); the payload is kept for leaderboards, to cut pages from
+        'requests': 0,
+    }
+
+def load_api_index(snapshot_dir=SNAPSHOT_DIR):
+    frames, meta = load_snapshot(snapshot_dir=snapshot_dir)
+    if frames is None:
+        raise FileNotFoundError(f"No snapshot in {snapshot_dir}, run the app or src.export_static first")
+    print(f"API data loaded: snapshot {meta['version']}")
+    return build_api_index(frames['df_leaderboard'], frames['df_merged'], meta['version'], crowd_from_snapshot(frames))
+
+def make_etag(version, path):
+    """Strong ETag: changes exactly when the data version (or the resource) does."""
+    return '"' + hashlib.sha256(f"{version}:{path}".encode()).hexdigest()[:20] + '"'
+
+def _gameweek(index, value):
+    gameweeks = index['views']['gameweeks']
+    if value is None:
+        return gameweeks[0] if gameweeks else None
+    gw = int(value)
+    return gw if gw in index['views']['by_gw'] else None
+
+def _build_body(index, parts):
+    """JSON payload for a route, or None when it doesn't exist."""
+    if parts == ['health']:
+        return {'status': 'ok', 'version': index['version']}
+    if parts == ['gameweeks']:
+        return {'gameweeks': index['views']['gameweeks']}
+
+    if parts[0] in ('leaderboard', 'team-errors') and len(parts) <= 2:
+        gw = _gameweek(index, parts[1] if len(parts) == 2 else None)
+        if gw is None:
+            return None
+        gw_view = get_gameweek_view(index['views'], gw)
+        if parts[0] == 'leaderboard':
+            df = gw_view['leaderboard'][LEADERBOARD_COLS + ['rank_movement']]
+            return {'gameweek': gw, 'cards': gw_view['cards'], 'leaderboard': _records(df)}
+        return {'gameweek': gw, 'team_cards': gw_view['team_cards'],
+                'team_errors': _records(gw_view['team_errors'][TEAM_ERROR_COLS])}
+
+    if parts[0] == 'users' and len(parts) == 3 and parts[2] == 'history':
+        rows = index['user_rows'].get(parts[1])
+        if rows is None:
+            return None
+        df = index['df_leaderboard'].iloc[rows][HISTORY_COLS].sort_values('gameweek')
+        return {'name': parts[1], 'history': _records(df)}
+    return None
+
+def _page(query):
+    """(offset, limit) from ?offset=&limit=, or None when the request isn't for a page."""
+    params = parse_qs(query)
+    if 'offset' not in params and 'limit' not in params:
+        return None
+    offset = int(params.get('offset', ['0'])[0])
+    limit = int(params.get('limit', [str(MAX_PAGE_SIZE)])[0])
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"offset must be >= 0 and limit 1..{MAX_PAGE_SIZE}")
+    return offset, limit
+
+def handle_request(index, method, target, headers):
+    """(status, headers, body) for one request; the transport lives in serve()."""
+    if method not in ('GET', 'HEAD'):
+        return 405, {'Allow': 'GET, HEAD'}, b''
+    url = urlsplit(target)
+    path = url.path.rstrip('/') or '/'
+    parts = [unquote(p) for p in path.strip('/').split('/')]
+    try:
+        page = _page(url.query)
+    except ValueError:
+        return 400, {}, b''
+    if page is not None and parts[0] != 'leaderboard':
+        return 400, {}, b''
+
+    cached = index['responses'].get(path)
+    if cached is None:
+        try:
+            payload = _build_body(index, parts)
+        except ValueError:
+            return 400, {}, b''
+        if payload is None:
+            return 404, {}, b''
+        cached = (json.dumps(payload, default=_json_default).encode(), make_etag(index['version'], path),
+                  payload if parts[0] == 'leaderboard' else None)
+        index['responses'][path] = cached
+
+    body, etag, payload = cached
+    if page is not None:
+        # pages are cut from the kept payload per request, only the full table is cached
+        offset, limit = page
+        etag = make_etag(index['version'], f"{path}?offset={offset}&limit={limit}")
+    response_headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Content-Type': 'application/json'}
+    if etag in [t.strip() for t in headers.get('if-none-match', '').split(',')]:
+        return 304, response_headers, b''
+    if page is not None:
+        rows = payload['leaderboard']
+        body = json.dumps({**payload, 'leaderboard': rows[offset:offset + limit],
+                           'total': len(rows), 'offset': offset, 'limit': limit}, default=_json_default).encode()
+    return 200, response_headers, body
+
+async def _read_request(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    method, rest = lines[0].split(' ', 1)
+    target, version = rest.rsplit(' ', 1)
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    # GET/HEAD only, but drain a body so the next request on the connection parses
+    length = int(headers.get('content-length', 0) or 0)
+    if length:
+        await reader.readexactly(length)
+    return method, target, version, headers
+
+async def _handle_connection(server_state, reader, writer):
+    """HTTP/1.1 with keep-alive: one connection serves requests until the client closes it."""
+    try:
+        while True:
+            try:
+                method, target, version, headers = await _read_request(reader)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+                break
+            index = server_state['index']
+            index['requests'] += 1
+            status, response_headers, body = handle_request(index, method, target, headers)
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+            lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+            lines += [f"{key}: {value}" for key, value in response_headers.items()]
+            lines += [f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+            # HEAD gets the headers of the GET response without its body
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (b'' if method == 'HEAD' else body))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+async def _reload_loop(server_state, snapshot_dir, interval):
+    """Swaps in a newer snapshot when LATEST moves; clients then get new ETags."""
+    while True:
+        await asyncio.sleep(interval)
+        version = latest_version(snapshot_dir)
+        if version and version != server_state['index']['version']:
+            try:
+                server_state['index'] = await asyncio.to_thread(load_api_index, snapshot_dir)
+            except FileNotFoundError as e:
+                print(f"API reload skipped: {e}")
+
+async def serve(index, host=HOST, port=PORT, snapshot_dir=None, reload_interval=RELOAD_INTERVAL, on_started=None):
+    """Serves the index until cancelled. on_started(port) is called once the port is bound (port=0 picks a free one)."""
+    server_state = {'index': index}
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(server_state, reader, writer), host, port)
+    server_state['port'] = server.sockets[0].getsockname()[1]
+    reload_task = asyncio.create_task(_reload_loop(server_state, snapshot_dir, reload_interval)) if snapshot_dir else None
+    print(f"API serving snapshot {index['version']} on http://{host}:{server_state['port']}/")
+    if on_started is not None:
+        on_started(server_state['port'])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reload_task is not None:
+            reload_task.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API over the processed leaderboard snapshots.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR, help="snapshot folder written by the app")
+    parser.add_argument('--reload-interval', type=int, default=RELOAD_INTERVAL)
+    args = parser.parse_args()
+
+    index = load_api_index(args.snapshots)
+    try:
+        asyncio.run(serve(index, args.host, args.port, args.snapshots, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
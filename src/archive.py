@@ -0,0 +1,258 @@
+import os
+import time
+import sqlite3
+import argparse
+import contextlib
+
+import pandas as pd
+
+# src/archive.py
+# SQLite archive of every season: fixtures, the league table after every gameweek,
+# predictions and the scored leaderboard. The pipeline writes a season in one bulk
+# transaction whenever its data version changes, so past seasons stay queryable after
+# the FPL API rolls over, without reloading any raw data.
+#
+#     seasons        (season)                      <- data version and time of the last write
+#     fixtures       (season, fixture_id)          indexed by (season, gameweek)
+#     league_tables  (season, gameweek, team)      indexed by (season, team)
+#     predictions    (season, name, team)          indexed by (season, team)
+#     scores         (season, gameweek, name)      indexed by (season, name)
+#
+# python -m src.archive                      (archive the current season)
+# python -m src.archive --all-time           (all-time leaderboard)
+# python -m src.archive --accuracy "Name"    (a player's accuracy, season by season)
+
+ARCHIVE_PATH = os.path.join('data', 'archive.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasons (
+    season TEXT PRIMARY KEY,
+    data_version TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS fixtures (
+    season TEXT NOT NULL,
+    fixture_id INTEGER NOT NULL,
+    gameweek INTEGER,
+    kickoff_date TEXT,
+    home_team TEXT,
+    away_team TEXT,
+    home_score INTEGER,
+    away_score INTEGER,
+    finished INTEGER,
+    PRIMARY KEY (season, fixture_id)
+);
+CREATE INDEX IF NOT EXISTS fixtures_season_gameweek ON fixtures (season, gameweek);
+CREATE TABLE IF NOT EXISTS league_tables (
+    season TEXT NOT NULL,
+    gameweek INTEGER NOT NULL,
+    team TEXT NOT NULL,
+    position INTEGER,
+    points INTEGER,
+    goals_difference INTEGER,
+    goals_scored INTEGER,
+    goals_against INTEGER,
+    PRIMARY KEY (season, gameweek, team)
+);
+CREATE INDEX IF NOT EXISTS league_tables_season_team ON league_tables (season, team);
+CREATE TABLE IF NOT EXISTS predictions (
+    season TEXT NOT NULL,
+    name TEXT NOT NULL,
+    team TEXT NOT NULL,
+    predicted_position INTEGER,
+    PRIMARY KEY (season, name, team)
+);
+CREATE INDEX IF NOT EXISTS predictions_season_team ON predictions (season, team);
+CREATE TABLE IF NOT EXISTS scores (
+    season TEXT NOT NULL,
+    gameweek INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    proximity_score INTEGER,
+    perfect_match_score INTEGER,
+    boldness_score REAL,
+    total_score REAL,
+    rank INTEGER,
+    rank_movement INTEGER,
+    PRIMARY KEY (season, gameweek, name)
+);
+CREATE INDEX IF NOT EXISTS scores_season_name ON scores (season, name);
+"""
+
+FIXTURE_COLS = ['fixture_id', 'gameweek', 'kickoff_date', 'home_team', 'away_team', 'home_score', 'away_score', 'finished']
+TABLE_COLS = ['gameweek', 'team', 'position', 'points', 'goals_difference', 'goals_scored', 'goals_against']
+PREDICTION_COLS = ['name', 'team', 'predicted_position']
+SCORE_COLS = ['gameweek', 'name', 'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score', 'rank',
+              'rank_movement']
+
+def connect(db_path=ARCHIVE_PATH):
+    """Opens (and creates if needed) the archive."""
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    # WAL lets the app read while the pipeline writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def get_season_label(df_fixtures):
+    """'2025-26' style label from the first kickoff (seasons start in August)."""
+    first = pd.to_datetime(pd.Series(df_fixtures['kickoff_time']).dropna().astype(str)).min()
+    start_year = first.year if first.month >= 7 else first.year - 1
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+def _rows(df, cols):
+    """Plain Python tuples for executemany (sqlite3 doesn't bind numpy scalars), missing values as NULL."""
+    columns = []
+    for col in cols:
+        values = df[col].tolist()
+        if df[col].isna().any():
+            values = [None if pd.isna(v) else v for v in values]
+        columns.append(values)
+    return zip(*columns)
+
+def _fixtures_frame(df_fixtures, df_teams):
+    team_names = df_teams.set_index('id')['name']
+    return pd.DataFrame({
+        'fixture_id': df_fixtures['id'].to_numpy(),
+        'gameweek': df_fixtures['event'].to_numpy(),
+        'kickoff_date': df_fixtures['kickoff_time'].astype(str).where(df_fixtures['kickoff_time'].notna()).to_numpy(),
+        'home_team': df_fixtures['team_h'].map(team_names).to_numpy(),
+        'away_team': df_fixtures['team_a'].map(team_names).to_numpy(),
+        'home_score': df_fixtures['team_h_score'].to_numpy(),
+        'away_score': df_fixtures['team_a_score'].to_numpy(),
+        'finished': df_fixtures['finished'].fillna(False).astype(int).to_numpy(),
+    })
+
+def archive_season(df_fixtures, df_teams, df_league, df_predictions, df_leaderboard, version=None, season=None,
+                   db_path=ARCHIVE_PATH):
+    """
+    Replaces a season in the archive with these frames, in one transaction.
+    Skipped when the season was already archived at this data version.
+    """
+    season = season or get_season_label(df_fixtures)
+    start = time.perf_counter()
+    with contextlib.closing(connect(db_path)) as conn:
+        row = conn.execute("SELECT data_version FROM seasons WHERE season = ?", (season,)).fetchone()
+        if version is not None and row is not None and row[0] == version:
+            return season
+
+        tables = [
+            ('fixtures', FIXTURE_COLS, _fixtures_frame(df_fixtures, df_teams)),
+            ('league_tables', TABLE_COLS, df_league),
+            ('predictions', PREDICTION_COLS, df_predictions),
+            ('scores', SCORE_COLS, df_leaderboard),
+        ]
+        # one transaction: readers see the old season or the new one, never half of it
+        with conn:
+            n_rows = 0
+            for table, cols, df in tables:
+                conn.execute(f"DELETE FROM {table} WHERE season = ?", (season,))
+                placeholders = ', '.join(['?'] * (len(cols) + 1))
+                conn.executemany(f"INSERT INTO {table} (season, {', '.join(cols)}) VALUES ({placeholders})",
+                                 ((season,) + row for row in _rows(df, cols)))
+                n_rows += len(df)
+            conn.execute("INSERT OR REPLACE INTO seasons (season, data_version, updated_at) VALUES (?, ?, ?)",
+                         (season, version, time.time()))
+
+    print(f"Season {season} archived: {n_rows} rows in {time.perf_counter() - start:.2f}s")
+    return season
+
+def query(sql, params=(), db_path=ARCHIVE_PATH):
+    """Any read query against the archive, as a DataFrame."""
+    with contextlib.closing(connect(db_path)) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def get_seasons(db_path=ARCHIVE_PATH):
+    return query("SELECT season, data_version, updated_at FROM seasons ORDER BY season", db_path=db_path)
+
+def get_all_time_leaderboard(db_path=ARCHIVE_PATH):
+    """
+    Per player over every completed season (all fixtures finished): seasons played, titles,
+    best finish, total and average final score. The season in progress is left out.
+    """
+    return query("""
+        WITH complete AS (
+            SELECT season FROM fixtures GROUP BY season HAVING MIN(finished) = 1
+        ),
+        final AS (
+            SELECT season, MAX(gameweek) AS gameweek FROM scores
+            WHERE season IN (SELECT season FROM complete)
+            GROUP BY season
+        )
+        SELECT s.name,
+               COUNT(*) AS seasons,
+               SUM(s.rank = 1) AS titles,
+               MIN(s.rank) AS best_finish,
+               SUM(s.total_score) AS total_score,
+               AVG(s.total_score) AS average_score
+        FROM scores s
+        JOIN final f ON s.season = f.season AND s.gameweek = f.gameweek
+        GROUP BY s.name
+        ORDER BY titles DESC, total_score DESC
+    """, db_path=db_path)
+
+def get_accuracy_trend(name=None, db_path=ARCHIVE_PATH):
+    """
+    Per season and gameweek: how far a player's picks were from the table (mean absolute error,
+    exact picks), with their score and rank. Every player when name is None.
+    """
+    where = "WHERE p.name = ?" if name is not None else ""
+    return query(f"""
+        SELECT p.season, t.gameweek, p.name,
+               AVG(ABS(t.position - p.predicted_position)) AS mean_abs_error,
+               SUM(t.position = p.predicted_position) AS exact_picks,
+               sc.total_score, sc.rank
+        FROM predictions p
+        JOIN league_tables t ON t.season = p.season AND t.team = p.team
+        LEFT JOIN scores sc ON sc.season = p.season AND sc.gameweek = t.gameweek AND sc.name = p.name
+        {where}
+        GROUP BY p.season, t.gameweek, p.name
+        ORDER BY p.season, t.gameweek, p.name
+    """, (name,) if name is not None else (), db_path=db_path)
+
+def get_team_history(team, db_path=ARCHIVE_PATH):
+    """A team's final position every season next to where the crowd predicted it."""
+    return query("""
+        WITH final AS (
+            SELECT season, MAX(gameweek) AS gameweek FROM league_tables GROUP BY season
+        )
+        SELECT t.season, t.position AS final_position, t.points,
+               (SELECT AVG(p.predicted_position) FROM predictions p
+                WHERE p.season = t.season AND p.team = t.team) AS crowd_prediction
+        FROM league_tables t
+        JOIN final f ON t.season = f.season AND t.gameweek = f.gameweek
+        WHERE t.team = ?
+        ORDER BY t.season
+    """, (team,), db_path=db_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive the current season, or query every archived season.")
+    parser.add_argument('--db', default=ARCHIVE_PATH)
+    parser.add_argument('--predictions', default='data/epl_predictions_2026.csv')
+    parser.add_argument('--season', help="label to archive under (default from the fixture dates, e.g. 2025-26)")
+    parser.add_argument('--all-time', action='store_true', help="print the all-time leaderboard")
+    parser.add_argument('--accuracy', metavar='NAME', help="print a player's accuracy trend")
+    parser.add_argument('--team', help="print a team's final positions against the crowd's predictions")
+    args = parser.parse_args()
+
+    if args.all_time or args.accuracy or args.team:
+        if args.all_time:
+            print(get_all_time_leaderboard(args.db).to_string(index=False))
+        if args.accuracy:
+            print(get_accuracy_trend(args.accuracy, args.db).to_string(index=False))
+        if args.team:
+            print(get_team_history(args.team, args.db).to_string(index=False))
+        return
+
+    from src.data_loader import fetch_fpl_data
+    from src.incremental import refresh_processed_data
+    from src.snapshot_store import get_data_version
+
+    df_predictions, df_teams, df_fixtures = fetch_fpl_data(predictions_path=args.predictions)
+    df_league, df_leaderboard, df_merged = refresh_processed_data(df_fixtures, df_teams, df_predictions)
+    archive_season(df_fixtures, df_teams, df_league, df_predictions, df_leaderboard,
+                   version=get_data_version(df_fixtures, df_predictions), season=args.season, db_path=args.db)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.api_cache import REPLAY_DIR
+from src.data_loader import fetch_api_data
+from src.predictions_store import load_prediction_store, get_prediction_matrix
+from src.data_transform import get_league_history
+from src.scoring import get_league_matrix, score_predictions, leaderboard_from_scores
+
+# src/batch.py
+# Scores many private leagues off one FPL fetch. The league history is built once
+# per season, its positions matrix is put in shared memory, and league shards are
+# scored in a process pool.
+#
+# python -m src.batch data/leagues --out data/leaderboards --workers 4
+
+def load_league_manifest(source):
+    """
+    Leagues to score as a frame of (league, predictions_path, season, replay_dir).
+    source is either a directory of prediction CSVs (league = file name) or a manifest
+    CSV/JSON with those columns; season and replay_dir are optional and default to
+    the current season from the live API.
+    """
+    if os.path.isdir(source):
+        files = sorted(f for f in os.listdir(source) if f.endswith('.csv'))
+        df_manifest = pd.DataFrame({
+            'league': [os.path.splitext(f)[0] for f in files],
+            'predictions_path': [os.path.join(source, f) for f in files],
+        })
+    elif source.endswith('.json'):
+        with open(source) as f:
+            df_manifest = pd.DataFrame(json.load(f))
+    else:
+        df_manifest = pd.read_csv(source)
+
+    if 'season' not in df_manifest:
+        df_manifest['season'] = 'current'
+    if 'replay_dir' not in df_manifest:
+        df_manifest['replay_dir'] = ''
+    df_manifest['season'] = df_manifest['season'].fillna('current').astype(str)
+    df_manifest['replay_dir'] = df_manifest['replay_dir'].fillna('').astype(str)
+
+    if df_manifest.duplicated(['season', 'league']).any():
+        raise ValueError("League names must be unique within a season")
+    return df_manifest[['league', 'predictions_path', 'season', 'replay_dir']]
+
+def _leaderboard_path(output_dir, season, league):
+    return os.path.join(output_dir, season, f"{league}_leaderboard.csv")
+
+def _score_leagues(league_matrix, leagues, output_dir, season, df_teams):
+    """Scores and writes each (league, predictions_path) against one season's league matrix."""
+    summary = []
+    for league, predictions_path in leagues:
+        # straight from the league's binary predictions store, no long predictions frame
+        store = load_prediction_store(predictions_path, df_teams)
+        scores = score_predictions(None, None, league_matrix=league_matrix,
+                                   prediction_matrix=get_prediction_matrix(store, league_matrix[1]))
+        df_leaderboard = leaderboard_from_scores(scores)
+
+        path = _leaderboard_path(output_dir, season, league)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df_leaderboard.to_csv(path, index=False)
+        summary.append({'season': season, 'league': league, 'users': len(scores['users']), 'path': path})
+    return summary
+
+def _score_shard(shm_name, shape, gameweeks, teams, leagues, output_dir, season, df_teams):
+    """Process-pool worker: attaches to the shared positions matrix instead of receiving a copy."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    positions = np.ndarray(shape, dtype='int8', buffer=shm.buf)
+    try:
+        return _score_leagues((gameweeks, teams, positions), leagues, output_dir, season, df_teams)
+    finally:
+        # the array has to go before the buffer can be released
+        del positions
+        shm.close()
+
+def _split_shards(items, n_shards):
+    return [items[i::n_shards] for i in range(n_shards) if items[i::n_shards]]
+
+def score_season(df_league, leagues, output_dir, season='current', workers=None, df_teams=None):
+    """Scores every (league, predictions_path) against one season's df_league (df_teams: that season's FPL teams)."""
+    gameweeks, teams, positions = get_league_matrix(df_league)
+    if df_teams is None:
+        df_teams = pd.DataFrame({'id': np.arange(1, len(teams) + 1), 'name': teams})
+    workers = workers or os.cpu_count() or 1
+    shards = _split_shards(list(leagues), min(workers, len(leagues)))
+
+    if len(shards) <= 1:
+        return _score_leagues((gameweeks, teams, positions), leagues, output_dir, season, df_teams)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(positions.nbytes, 1))
+    try:
+        shared = np.ndarray(positions.shape, dtype='int8', buffer=shm.buf)
+        shared[:] = positions
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [
+                pool.submit(_score_shard, shm.name, positions.shape, gameweeks, teams, shard, output_dir, season, df_teams)
+                for shard in shards
+            ]
+            summary = [row for future in futures for row in future.result()]
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return summary
+
+def run_batch(source, output_dir=os.path.join('data', 'leaderboards'), workers=None):
+    """Fetches each season once, builds its league history once and scores every league in it."""
+    df_manifest = load_league_manifest(source)
+    summary = []
+
+    for (season, replay_dir), df_season in df_manifest.groupby(['season', 'replay_dir'], sort=False):
+        # no replay_dir means the live API (or FPL_REPLAY_DIR when that is set)
+        df_teams, df_fixtures = fetch_api_data(replay_dir=replay_dir or REPLAY_DIR)
+        df_league = get_league_history(df_fixtures=df_fixtures, df_teams=df_teams)
+        leagues = list(zip(df_season['league'], df_season['predictions_path']))
+        summary += score_season(df_league, leagues, output_dir, season=season, workers=workers, df_teams=df_teams)
+        print(f"Season {season}: {len(leagues)} leagues scored")
+
+    df_summary = pd.DataFrame(summary)
+    os.makedirs(output_dir, exist_ok=True)
+    df_summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    return df_summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many prediction leagues off one FPL fetch.")
+    parser.add_argument('source', help="directory of prediction CSVs or a manifest (.csv/.json)")
+    parser.add_argument('--out', default=os.path.join('data', 'leaderboards'), help="output directory")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args()
+    run_batch(args.source, output_dir=args.out, workers=args.workers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+from src.simulation import get_current_totals
+from src.scoring import (
+    build_prediction_matrix, get_crowd_stats, get_z_scores, get_proximity_lut, score_positions, total_from_block,
+    DEFAULT_RULES
+)
+
+# src/bounds.py
+# Certain "am I mathematically out?" answers, no simulation.
+# 1. Each team's final position is boxed in from its points range: current points (lose
+#    every remaining game) to current + 3 per game (win them all). Teams that must finish
+#    above/below it are counted, including pairs that still play each other (one of them
+#    has to take points off the other), and the ranges are tightened against each other
+#    (every position is taken by exactly one team).
+# 2. A player's final score is a sum over teams, so the best and worst possible score is
+#    each team's best/worst position within its range, per team.
+# 3. Players whose best possible score is below someone's worst possible score are out.
+# The ranges are safe rather than tight: every reachable final table is inside them, so
+# "eliminated" and "clinched" are always right, but a player near the line may only be
+# flagged once a few more results are in. Ties on points count as either way round,
+# since goal difference can still change.
+#
+# python -m src.bounds
+
+def get_remaining_games(df_fixtures, teams_by_id):
+    """(games left per team, home/away columns of every unplayed fixture)."""
+    df_remaining = df_fixtures[df_fixtures['finished'] != True]
+    id_to_col = pd.Index(teams_by_id)
+    home = id_to_col.get_indexer(df_remaining['team_h'])
+    away = id_to_col.get_indexer(df_remaining['team_a'])
+    games_left = np.bincount(np.r_[home, away], minlength=len(teams_by_id))
+    return games_left, home, away
+
+def _greedy_matching(pairs):
+    """Size of a matching (no team used twice) among pairs: a lower bound on the maximum matching."""
+    used = set()
+    size = 0
+    for j, k in pairs:
+        if j not in used and k not in used:
+            used.update((j, k))
+            size += 1
+    return size
+
+def _tighten(best, worst):
+    """
+    Positions are a permutation: if p teams can only finish in the top p, nobody else can
+    (and the same from the bottom). Repeated until the ranges stop moving.
+    """
+    n = len(best)
+    changed = True
+    while changed:
+        changed = False
+        for p in range(1, n + 1):
+            top = worst <= p
+            if top.sum() == p and (best[~top] <= p).any():
+                best[~top] = np.maximum(best[~top], p + 1)
+                changed = True
+            bottom = best >= p
+            if bottom.sum() == n - p + 1 and (worst[~bottom] >= p).any():
+                worst[~bottom] = np.minimum(worst[~bottom], p - 1)
+                changed = True
+    return best, worst
+
+def get_position_ranges(points, goals_difference, goals_scored, games_left, home, away):
+    """Best and worst final position every team can still reach (1 = top)."""
+    n = len(points)
+    max_points = points + 3 * games_left
+    # tables that can no longer change break ties like the league table does
+    key = points * 1_000_000 + (goals_difference + 1000) * 1000 + goals_scored
+    done = games_left == 0
+    fixtures = list(zip(home.tolist(), away.tolist()))
+
+    best = np.ones(n, dtype='int64')
+    worst = np.full(n, n, dtype='int64')
+    for t in range(n):
+        others = np.arange(n) != t
+        fixed_above = done & done[t] & ((key > key[t]) | ((key == key[t]) & (np.arange(n) < t)))
+        fixed_below = done & done[t] & ((key < key[t]) | ((key == key[t]) & (np.arange(n) > t)))
+
+        # best case: t wins every game. j finishes above for sure with more points than t can reach;
+        # in a game between j and k, one of them takes points the other can't spare
+        spare = max_points[t] - points # points j can still add without passing t
+        above = others & ((points > max_points[t]) | fixed_above)
+        pairs = [(j, k) for j, k in fixtures if t not in (j, k) and not above[j] and not above[k]
+                 and min(spare[j], spare[k]) == 0 and max(spare[j], spare[k]) <= 2]
+        best[t] = 1 + above.sum() + _greedy_matching(pairs)
+
+        # worst case: t loses every game. j finishes below for sure if it can't reach t's points;
+        # two teams that both need to win the game between them can't both get there
+        slack = max_points - points[t] # points j can drop and still draw level with t
+        below = others & ((max_points < points[t]) | fixed_below)
+        pairs = [(j, k) for j, k in fixtures if t not in (j, k) and not below[j] and not below[k]
+                 and min(slack[j], slack[k]) <= 1 and max(slack[j], slack[k]) <= 2]
+        worst[t] = n - below.sum() - _greedy_matching(pairs)
+
+    return _tighten(best, worst)
+
+def get_score_bounds(predictions, is_bold, best, worst, rules=DEFAULT_RULES, chunk_size=4096):
+    """Lowest and highest final score per user with every team somewhere in its [best, worst] range."""
+    n_users, n_teams = predictions.shape
+    positions = np.arange(1, n_teams + 1)
+    in_range = (positions[None, :] >= best[:, None]) & (positions[None, :] <= worst[:, None]) # teams x positions
+
+    min_score = np.zeros(n_users)
+    max_score = np.zeros(n_users)
+    for start in range(0, n_users, chunk_size):
+        chunk = predictions[start:start + chunk_size]
+        bold = is_bold[start:start + chunk_size]
+        # users x teams x positions points for one team at one position
+        points = _team_points(chunk, bold, positions, rules)
+        max_score[start:start + chunk_size] = np.where(in_range[None], points, -np.inf).max(axis=2).sum(axis=1)
+        min_score[start:start + chunk_size] = np.where(in_range[None], points, np.inf).min(axis=2).sum(axis=1)
+    return min_score, max_score
+
+def _team_points(predictions, is_bold, positions, rules):
+    """users x teams x positions: the score a pick earns if its team finishes at each position."""
+    distance = np.abs(positions[None, None, :] - predictions[:, :, None].astype('int64'))
+    lut = get_proximity_lut(len(positions), rules)
+    points = lut[np.minimum(distance, len(positions))] + np.where(distance == 0, rules.perfect_match_bonus, 0)
+    points = points + np.where(is_bold[:, :, None] & (distance <= rules.bold_error), rules.bold_bonus, 0)
+    # teams a user didn't pick score nothing wherever they finish
+    return np.where(predictions[:, :, None] > 0, points, 0)
+
+@instrumented()
+def compute_bounds(df_fixtures, df_teams, df_predictions, rules=DEFAULT_RULES):
+    """
+    Returns (df_bounds, df_team_ranges):
+    - df_bounds: per user, current score, lowest/highest possible final score, best/worst possible
+      final rank, and whether they are eliminated (can't finish 1st) or have clinched 1st
+    - df_team_ranges: per team, points, maximum points, games left and best/worst possible position
+    """
+    df_teams = df_teams.sort_values('id')
+    teams_by_id = df_teams['id'].to_numpy()
+    teams = pd.Index(df_teams['name'])
+
+    points, goals_difference, goals_scored = get_current_totals(df_fixtures, teams_by_id)
+    games_left, home, away = get_remaining_games(df_fixtures, teams_by_id)
+    best, worst = get_position_ranges(points, goals_difference, goals_scored, games_left, home, away)
+
+    users, predictions, _ = build_prediction_matrix(df_predictions, teams)
+    crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+    is_bold = (predictions > 0) & (get_z_scores(predictions, crowd_mean, crowd_std) >= rules.bold_threshold)
+    min_score, max_score = get_score_bounds(predictions, is_bold, best, worst, rules)
+
+    # current table, same tie-breaks as the league table
+    key = points * 1_000_000 + (goals_difference + 1000) * 1000 + goals_scored
+    current = np.empty(len(teams), dtype='int8')
+    current[np.argsort(-key, kind='stable')] = np.arange(1, len(teams) + 1)
+    current_score = total_from_block(score_positions(current[None, :], predictions, is_bold, rules), rules)[0]
+
+    # rank = 1 + players with a higher score: only those whose worst beats my best are sure to be above,
+    # and only those whose best beats my worst can be
+    sorted_min = np.sort(min_score)
+    sorted_max = np.sort(max_score)
+    surely_above = len(users) - np.searchsorted(sorted_min, max_score, side='right')
+    # (a player whose own score can still move counts themselves in that, take them out)
+    maybe_above = len(users) - np.searchsorted(sorted_max, min_score, side='right') - (max_score > min_score)
+
+    df_bounds = pd.DataFrame({
+        'name': users,
+        'current_score': current_score,
+        'min_score': min_score,
+        'max_score': max_score,
+        'best_rank': 1 + surely_above,
+        'worst_rank': 1 + maybe_above,
+    })
+    df_bounds['eliminated'] = df_bounds['best_rank'] > 1
+    df_bounds['clinched'] = df_bounds['worst_rank'] == 1
+    df_bounds = df_bounds.sort_values(['max_score', 'min_score'], ascending=False).reset_index(drop=True)
+
+    df_team_ranges = pd.DataFrame({
+        'team': teams,
+        'points': points,
+        'max_points': points + 3 * games_left,
+        'games_left': games_left,
+        'best_position': best,
+        'worst_position': worst,
+    }).sort_values(['best_position', 'worst_position']).reset_index(drop=True)
+
+    print(f"Bounds: {int(df_bounds['eliminated'].sum())} of {len(df_bounds)} players can no longer finish first, "
+          f"{int(games_left.sum() // 2)} fixtures left")
+    return df_bounds, df_team_ranges
+
+def main():
+    from src.data_loader import fetch_fpl_data
+
+    parser = argparse.ArgumentParser(description="Best and worst possible final score and rank for every player.")
+    parser.add_argument('--predictions', default='data/epl_predictions_2026.csv')
+    args = parser.parse_args()
+
+    df_predictions, df_teams, df_fixtures = fetch_fpl_data(predictions_path=args.predictions)
+    df_bounds, df_team_ranges = compute_bounds(df_fixtures, df_teams, df_predictions)
+    print(df_team_ranges.to_string(index=False))
+    print(df_bounds.to_string(index=False))
+
+if __name__ == '__main__':
+    main()
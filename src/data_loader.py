@@ -1,29 +1,60 @@
-import requests
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def fetch_fpl_data(predictions_path='data/epl_predictions_2026.csv'):
+from src.api_cache import get_json, BASE_URL, CACHE_TTL, CACHE_DIR, REPLAY_DIR
+from src.fpl_client import get_session
+from src.instrumentation import instrumented
+from src.predictions_store import load_prediction_store, store_to_frame
+
+ENDPOINTS = ['bootstrap-static/', 'fixtures/']
+
+def fetch_endpoints(endpoints=ENDPOINTS, **kwargs):
+    """Fetches the API endpoints concurrently over the shared session, so the wait is the slowest single call."""
+    session = get_session(pool_size=len(endpoints))
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as pool:
+        futures = {endpoint: pool.submit(get_json, endpoint, session=session, **kwargs) for endpoint in endpoints}
+        return {endpoint: future.result() for endpoint, future in futures.items()}
+
+def load_predictions(predictions_path='data/epl_predictions_2026.csv', df_teams=None):
     # predictions data from csv
-    predictions_path = 'data/epl_predictions_2026.csv'
     if not os.path.exists(predictions_path):
         raise FileNotFoundError(f"Missing predictions file at {predictions_path}")
-    df_predictions = pd.read_csv(predictions_path)
-    
-    # pull data from FPL API
-    base_url = 'https://fantasy.premierleague.com/api/'
+    if df_teams is None:
+        return pd.read_csv(predictions_path)
+    # with the FPL teams: aliases resolved, entries validated, read from the binary store when unchanged
+    return store_to_frame(load_prediction_store(predictions_path, df_teams))
+
+@instrumented()
+def fetch_api_data(base_url=BASE_URL, ttl=CACHE_TTL, cache_dir=CACHE_DIR, replay_dir=REPLAY_DIR):
+    # pull data from FPL API (through the on-disk cache, or recorded payloads in replay mode)
+    # a failing endpoint falls back to its last good payload, only a cold cache can fail here
     try:
-        bootstrap_data = requests.get(f'{base_url}bootstrap-static/', timeout=10).json()
-        fixtures_data = requests.get(f'{base_url}fixtures/', timeout=10).json()
+        payloads = fetch_endpoints(base_url=base_url, ttl=ttl, cache_dir=cache_dir, replay_dir=replay_dir)
     except Exception as e:
-        print(f"API Error: {e}")
-        return None, None, df_predictions
+        raise ConnectionError(f"FPL data unavailable and no cached copy to fall back on: {e}") from e
+    df_teams, df_fixtures = payloads_to_frames(payloads['bootstrap-static/'], payloads['fixtures/'])
+
+    print(f"FPL API data fetched: {len(df_fixtures)} fixtures")
 
+    return df_teams, df_fixtures
+
+def payloads_to_frames(bootstrap_data, fixtures_data):
     # Store as basic DataFrames
     df_teams = pd.DataFrame(bootstrap_data['teams'])[['id', 'name']]
     df_fixtures = pd.DataFrame(fixtures_data)
     df_fixtures['kickoff_time'] = pd.to_datetime(df_fixtures['kickoff_time']).dt.date
+    return df_teams, df_fixtures
 
+@instrumented()
+def fetch_fpl_data(predictions_path='data/epl_predictions_2026.csv', base_url=BASE_URL, ttl=CACHE_TTL,
+                   cache_dir=CACHE_DIR, replay_dir=REPLAY_DIR):
+    if not os.path.exists(predictions_path):
+        raise FileNotFoundError(f"Missing predictions file at {predictions_path}")
+    df_teams, df_fixtures = fetch_api_data(base_url=base_url, ttl=ttl, cache_dir=cache_dir, replay_dir=replay_dir)
+
+    # team names in the CSV are matched to the API's, so the teams are needed first
+    df_predictions = load_predictions(predictions_path, df_teams)
     print(f"Predictions data fetched: {len(df_predictions)} predictions")
-    print(f"FPL API data fetched: {len(df_fixtures)} fixtures")
 
-    return df_predictions, df_teams, df_fixtures
\ No newline at end of file
+    return df_predictions, df_teams, df_fixtures
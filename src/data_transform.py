@@ -1,16 +1,144 @@
+import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
+from src.scoring import DEFAULT_RULES
+from src.predictions_store import build_alias_index, resolve_team_columns
+
 def validate_team_names(df_predictions, df_teams):
-    """Checks if any names in the CSV don't match the official FPL names."""
-    official_names = set(df_teams['name'].unique())
-    prediction_names = set(df_predictions['team'].unique())
-    
-    mismatches = prediction_names - official_names
+    """Checks if any names in the CSV don't match the official FPL names or one of their known aliases."""
+    _, mismatches = resolve_team_columns(df_predictions['team'], build_alias_index(df_teams['name'].tolist()))
     if mismatches:
         print(f"Warning: teams in the CSV do not match the API: {mismatches}")
     return mismatches
 
+def get_team_results(df_fixtures):
+    """Turns every finished fixture into two team-result rows (home and away)."""
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+
+    home = pd.DataFrame({
+        'id': df_finished_only['team_h'].to_numpy(),
+        'event': df_finished_only['event'].to_numpy(),
+        'date': df_finished_only['kickoff_time'].to_numpy(),
+        'goals_scored': df_finished_only['team_h_score'].to_numpy(),
+        'goals_against': df_finished_only['team_a_score'].to_numpy(),
+    })
+    away = pd.DataFrame({
+        'id': df_finished_only['team_a'].to_numpy(),
+        'event': df_finished_only['event'].to_numpy(),
+        'date': df_finished_only['kickoff_time'].to_numpy(),
+        'goals_scored': df_finished_only['team_a_score'].to_numpy(),
+        'goals_against': df_finished_only['team_h_score'].to_numpy(),
+    })
+    df_results = pd.concat([home, away], ignore_index=True)
+
+    # 3 for a win, 1 for a draw, 0 for a loss
+    gs = df_results['goals_scored'].to_numpy()
+    ga = df_results['goals_against'].to_numpy()
+    df_results['points'] = np.select([gs > ga, gs == ga], [3, 1], 0).astype('int64')
+
+    return df_results
+
+def get_gameweek_dates(df_fixtures):
+    """Finish date of every gameweek with at least one finished match."""
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+    # find maximum date for every gameweek
+    df_gw_dates = df_finished_only.groupby('event')['kickoff_time'].max().reset_index()
+    df_gw_dates.columns = ['gameweek', 'gw_finish_date']
+    return df_gw_dates
+
+def get_cumulative_table(df_results, df_gw_dates, base_totals=None):
+    """
+    Cumulative points and goals for every team at each gameweek's finish date.
+    base_totals (id, played, points, goals_scored, goals_against) is added on top,
+    so a season can be continued from previously stored totals.
+    """
+    team_index = pd.Index(df_results['id'].unique())
+    if base_totals is not None:
+        team_index = team_index.union(pd.Index(base_totals['id']))
+    team_ids = team_index.sort_values()
+    team_codes = team_ids.get_indexer(df_results['id'])
+    date_codes, dates = pd.factorize(df_results['date'], sort=True)
+
+    # A gameweek snapshot counts every match played up to its finish date (postponed games included),
+    # so totals are accumulated by date and then read off at each gameweek's finish date.
+    def _cumulative(values, column):
+        grid = np.zeros((len(team_ids), len(dates)), dtype=values.dtype)
+        np.add.at(grid, (team_codes, date_codes), values)
+        totals = grid.cumsum(axis=1)
+        if base_totals is not None:
+            base = base_totals.set_index('id')[column].reindex(team_ids, fill_value=0).to_numpy()
+            totals = totals + base[:, None]
+        return totals
+
+    played = _cumulative(np.ones(len(df_results), dtype='int64'), 'played')
+    points = _cumulative(df_results['points'].to_numpy(), 'points')
+    goals_scored = _cumulative(df_results['goals_scored'].to_numpy(), 'goals_scored')
+    goals_against = _cumulative(df_results['goals_against'].to_numpy(), 'goals_against')
+
+    # Snapshot rows: (gameweek, team) for every team that has played by that gameweek
+    gw_cols = dates.get_indexer(df_gw_dates['gw_finish_date'])
+    gw_rows, team_rows = np.nonzero(played[:, gw_cols].T > 0)
+    date_cols = gw_cols[gw_rows]
+
+    df_cumulative = pd.DataFrame({
+        'id': team_ids.to_numpy()[team_rows],
+        'points': points[team_rows, date_cols],
+        'goals_scored': goals_scored[team_rows, date_cols],
+        'goals_against': goals_against[team_rows, date_cols],
+        'gameweek': df_gw_dates['gameweek'].to_numpy()[gw_rows],
+        'date': df_gw_dates['gw_finish_date'].to_numpy()[gw_rows],
+    })
+    # calculate goal difference
+    df_cumulative['goals_difference'] = df_cumulative['goals_scored'] - df_cumulative['goals_against']
+
+    return df_cumulative
+
+def rank_league_table(df_cumulative, df_teams):
+    """Adds team names and league positions to the cumulative table."""
+    # merge with team names
+    df_league = pd.merge(df_cumulative, df_teams, on='id').rename(columns={'name': 'team'})
+
+    # Rank within each gameweek: one stable lexsort on gameweek, then points/GD/GS descending
+    order = np.lexsort((
+        -df_league['goals_scored'].to_numpy(),
+        -df_league['goals_difference'].to_numpy(),
+        -df_league['points'].to_numpy(),
+        df_league['gameweek'].to_numpy(),
+    ))
+    df_league = df_league.iloc[order]
+
+    gw_sorted = df_league['gameweek'].to_numpy()
+    row_num = np.arange(len(df_league))
+    is_first = np.r_[True, gw_sorted[1:] != gw_sorted[:-1]] if len(df_league) else np.array([], dtype=bool)
+    group_start = np.maximum.accumulate(np.where(is_first, row_num, 0)) if len(df_league) else row_num
+    df_league['position'] = row_num - group_start + 1
+    df_league = df_league[['gameweek', 'date', 'position', 'team', 'points', 'goals_difference', 'goals_scored', 'goals_against']]
+
+    # already ordered by gameweek and position
+    return df_league
+
+@instrumented()
 def get_league_history(df_fixtures, df_teams):
+    # filter for finished matches only
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True].copy()
+    df_gw_dates = get_gameweek_dates(df_finished_only)
+
+    print(f"{len(df_gw_dates)} completed Gameweeks. Max date: {df_gw_dates['gw_finish_date'].max()}")
+
+    # 1. One row per team per finished match, built once
+    df_results = get_team_results(df_finished_only)
+    # 2. Running totals read off at each gameweek's finish date
+    df_cumulative = get_cumulative_table(df_results, df_gw_dates)
+    # 3. Team names and positions
+    df_league = rank_league_table(df_cumulative, df_teams)
+
+    print("Historical league table recreated")
+
+    return df_league
+
+def get_league_history_loop(df_fixtures, df_teams):
+    """Original loop-based table rebuild, kept as the reference for get_league_history."""
     # filter for finished matches only
     df_finished_only = df_fixtures[df_fixtures['finished'] == True].copy()
     # find maximum date for every gameweek
@@ -62,20 +190,17 @@ def get_league_history(df_fixtures, df_teams):
 
     return df_league.sort_values(['gameweek', 'position'])
 
-def calculate_leaderboard(df_league, df_predictions):
+@instrumented()
+def calculate_leaderboard(df_league, df_predictions, rules=DEFAULT_RULES, df_crowd=None):
+    # df_crowd (team, crowd_mean, crowd_std) can come from kept aggregates (src/aggregates.py)
     # Merge actual positions with predicted positions: row per gameweek, team, user
     df_merged = pd.merge(
         df_league[['gameweek', 'team', 'position']], 
         df_predictions, 
         on='team'
     )
-    # Scoring Parameters
-    PROXIMITY_MAX = 10 # Max points for proximity score
-    PROXIMITY_STEP = 2 # Points decrease per position away
-    PERFECT_MATCH_BONUS = 5 # Bonus for exact position
-    BOLD_THRESHOLD = 1.5 # Z-Score required for a bold choice
-    BOLD_ERROR = 0 # Max distance from actual to qualify for multiplier
-    BOLD_BONUS = 5.0 # Bonus points for a bold choice
+    # Scoring Parameters (see ScoringRules in src/scoring.py)
+    PROXIMITY_MAX, PROXIMITY_STEP, PERFECT_MATCH_BONUS, BOLD_THRESHOLD, BOLD_ERROR, BOLD_BONUS = rules
 
     # 1. Proximity Score calculation
     df_merged['predicted_difference'] = df_merged['position'] - df_merged['predicted_position']
@@ -88,9 +213,12 @@ def calculate_leaderboard(df_league, df_predictions):
     df_merged.loc[mask_perfect, 'perfect_match_score'] = PERFECT_MATCH_BONUS
 
     # 3. Statistical Boldness using z-score
-    df_stats = df_predictions.groupby('team')['predicted_position'].agg(['mean', 'std']).reset_index()
-    df_stats['std'] = df_stats['std'].replace(0, 1.0)
-    df_stats.columns = ['team', 'crowd_mean', 'crowd_std']
+    if df_crowd is None:
+        df_stats = df_predictions.groupby('team')['predicted_position'].agg(['mean', 'std']).reset_index()
+        df_stats['std'] = df_stats['std'].replace(0, 1.0)
+        df_stats.columns = ['team', 'crowd_mean', 'crowd_std']
+    else:
+        df_stats = df_crowd[['team', 'crowd_mean', 'crowd_std']]
     
     df_merged = pd.merge(df_merged, df_stats, on='team')
     
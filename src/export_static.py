@@ -0,0 +1,189 @@
+import os
+import json
+import html
+import shutil
+import argparse
+
+import numpy as np
+
+from src.data_loader import fetch_fpl_data
+from src.incremental import refresh_processed_data
+from src.snapshot_store import get_data_version
+from src.views import build_view_index, get_gameweek_view, DEEP_DIVE_COLS
+from src.plotting import plot_leaderboard_bar, plot_crowd_error, rank_history_options
+
+# src/export_static.py
+# Runs the pipeline once, without Streamlit, and writes a static site that any web
+# server or bucket can host (e.g. from a cron job after each matchday):
+#
+#     site/index.html                 <- links to every gameweek, opens the latest
+#     site/gw_<n>.html                <- cards, leaderboard, crowd error and rank history charts
+#     site/data/index.json            <- gameweeks and data version
+#     site/data/gw_<n>.json           <- leaderboard, cards and team errors
+#     site/data/gw_<n>_players.json   <- every player's deep-dive rows (pandas 'split' layout)
+#     site/data/rank_history.json     <- rank per gameweek for every player
+#
+# python -m src.export_static --out site
+
+PLOTLY_JS = 'https://cdn.plot.ly/plotly-2.35.2.min.js'
+ECHARTS_JS = 'https://cdn.jsdelivr.net/npm/echarts@5/dist/echarts.min.js'
+CSS_PATH = os.path.join('assets', 'style.css')
+# rank histories embedded in each page (the top of that gameweek's table), the rest is in rank_history.json
+HISTORY_PLAYERS = 50
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _write_json(path, payload):
+    with open(path, 'w') as f:
+        json.dump(payload, f, default=_json_default)
+
+def _records(df):
+    return json.loads(df.to_json(orient='records'))
+
+def _metric_cards(cards):
+    return '\n'.join(
+        f'<div class="metric-card"><div class="card-title">{html.escape(title)}</div>'
+        f'<div class="card-value">{html.escape(str(value))}</div></div>'
+        for title, value in cards
+    )
+
+def get_rank_histories(df_leaderboard):
+    """{name: [[gameweek, rank], ...]} for every player, in gameweek order."""
+    df = df_leaderboard[['name', 'gameweek', 'rank']].sort_values(['name', 'gameweek'])
+    names = df['name'].astype(str).to_numpy()
+    points = df[['gameweek', 'rank']].to_numpy().tolist()
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.array([], dtype=int)
+    ends = np.r_[starts[1:], len(names)]
+    return {names[s]: points[s:e] for s, e in zip(starts, ends)}
+
+def render_gameweek_page(gw, gw_view, df_leaderboard, histories, gameweeks, css, rank_matrix=None):
+    """One self-contained page for a gameweek; chart libraries come from a CDN."""
+    cards = gw_view['cards']
+    team_cards = gw_view['team_cards']
+    df_current_lb = gw_view['leaderboard']
+
+    bar_html = plot_leaderboard_bar(df_current_lb, gw).to_html(full_html=False, include_plotlyjs=False)
+    crowd_html = plot_crowd_error(gw_view['team_errors']).to_html(full_html=False, include_plotlyjs=False)
+    table_html = gw_view['display_lb'].to_html(index=False, border=0, classes='leaderboard', float_format='{:.0f}'.format)
+
+    # the first player's chart comes from the same options as the app, the select swaps in another history
+    players = [str(name) for name in df_current_lb['name'].head(HISTORY_PLAYERS)]
+    options = rank_history_options(df_leaderboard, players[0], gw, rank_matrix) if players else {}
+    page_histories = {name: [p for p in histories.get(name, []) if p[0] <= gw] for name in players}
+    player_options = '\n'.join(f'<option>{html.escape(name)}</option>' for name in players)
+    gw_links = ' '.join(f'<a href="gw_{g}.html">{g}</a>' for g in sorted(gameweeks))
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>PL Predictions 2026 - Gameweek {gw}</title>
+<script src="{PLOTLY_JS}"></script>
+<script src="{ECHARTS_JS}"></script>
+<style>{css}
+.cards {{ display: flex; gap: 12px; }} .cards .metric-card {{ flex: 1; }}
+body {{ font-family: Arial, sans-serif; max-width: 760px; margin: 0 auto; padding: 16px; }}
+table.leaderboard {{ width: 100%; border-collapse: collapse; text-align: center; }}
+table.leaderboard tr:nth-child(1) {{ background-color: rgba(255, 215, 0, 0.2); }}
+table.leaderboard tr:nth-child(2) {{ background-color: rgba(192, 192, 192, 0.2); }}
+table.leaderboard tr:nth-child(3) {{ background-color: rgba(205, 127, 50, 0.2); }}
+</style>
+</head>
+<body>
+<h1>PL Predictions 2026</h1>
+<p>Gameweek: {gw_links}</p>
+<h2>Gameweek {gw}</h2>
+<div class="cards">
+{_metric_cards([('🏆 Leader', cards['leader']), ('🔥 Biggest Riser', cards['biggest_gainer']), ('💀 Biggest Faller', cards['biggest_loser'])])}
+</div>
+<h3>Points</h3>
+{bar_html}
+{table_html}
+<h2>Rank History</h2>
+<select id="player">{player_options}</select>
+<div id="rank-history" style="height: 400px;"></div>
+<h2>Meta Analysis</h2>
+<div class="cards">
+{_metric_cards([('📉 Overestimated', team_cards['most_overestimated']), ('🚀 Underestimated', team_cards['most_underestimated']), ('🎯 Most Predictable', team_cards['most_predictable'])])}
+</div>
+{crowd_html}
+<p><a href="data/gw_{gw}.json">gw_{gw}.json</a> · <a href="data/gw_{gw}_players.json">gw_{gw}_players.json</a></p>
+<script>
+const histories = {json.dumps(page_histories, default=_json_default)};
+const chart = echarts.init(document.getElementById('rank-history'));
+const options = {json.dumps(options, default=_json_default)};
+chart.setOption(options);
+document.getElementById('player').addEventListener('change', (e) => {{
+  const points = histories[e.target.value] || [];
+  chart.setOption({{xAxis: {{data: points.map(p => p[0])}}, series: [{{data: points.map(p => p[1])}}]}});
+}});
+</script>
+</body>
+</html>
+"""
+
+def export_site(df_leaderboard, df_merged, output_dir, version=None, crowd=None):
+    """Writes the JSON data files and HTML pages for every gameweek into output_dir."""
+    views = build_view_index(df_leaderboard, df_merged, crowd)
+    histories = get_rank_histories(df_leaderboard)
+    css = open(CSS_PATH).read() if os.path.exists(CSS_PATH) else ''
+
+    # build next to the target and swap it in at the end, so a publish never picks up a half-written site
+    tmp_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    old_dir = f"{output_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, 'data'))
+
+    for gw in views['gameweeks']:
+        gw_view = get_gameweek_view(views, gw)
+        _write_json(os.path.join(tmp_dir, 'data', f"gw_{gw}.json"), {
+            'gameweek': gw,
+            'cards': gw_view['cards'],
+            'team_cards': gw_view['team_cards'],
+            'leaderboard': _records(gw_view['leaderboard']),
+            'team_errors': _records(gw_view['team_errors']),
+        })
+        df_players = df_merged[df_merged['gameweek'] == gw].sort_values(['name', 'position'])
+        df_players[['name'] + DEEP_DIVE_COLS].to_json(
+            os.path.join(tmp_dir, 'data', f"gw_{gw}_players.json"), orient='split', index=False)
+
+        page = render_gameweek_page(gw, gw_view, df_leaderboard, histories, views['gameweeks'], css, views['rank_matrix'])
+        with open(os.path.join(tmp_dir, f"gw_{gw}.html"), 'w', encoding='utf-8') as f:
+            f.write(page)
+
+    _write_json(os.path.join(tmp_dir, 'data', 'rank_history.json'), histories)
+    _write_json(os.path.join(tmp_dir, 'data', 'index.json'), {'version': version, 'gameweeks': views['gameweeks']})
+
+    latest = views['gameweeks'][0] if views['gameweeks'] else None
+    links = '\n'.join(f'<li><a href="gw_{gw}.html">Gameweek {gw}</a></li>' for gw in views['gameweeks'])
+    redirect = f'<meta http-equiv="refresh" content="0; url=gw_{latest}.html">' if latest is not None else ''
+    with open(os.path.join(tmp_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n{redirect}\n'
+                f'<title>PL Predictions 2026</title>\n</head>\n<body>\n<ul>\n{links}\n</ul>\n</body>\n</html>\n')
+
+    # two renames, not atomic: between them output_dir doesn't exist (a request then gets a 404),
+    # but that gap is one rename long instead of a whole rmtree, and no page is ever half-written
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"Static site written to {output_dir}: {len(views['gameweeks'])} gameweeks")
+    return output_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline once and write static leaderboard pages.")
+    parser.add_argument('--out', default='site', help="output folder (replaced on each run)")
+    parser.add_argument('--predictions', default='data/epl_predictions_2026.csv')
+    args = parser.parse_args()
+
+    df_predictions, df_teams, df_fixtures = fetch_fpl_data(predictions_path=args.predictions)
+    df_league, df_leaderboard, df_merged, crowd = refresh_processed_data(df_fixtures, df_teams, df_predictions,
+                                                                        return_crowd=True)
+    export_site(df_leaderboard, df_merged, args.out, version=get_data_version(df_fixtures, df_predictions), crowd=crowd)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import random
+import threading
+import time
+
+# src/fpl_client.py
+# Shared HTTP session for the FPL API: one connection pool for every call,
+# with retries and jittered exponential backoff for flaky responses.
+# requests is imported on the first call, so a start-up served from a snapshot never loads it.
+
+RETRIES = 3
+BACKOFF = 0.5  # seconds, doubled on every attempt
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size=4):
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'User-Agent': 'epl-prediction-game'})
+            _session = session
+    return _session
+
+def backoff_delay(attempt, backoff=BACKOFF):
+    # "full jitter": a random wait up to the exponential cap, so retries don't line up
+    return random.uniform(0, backoff * (2 ** attempt))
+
+def request_with_retry(url, headers=None, timeout=10, retries=RETRIES, backoff=BACKOFF, session=None):
+    """GET with retries on connection errors, timeouts and retryable status codes."""
+    import requests
+
+    session = session or get_session()
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            if response.status_code not in RETRY_STATUS:
+                return response
+            error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt < retries:
+            delay = backoff_delay(attempt, backoff)
+            print(f"API retry {attempt + 1}/{retries} for {url} in {delay:.2f}s: {error}")
+            time.sleep(delay)
+    raise error
@@ -0,0 +1,217 @@
+import os
+import pandas as pd
+
+from src.data_transform import (
+    get_team_results, get_gameweek_dates, get_cumulative_table,
+    rank_league_table, get_league_history, calculate_leaderboard
+)
+from src.schema import compact_frames, compare_memory
+from src.archive import get_season_label
+from src.scoring import build_prediction_matrix
+from src.aggregates import build_crowd_aggregates, add_predictions, add_league_table, trim_gameweeks, crowd_table
+
+# src/incremental.py
+# Keeps the processed season on disk so a refresh only folds in fixtures that
+# finished since the last run instead of rebuilding every gameweek. The crowd
+# aggregates (src/aggregates.py) are kept with it and get one row per new gameweek.
+# Changed predictions are diffed against the stored ones and only the added and
+# withdrawn picks go through the aggregates; the closed gameweeks are then rescored
+# from the stored league table (new crowd stats move every player's boldness).
+
+STATE_PATH = os.path.join('data', 'cache', 'pipeline_state.pkl')
+
+MOVEMENT_COLS = [
+    ('rank_movement', 'rank', -1),
+    ('rank_no_boldness_movement', 'rank_no_boldness', -1),
+    ('total_score_movement', 'total_score', 1),
+    ('total_score_no_boldness_movement', 'total_score_no_boldness', 1),
+]
+
+def load_state(state_path=STATE_PATH):
+    if not os.path.exists(state_path):
+        return None
+    try:
+        return pd.read_pickle(state_path)
+    except Exception as e:
+        print(f"Pipeline state unreadable, rebuilding: {e}")
+        return None
+
+def save_state(state, state_path=STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    pd.to_pickle(state, tmp_path)
+    os.replace(tmp_path, state_path)
+
+def predictions_fingerprint(df_predictions):
+    return int(pd.util.hash_pandas_object(df_predictions, index=False).sum())
+
+def apply_prediction_changes(crowd, df_old, df_new):
+    """Adds the picks only in df_new to the crowd aggregates and takes out the ones only in df_old."""
+    cols = ['name', 'team', 'predicted_position']
+    df_diff = df_old[cols].merge(df_new[cols], how='outer', indicator=True)
+    for side, sign in [('left_only', -1), ('right_only', 1)]:
+        _, predictions, _ = build_prediction_matrix(df_diff[df_diff['_merge'] == side], crowd['teams'])
+        add_predictions(crowd, predictions, sign=sign)
+    return crowd, int((df_diff['_merge'] != 'both').sum())
+
+def _team_ids(df_teams):
+    return tuple(sorted(int(i) for i in df_teams['id']))
+
+def get_closed_gameweek(df_fixtures):
+    """
+    (gameweek, date) to fold the season up to: the latest gameweek whose fixtures have all
+    finished and whose table, like every one before it, was taken before any later gameweek's.
+    A postponed match can finish a gameweek after the next ones were played; their tables
+    lie before its date and couldn't be recomputed from totals folded up to it.
+    (None, None) if there isn't one.
+    """
+    df_scheduled = df_fixtures[df_fixtures['event'].notna()]
+    all_finished = df_scheduled.groupby('event')['finished'].all()
+    finish_dates = get_gameweek_dates(df_scheduled).set_index('gameweek')['gw_finish_date'].sort_index()
+    fold_dates = finish_dates.cummax()
+    # earliest table date of the gameweeks after each one
+    next_dates = finish_dates[::-1].cummin()[::-1].shift(-1)
+    closed = all_finished.reindex(finish_dates.index, fill_value=False) & ~(next_dates <= fold_dates)
+    closed = closed[closed]
+    if not len(closed):
+        return None, None
+    return closed.index.max(), fold_dates[closed.index.max()]
+
+def _team_totals(df_results, base_totals=None):
+    df_results = df_results.assign(played=1)
+    cols = ['played', 'points', 'goals_scored', 'goals_against']
+    totals = df_results.groupby('id')[cols].sum().reset_index()
+    if base_totals is not None:
+        totals = pd.concat([base_totals, totals]).groupby('id')[cols].sum().reset_index()
+    return totals
+
+def _fix_first_movements(df_new_lb, df_prev_lb):
+    """The first new gameweek has no previous week in its own slice, so compare with the stored one."""
+    first_gw = df_new_lb['gameweek'].min()
+    mask = df_new_lb['gameweek'] == first_gw
+    prev = df_prev_lb.set_index('name')
+    for movement_col, col, sign in MOVEMENT_COLS:
+        prev_values = df_new_lb.loc[mask, 'name'].map(prev[col])
+        movement = sign * (df_new_lb.loc[mask, col] - prev_values)
+        df_new_lb.loc[mask, movement_col] = movement.fillna(0)
+    return df_new_lb
+
+def build_state(df_fixtures, df_teams, df_predictions):
+    """Full rebuild of the season, returning the state used for later incremental refreshes."""
+    df_league = get_league_history(df_fixtures, df_teams)
+    crowd = build_crowd_aggregates(df_league, df_predictions)
+    df_leaderboard, df_merged = calculate_leaderboard(df_league, df_predictions, df_crowd=crowd_table(crowd))
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+    return _close_state(df_fixtures, df_teams, df_predictions, df_finished_only, None, df_league, df_leaderboard, df_merged, crowd)
+
+def _close_state(df_fixtures, df_teams, df_predictions, df_candidates, prev_state, df_league, df_leaderboard, df_merged, crowd):
+    """
+    Moves the closed gameweek forward to the latest fully finished one and folds the
+    candidate fixtures played up to its finish date into the stored team totals.
+    """
+    state = {
+        # fixture ids restart every season, so the state only applies to this season and these teams
+        'season': get_season_label(df_fixtures),
+        'team_ids': _team_ids(df_teams),
+        'predictions_hash': predictions_fingerprint(df_predictions),
+        'df_predictions': df_predictions,
+        'closed_gw': None,
+        'closed_date': None,
+        'folded_fixture_ids': set(),
+        'team_totals': None,
+        # frames cover every processed gameweek, the open ones are recomputed on the next refresh
+        'df_league': df_league,
+        'df_leaderboard': df_leaderboard,
+        'df_merged': df_merged,
+        'crowd': crowd,
+    }
+    if prev_state is not None:
+        for key in ['closed_gw', 'closed_date', 'folded_fixture_ids', 'team_totals']:
+            state[key] = prev_state[key]
+
+    closed_gw, closed_date = get_closed_gameweek(df_fixtures)
+    if closed_gw is None or (state['closed_gw'] is not None and closed_gw <= state['closed_gw']):
+        return state
+
+    folded = df_candidates[df_candidates['kickoff_time'] <= closed_date]
+
+    state['closed_gw'] = closed_gw
+    state['closed_date'] = closed_date
+    state['folded_fixture_ids'] = state['folded_fixture_ids'] | set(folded['id'])
+    state['team_totals'] = _team_totals(get_team_results(folded), state['team_totals'])
+    return state
+
+def update_state(state, df_fixtures, df_teams, df_predictions):
+    """
+    Folds newly finished fixtures and changed predictions into the stored state.
+    Falls back to a full rebuild when a result lands in an already closed gameweek
+    (e.g. a postponed match), and when the season or the teams are not the stored ones.
+    """
+    if state is None or state['closed_gw'] is None or 'crowd' not in state or 'df_predictions' not in state:
+        print("Pipeline state: full rebuild")
+        return build_state(df_fixtures, df_teams, df_predictions)
+
+    season = get_season_label(df_fixtures)
+    if state.get('season') != season:
+        print(f"Pipeline state: stored for season {state.get('season')}, now {season}, full rebuild")
+        return build_state(df_fixtures, df_teams, df_predictions)
+    if state.get('team_ids') != _team_ids(df_teams):
+        print("Pipeline state: teams changed, full rebuild")
+        return build_state(df_fixtures, df_teams, df_predictions)
+
+    closed_gw, closed_date = state['closed_gw'], state['closed_date']
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+    df_new = df_finished_only[~df_finished_only['id'].isin(state['folded_fixture_ids'])]
+
+    # results that would rewrite a closed snapshot
+    retroactive = (df_new['event'] <= closed_gw) | (df_new['kickoff_time'] <= closed_date)
+    if retroactive.any():
+        print(f"Pipeline state: {int(retroactive.sum())} late results up to GW{int(closed_gw)}, full rebuild")
+        return build_state(df_fixtures, df_teams, df_predictions)
+
+    # keep closed gameweeks, recompute the open ones
+    df_league = state['df_league'][state['df_league']['gameweek'] <= closed_gw]
+    df_leaderboard = state['df_leaderboard'][state['df_leaderboard']['gameweek'] <= closed_gw]
+    df_merged = state['df_merged'][state['df_merged']['gameweek'] <= closed_gw]
+    crowd = trim_gameweeks(state['crowd'], closed_gw)
+
+    if state['predictions_hash'] != predictions_fingerprint(df_predictions):
+        crowd, n_changed = apply_prediction_changes(crowd, state['df_predictions'], df_predictions)
+        df_leaderboard, df_merged = calculate_leaderboard(df_league, df_predictions, df_crowd=crowd_table(crowd))
+        print(f"Pipeline state: {n_changed} picks added or withdrawn, rescored GW1-{int(closed_gw)}")
+
+    df_gw_dates = get_gameweek_dates(df_new)
+
+    if len(df_gw_dates):
+        df_results = get_team_results(df_new)
+        df_cumulative = get_cumulative_table(df_results, df_gw_dates, base_totals=state['team_totals'])
+        df_league_new = rank_league_table(df_cumulative, df_teams)
+        crowd = add_league_table(crowd, df_league_new)
+        df_leaderboard_new, df_merged_new = calculate_leaderboard(df_league_new, df_predictions, df_crowd=crowd_table(crowd))
+        df_prev_lb = df_leaderboard[df_leaderboard['gameweek'] == closed_gw]
+        df_leaderboard_new = _fix_first_movements(df_leaderboard_new, df_prev_lb)
+
+        df_league = pd.concat([df_league, df_league_new], ignore_index=True)
+        df_leaderboard = pd.concat([df_leaderboard, df_leaderboard_new], ignore_index=True)
+        df_merged = pd.concat([df_merged, df_merged_new], ignore_index=True)
+
+    print(f"Pipeline state: folded {len(df_new)} new fixtures after GW{int(closed_gw)}")
+
+    return _close_state(df_fixtures, df_teams, df_predictions, df_new, state, df_league, df_leaderboard, df_merged, crowd)
+
+def refresh_processed_data(df_fixtures, df_teams, df_predictions, state_path=STATE_PATH, return_crowd=False):
+    """
+    Loads the stored state, folds in new results and persists it again.
+    The frames come back (and are stored) in the compact schema from src/schema.py,
+    followed by the crowd aggregates with return_crowd=True.
+    """
+    state = update_state(load_state(state_path), df_fixtures, df_teams, df_predictions)
+    before = {name: state[name] for name in ['df_league', 'df_leaderboard', 'df_merged']}
+    state['df_league'], state['df_leaderboard'], state['df_merged'] = compact_frames(*before.values())
+    state['df_crowd'] = crowd_table(state['crowd'])
+    totals = compare_memory(before, {name: state[name] for name in before})
+    print(f"Compact schema: {totals.loc['total', 'before_bytes'] / 1e6:.1f} MB -> {totals.loc['total', 'after_bytes'] / 1e6:.1f} MB")
+    save_state(state, state_path)
+    if return_crowd:
+        return state['df_league'], state['df_leaderboard'], state['df_merged'], state['crowd']
+    return state['df_league'], state['df_leaderboard'], state['df_merged']
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import logging
+import cProfile
+import pstats
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
+
+# src/instrumentation.py
+# Per-stage metrics for the pipeline: wall time, input/output row counts, API payload
+# bytes and peak memory. Every stage run is logged as one JSON line on the
+# 'epl.pipeline' logger and aggregated for a Prometheus text export.
+#
+# PIPELINE_TRACE_MEMORY=1  per-stage peak memory via tracemalloc (slower); otherwise only
+#                          rss_highwater_growth_bytes, how far a stage pushed the process
+#                          high-water mark (0 when an earlier stage had already used more)
+# PIPELINE_PROFILE=path    cProfile one refresh and write the stats to path
+
+logger = logging.getLogger('epl.pipeline')
+
+TRACE_MEMORY = os.environ.get('PIPELINE_TRACE_MEMORY') == '1'
+PROFILE_PATH = os.environ.get('PIPELINE_PROFILE')
+
+_lock = threading.Lock()
+_stages = {} # stage -> aggregated metrics
+_counters = {} # (name, labels) -> value
+_local = threading.local() # .peaks: this thread's open traced stages, innermost last
+_open_peaks = {} # id -> peaks list of every thread with a traced stage open
+_tracing = {'ours': False} # tracemalloc was started here (not by the caller), so stop it here too
+
+def enable_structured_logs(level=logging.INFO):
+    """Sends the stage logs (one JSON object per line) to stderr."""
+    if not any(getattr(h, '_epl_pipeline', False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler._epl_pipeline = True
+        logger.addHandler(handler)
+    logger.setLevel(level)
+
+def count(name, value=1, **labels):
+    """Adds to a labelled counter, e.g. count('fpl_api_bytes', 1234, endpoint='fixtures/')."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def _counter_total(name):
+    with _lock:
+        return sum(v for (n, _), v in _counters.items() if n == name)
+
+def _rows(value):
+    """Total rows of the DataFrames in an argument list or return value."""
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_rows(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_rows(v) for v in value.values())
+    return 0
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss is kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _record(stage, metrics):
+    with _lock:
+        agg = _stages.setdefault(stage, {'runs': 0, 'seconds_total': 0.0})
+        agg['runs'] += 1
+        agg['seconds_total'] += metrics['seconds']
+        agg['last'] = metrics
+    logger.info(json.dumps({'event': 'stage', 'stage': stage, **metrics}, default=str))
+
+def _peak_stack():
+    # stages run on the refresh worker and on Streamlit's script threads at the same time,
+    # so each thread nests its own stages
+    if not hasattr(_local, 'peaks'):
+        _local.peaks = []
+    return _local.peaks
+
+@contextmanager
+def stage(name, rows_in=0):
+    """
+    Measures a block of pipeline work. The yielded dict can be given 'rows_out' (and any
+    other fields) inside the block; they are logged with the timings.
+    """
+    metrics = {'rows_in': rows_in, 'rows_out': 0}
+    bytes_before = _counter_total('fpl_api_bytes')
+    rss_before = _max_rss_bytes()
+    peaks = _peak_stack()
+    with _lock:
+        if TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['ours'] = True
+        traced = tracemalloc.is_tracing()
+        if traced:
+            # reset_peak() is process-wide: save the peak so far into every open stage, on any thread
+            current = tracemalloc.get_traced_memory()[1]
+            for open_peaks in _open_peaks.values():
+                open_peaks[:] = [max(peak, current) for peak in open_peaks]
+            tracemalloc.reset_peak()
+            peaks.append(0)
+            _open_peaks[id(peaks)] = peaks
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics['seconds'] = round(time.perf_counter() - start, 6)
+        metrics['payload_bytes'] = _counter_total('fpl_api_bytes') - bytes_before
+        if traced:
+            with _lock:
+                peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                else:
+                    del _open_peaks[id(peaks)]
+                if _tracing['ours'] and not _open_peaks:
+                    tracemalloc.stop()
+                    _tracing['ours'] = False
+            metrics['peak_memory_bytes'] = peak
+        if rss_before is not None:
+            metrics['rss_highwater_growth_bytes'] = _max_rss_bytes() - rss_before
+        _record(name, metrics)
+
+def instrumented(name=None):
+    """Decorator version of stage(): row counts come from the DataFrames passed in and returned."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, rows_in=_rows(args) + _rows(kwargs)) as metrics:
+                result = func(*args, **kwargs)
+                metrics['rows_out'] = _rows(result)
+            return result
+        return wrapper
+    return decorator
+
+def get_stage_metrics():
+    """Aggregated metrics per stage as a DataFrame (handy in the notebook)."""
+    with _lock:
+        rows = [{'stage': s, 'runs': agg['runs'], 'seconds_total': agg['seconds_total'], **agg['last']}
+                for s, agg in _stages.items()]
+    return pd.DataFrame(rows)
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+def render_prometheus():
+    """All stage metrics and counters in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        stages = {s: dict(agg) for s, agg in _stages.items()}
+        counters = dict(_counters)
+
+    gauges = [
+        ('epl_pipeline_stage_runs_total', 'counter', 'Stage runs', lambda a: a['runs']),
+        ('epl_pipeline_stage_seconds_total', 'counter', 'Total wall time per stage', lambda a: a['seconds_total']),
+        ('epl_pipeline_stage_last_seconds', 'gauge', 'Wall time of the last run', lambda a: a['last']['seconds']),
+        ('epl_pipeline_stage_last_rows_in', 'gauge', 'Input rows of the last run', lambda a: a['last']['rows_in']),
+        ('epl_pipeline_stage_last_rows_out', 'gauge', 'Output rows of the last run', lambda a: a['last']['rows_out']),
+        ('epl_pipeline_stage_last_payload_bytes', 'gauge', 'API bytes downloaded in the last run', lambda a: a['last']['payload_bytes']),
+        ('epl_pipeline_stage_last_peak_memory_bytes', 'gauge', 'Peak traced memory of the last run (PIPELINE_TRACE_MEMORY=1)', lambda a: a['last'].get('peak_memory_bytes')),
+        ('epl_pipeline_stage_last_rss_highwater_growth_bytes', 'gauge', 'Growth of the process RSS high-water mark in the last run', lambda a: a['last'].get('rss_highwater_growth_bytes')),
+    ]
+    for metric, kind, help_text, getter in gauges:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for s, agg in sorted(stages.items()):
+            value = getter(agg)
+            if value is not None:
+                lines.append(f'{metric}{{stage="{s}"}} {value}')
+
+    for name in sorted({n for n, _ in counters}):
+        lines += [f'# TYPE epl_{name}_total counter']
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f'epl_{name}_total{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+    """Writes the export for a textfile collector (atomically, so it is never read half-written)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+@contextmanager
+def capture_profile(path=PROFILE_PATH, top=25):
+    """cProfile everything inside the block; writes the stats to path and prints the top entries."""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+        print(f"Profile written to {path}")
@@ -0,0 +1,173 @@
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.api_cache import get_json, BASE_URL, CACHE_DIR
+from src.data_loader import fetch_api_data, load_predictions
+from src.scoring import (
+    build_prediction_matrix, get_crowd_stats, get_z_scores, score_positions, total_from_block, rank_desc,
+    DEFAULT_RULES
+)
+from src.simulation import final_positions
+
+# src/live.py
+# Provisional in-play standings. The fixtures endpoint is polled on a short interval
+# (a conditional request, so an unchanged payload costs a 304), diffed against the
+# previous payload by fixture id, and only the fixtures that changed are taken out
+# of / added back into the running team totals before the table is re-ranked.
+#
+# python -m src.live --interval 60
+
+POLL_INTERVAL = 60 # seconds
+# fields that change while a match is on; anything else changing is ignored
+LIVE_FIELDS = ['team_h', 'team_a', 'started', 'finished', 'finished_provisional', 'minutes', 'team_h_score', 'team_a_score']
+TOTAL_COLS = ['played', 'points', 'goals_scored', 'goals_against']
+
+def _has_score(fixture):
+    return fixture.get('team_h_score') is not None and fixture.get('team_a_score') is not None
+
+def _add_result(state, totals, fixture, sign):
+    """Adds (sign=1) or removes (sign=-1) one match from a team totals array (TOTAL_COLS x teams)."""
+    home = state['id_to_col'].get_loc(fixture['team_h'])
+    away = state['id_to_col'].get_loc(fixture['team_a'])
+    hs, aws = int(fixture['team_h_score']), int(fixture['team_a_score'])
+    h_pts = 3 if hs > aws else (1 if hs == aws else 0)
+    a_pts = 3 if aws > hs else (1 if hs == aws else 0)
+    totals[:, home] += sign * np.array([1, h_pts, hs, aws])
+    totals[:, away] += sign * np.array([1, a_pts, aws, hs])
+
+def _apply_fixture(state, fixture, sign):
+    # official = finished only (what get_league_history counts), provisional = anything with a score on the board
+    if fixture.get('finished') and _has_score(fixture):
+        _add_result(state, state['official'], fixture, sign)
+    if (fixture.get('started') or fixture.get('finished')) and _has_score(fixture):
+        _add_result(state, state['provisional'], fixture, sign)
+
+def start_live_state(fixtures_data, df_teams, df_predictions, rules=DEFAULT_RULES):
+    """Builds the live state from a raw fixtures payload (list of dicts)."""
+    df_teams = df_teams.sort_values('id')
+    teams = pd.Index(df_teams['name'])
+    users, predictions, _ = build_prediction_matrix(df_predictions, teams)
+    crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+    z_score = get_z_scores(predictions, crowd_mean, crowd_std)
+
+    state = {
+        'teams': teams,
+        'id_to_col': pd.Index(df_teams['id']),
+        'users': users,
+        'predictions': predictions,
+        'is_bold': (predictions > 0) & (z_score >= rules.bold_threshold),
+        'rules': rules,
+        'official': np.zeros((len(TOTAL_COLS), len(teams)), dtype='int64'),
+        'provisional': np.zeros((len(TOTAL_COLS), len(teams)), dtype='int64'),
+        'fixtures': {},
+        'standings': None,
+    }
+    apply_fixture_updates(state, fixtures_data)
+    return state
+
+def apply_fixture_updates(state, fixtures_data):
+    """
+    Diffs a fixtures payload against the previous one and folds in only the changed fixtures.
+    Returns the ids of the fixtures that changed.
+    """
+    changed = []
+    for fixture in fixtures_data:
+        live = {k: fixture.get(k) for k in LIVE_FIELDS}
+        previous = state['fixtures'].get(fixture['id'])
+        if previous == live:
+            continue
+        if previous is not None:
+            _apply_fixture(state, previous, -1)
+        _apply_fixture(state, live, 1)
+        state['fixtures'][fixture['id']] = live
+        changed.append(fixture['id'])
+
+    if changed:
+        state['standings'] = None
+    return changed
+
+def _table(state, totals):
+    played, points, goals_scored, goals_against = totals
+    goals_difference = goals_scored - goals_against
+    positions = final_positions(points[None, :], goals_difference[None, :], goals_scored[None, :])[0]
+    return positions, points, goals_difference, goals_scored
+
+def _user_scores(state, positions):
+    block = score_positions(positions[None, :], state['predictions'], state['is_bold'], state['rules'])
+    total_score = total_from_block(block, state['rules'])
+    return total_score[0], rank_desc(total_score)[0]
+
+def get_provisional_standings(state):
+    """
+    (df_table, df_scores): the provisional league table and every user's provisional score/rank,
+    each next to the official (finished matches only) numbers. Cached until the next change.
+    """
+    if state['standings'] is not None:
+        return state['standings']
+
+    positions, points, goals_difference, goals_scored = _table(state, state['provisional'])
+    official_positions = _table(state, state['official'])[0]
+
+    df_table = pd.DataFrame({
+        'position': positions,
+        'team': state['teams'],
+        'played': state['provisional'][0],
+        'points': points,
+        'goals_difference': goals_difference,
+        'goals_scored': goals_scored,
+        'official_position': official_positions,
+    })
+    df_table['position_movement'] = df_table['official_position'] - df_table['position']
+    df_table = df_table.sort_values('position').reset_index(drop=True)
+
+    score, rank = _user_scores(state, positions)
+    official_score, official_rank = _user_scores(state, official_positions)
+    df_scores = pd.DataFrame({
+        'name': state['users'],
+        'provisional_score': score,
+        'provisional_rank': rank,
+        'official_score': official_score,
+        'official_rank': official_rank,
+    })
+    df_scores['score_movement'] = df_scores['provisional_score'] - df_scores['official_score']
+    df_scores['rank_movement'] = df_scores['official_rank'] - df_scores['provisional_rank']
+    df_scores = df_scores.sort_values(['provisional_rank', 'name']).reset_index(drop=True)
+
+    state['standings'] = (df_table, df_scores)
+    return state['standings']
+
+def poll_once(state, base_url=BASE_URL, cache_dir=CACHE_DIR):
+    """One poll: conditional fetch of fixtures/, then only changed fixtures are reprocessed."""
+    fixtures_data = get_json('fixtures/', base_url=base_url, ttl=0, cache_dir=cache_dir, replay_dir=None)
+    return apply_fixture_updates(state, fixtures_data)
+
+def run_live(predictions_path='data/epl_predictions_2026.csv', interval=POLL_INTERVAL, base_url=BASE_URL,
+             cache_dir=CACHE_DIR, max_polls=None):
+    df_teams, _ = fetch_api_data(base_url=base_url, cache_dir=cache_dir)
+    df_predictions = load_predictions(predictions_path, df_teams)
+    fixtures_data = get_json('fixtures/', base_url=base_url, ttl=0, cache_dir=cache_dir, replay_dir=None)
+    state = start_live_state(fixtures_data, df_teams, df_predictions)
+
+    polls = 0
+    while True:
+        df_table, df_scores = get_provisional_standings(state)
+        print(df_scores.head(10).to_string(index=False))
+        polls += 1
+        if max_polls is not None and polls >= max_polls:
+            return state
+        time.sleep(interval)
+        changed = poll_once(state, base_url=base_url, cache_dir=cache_dir)
+        print(f"Live poll: {len(changed)} fixtures changed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Provisional in-play standings, refreshed by polling the FPL API.")
+    parser.add_argument('--predictions', default='data/epl_predictions_2026.csv')
+    parser.add_argument('--interval', type=int, default=POLL_INTERVAL, help="seconds between polls")
+    args = parser.parse_args()
+    run_live(args.predictions, interval=args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,34 @@
-import plotly.express as px
-import plotly.graph_objects as go
-import streamlit_echarts as st_echarts
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
 
 # src/plotting.py
+# plotly and streamlit_echarts are imported inside the chart functions: they take longer
+# to import than everything else the app needs for its first render.
+
+def _px():
+    import plotly.express as px
+    return px
+
+PODIUM_COLORS = ['#FFD700', '#C0C0C0', '#CD7F32'] # Gold, Silver, Bronze
+OTHER_COLOR = '#F64271' # Red for others
 
+@instrumented()
 def plot_leaderboard_bar(df_current_lb, selected_gw):
-    fig = px.bar(
+    # one trace with a colour per bar: color='name' made a trace per player, which is what
+    # made this chart slow to build (and cycled the podium colours) for big leagues
+    colors = (PODIUM_COLORS + [OTHER_COLOR] * len(df_current_lb))[:len(df_current_lb)]
+    fig = _px().bar(
         df_current_lb, 
         x='name', 
         y='total_score',
         text='total_score',  # 1. Add the text labels
         title=' ',
-        color='name', 
-        color_discrete_sequence=[
-            '#FFD700', '#C0C0C0', '#CD7F32', # Gold, Silver, Bronze
-            '#F64271', '#F64271', '#F64271', '#F64271' # Red for others
-        ]
     )
     
     fig.update_traces(
+        marker_color=colors,
         textposition='outside', # 2. Position the points above the bars
         cliponaxis=False,       # Prevents numbers at the top from being cut off
         textfont_size=12,
@@ -47,101 +57,120 @@ def plot_leaderboard_bar(df_current_lb, selected_gw):
     
     return fig
 
-def plot_crowd_error(df_merged, selected_gw):
-    meta_df = df_merged[df_merged['gameweek'] == selected_gw].groupby('team')['predicted_difference'].mean().reset_index()
-    meta_df = meta_df.sort_values('predicted_difference', ascending=True)
-    
-    fig = px.bar(
-        meta_df, 
-        x='predicted_difference', 
-        y='team', 
-        orientation='h',
-        color='predicted_difference', 
-        color_continuous_scale='Reds',
-        title="Average Error by Team (Lower is Better)"
-    )
-    fig.update_layout(
-        xaxis_title='Average Predicted Difference',
-        yaxis_title='Team',
-        font=dict(family='Arial', size=12),
-        title_font=dict(family='Arial', size=16),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        showlegend=False,
-        coloraxis_colorbar=dict(
-            title="Error",
-            tickvals=[meta_df['predicted_difference'].min(), meta_df['predicted_difference'].max()],
-            ticktext=['Low Error', 'High Error']
-        )
-    )
-    return fig
+# rank history: a season is at most 38 points per line, so the series are drawn as they are.
+# What grows with the league is handled by capping the chart at MAX_SERIES players, skipping
+# the entry animation above ANIMATION_MAX_USERS players and the one-per-rank grid lines when
+# ranks go past RANK_GRID_MAX.
+MAX_SERIES = 10
+ANIMATION_MAX_USERS = 200
+RANK_GRID_MAX = 20
+SERIES_COLORS = ['#E90052', '#37003C', '#00FF87', '#04F5FF', '#963CFF', '#FF9F1C', '#2EC4B6', '#8D99AE', '#6A4C93', '#1982C4']
 
-from streamlit_echarts import st_echarts
+def rank_history_options(df_leaderboard, user_name, selected_gw, rank_matrix=None):
+    """
+    ECharts options for one player's (or a list of players') rank up to selected_gw, rendered by
+    plot_rank_history or src/export_static.py. Pass the view index's rank_matrix to read the series
+    from the precomputed users x gameweeks array instead of filtering df_leaderboard.
+    """
+    from src.views import build_rank_matrix
 
-def plot_rank_history(df_leaderboard, user_name, selected_gw, key=None):
-    user_df = df_leaderboard[
-        (df_leaderboard['name'] == user_name) & 
-        (df_leaderboard['gameweek'] <= selected_gw)
-    ].sort_values('gameweek')
-    
-    x_data = user_df['gameweek'].tolist()
-    y_data = user_df['rank'].tolist()
+    names = [user_name] if isinstance(user_name, str) else list(user_name)[:MAX_SERIES]
+    if rank_matrix is None:
+        n_users = df_leaderboard['name'].nunique()
+        rank_matrix = build_rank_matrix(df_leaderboard[df_leaderboard['name'].isin(names)])
+    else:
+        n_users = len(rank_matrix['users'])
 
-    options = {
-        "animation": True,
-        "xAxis": {"type": "category", "data": x_data, "name": ""},
-        "yAxis": {
-            "type": "value", 
-            "inverse": True, 
-            "min": 1, 
-            "interval": 1,
-            "name": "",
-            "splitLine": {"show": False} # Clean up grid lines to show bands better
-        },
-        "series": [{
+    n_gw = int(np.searchsorted(rank_matrix['gameweeks'], selected_gw, side='right'))
+    rows = rank_matrix['users'].get_indexer(names)
+    ranks = rank_matrix['ranks'][rows[rows >= 0], :n_gw]
+    names = [name for name, row in zip(names, rows) if row >= 0]
+    # gameweeks where none of the players had an entry yet are left off, as before
+    shown = (ranks > 0).any(axis=0) if len(names) else np.zeros(n_gw, dtype=bool)
+
+    x_data = rank_matrix['gameweeks'][:n_gw][shown].tolist()
+    animate = n_users <= ANIMATION_MAX_USERS
+    max_rank = int(ranks.max()) if ranks.size else 1
+
+    series = []
+    for i, name in enumerate(names):
+        y_data = [int(r) if r else None for r in ranks[i][shown]]
+        series.append({
+            "name": name,
             "data": y_data,
             "type": "line",
             "smooth": True,
-            "lineStyle": {"width": 4, "color": "#E90052"},
-            "animationDuration": 3000,
-            "animationEasing": "cubicInOut",
-            # Add the horizontal bands here
-            "markArea": {
-                "silent": True, # Don't interfere with mouse tooltips
-                "data": [
-                    # Gold Band (Rank 1)
-                    [
-                        {"yAxis": 0.5, "itemStyle": {"color": "rgba(255, 215, 0, 0.15)"}}, 
-                        {"yAxis": 1.5}
-                    ],
-                    # Silver Band (Rank 2)
-                    [
-                        {"yAxis": 1.5, "itemStyle": {"color": "rgba(192, 192, 192, 0.15)"}}, 
-                        {"yAxis": 2.5}
-                    ],
-                    # Bronze Band (Rank 3)
-                    [
-                        {"yAxis": 2.5, "itemStyle": {"color": "rgba(205, 127, 50, 0.15)"}}, 
-                        {"yAxis": 3.5}
-                    ]
+            "connectNulls": True,
+            "lineStyle": {"width": 4 if i == 0 else 2, "color": SERIES_COLORS[i % len(SERIES_COLORS)]},
+            "itemStyle": {"color": SERIES_COLORS[i % len(SERIES_COLORS)]},
+        })
+        if animate:
+            series[-1].update({"animationDuration": 3000, "animationEasing": "cubicInOut"})
+
+    if series:
+        # Add the horizontal bands here
+        series[0]["markArea"] = {
+            "silent": True, # Don't interfere with mouse tooltips
+            "data": [
+                # Gold Band (Rank 1)
+                [
+                    {"yAxis": 0.5, "itemStyle": {"color": "rgba(255, 215, 0, 0.15)"}}, 
+                    {"yAxis": 1.5}
+                ],
+                # Silver Band (Rank 2)
+                [
+                    {"yAxis": 1.5, "itemStyle": {"color": "rgba(192, 192, 192, 0.15)"}}, 
+                    {"yAxis": 2.5}
+                ],
+                # Bronze Band (Rank 3)
+                [
+                    {"yAxis": 2.5, "itemStyle": {"color": "rgba(205, 127, 50, 0.15)"}}, 
+                    {"yAxis": 3.5}
                 ]
-            }
-        }]
+            ]
+        }
+
+    y_axis = {
+        "type": "value", 
+        "inverse": True, 
+        "min": 1, 
+        "name": "",
+        "splitLine": {"show": False} # Clean up grid lines to show bands better
     }
-    
+    if max_rank <= RANK_GRID_MAX:
+        y_axis["interval"] = 1
+
+    options = {
+        "animation": animate,
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {"type": "category", "data": x_data, "name": ""},
+        "yAxis": y_axis,
+        "series": series,
+    }
+    if len(series) > 1:
+        options["legend"] = {"data": names, "top": 0}
+    return options
+
+@instrumented()
+def plot_rank_history(df_leaderboard, user_name, selected_gw, key=None, rank_matrix=None):
+    """user_name can be a list to compare players (up to MAX_SERIES)."""
+    # imported here so the static export can build charts without streamlit
+    from streamlit_echarts import st_echarts
+
+    options = rank_history_options(df_leaderboard, user_name, selected_gw, rank_matrix)
     return st_echarts(options=options, height="400px", key=key)
 
-def plot_crowd_error(df_merged, selected_gw):
-    # 1. Aggregate error for all players per team
-    meta_df = df_merged[df_merged['gameweek'] == selected_gw].groupby('team').agg({
-        'predicted_difference': 'mean'
-    }).reset_index()
+@instrumented()
+def plot_crowd_error(team_errors):
+    # 1. Average error for all players per team: the gameweek's team_errors from the view index
+    # (src/aggregates.py get_gameweek_errors), no pass over df_merged
+    meta_df = team_errors[['team', 'predicted_difference']]
     
     # 2. Sort by difference to make the chart readable
     meta_df = meta_df.sort_values('predicted_difference', ascending=True)
 
     # 3. Create the bar chart
-    fig = px.bar(
+    fig = _px().bar(
         meta_df,
         x='predicted_difference',
         y='team',
@@ -169,3 +198,34 @@ def plot_crowd_error(df_merged, selected_gw):
     fig.add_vline(x=0, line_dash="solid", line_color="grey", opacity=0.2)
 
     return fig
+
+@instrumented()
+def plot_agreement(similarity, user_name, selected_gw):
+    # 1. The player's and the crowd consensus' rank correlation with the table, up to selected_gw
+    df_user = similarity['df_agreement']
+    df_user = df_user[(df_user['name'] == user_name) & (df_user['gameweek'] <= selected_gw)].assign(series=user_name)
+    df_crowd = similarity['df_crowd_agreement']
+    df_crowd = df_crowd[df_crowd['gameweek'] <= selected_gw].assign(series='Crowd consensus')
+    df_plot = pd.concat([df_user[['gameweek', 'spearman', 'series']], df_crowd[['gameweek', 'spearman', 'series']]])
+
+    # 2. Create the line chart
+    fig = _px().line(
+        df_plot,
+        x='gameweek',
+        y='spearman',
+        color='series',
+        title="Agreement with the Table<br><sup>Spearman correlation of the predicted order with the table each gameweek</sup>",
+        color_discrete_sequence=['#E90052', '#37003C'],
+        markers=True,
+    )
+
+    fig.update_layout(
+        xaxis_title="Gameweek",
+        yaxis_title="",
+        yaxis=dict(range=[-1, 1]),
+        legend_title_text='',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        margin=dict(l=10, r=10, t=50, b=10)
+    )
+    return fig
@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# src/predictions_store.py
+# Predictions CSV -> users x teams int8 matrix keyed by FPL team id.
+# The CSV is read in chunks, team names are resolved through an alias index (the official
+# FPL names plus common variants, e.g. "Nottingham Forest" for "Nott'm Forest") and every
+# entry is checked to be a complete 1..n permutation. The matrix is cached as an Arrow file,
+# so the next load of the same CSV is one read with no string joins.
+#
+# data/cache/predictions/<csv name>-<path hash>.arrow
+#     name, <team id>, <team id>, ...     <- one row per player, int8 predicted positions
+
+STORE_DIR = os.path.join('data', 'cache', 'predictions')
+CHUNK_ROWS = 500_000
+MAX_REPORTED = 10 # invalid entries listed in the warning, the rest are only counted
+
+# official FPL name -> other names people write
+TEAM_ALIASES = {
+    'Arsenal': ['Arsenal FC', 'The Arsenal'],
+    'Aston Villa': ['Villa'],
+    'Bournemouth': ['AFC Bournemouth'],
+    'Brentford': ['Brentford FC'],
+    'Brighton': ['Brighton & Hove Albion', 'Brighton and Hove Albion', 'Brighton Hove Albion'],
+    'Burnley': ['Burnley FC'],
+    'Chelsea': ['Chelsea FC'],
+    'Crystal Palace': ['Palace'],
+    'Everton': ['Everton FC'],
+    'Fulham': ['Fulham FC'],
+    'Ipswich': ['Ipswich Town'],
+    'Leeds': ['Leeds United', 'Leeds Utd'],
+    'Leicester': ['Leicester City'],
+    'Liverpool': ['Liverpool FC'],
+    'Luton': ['Luton Town'],
+    'Man City': ['Manchester City', 'Man. City'],
+    'Man Utd': ['Manchester United', 'Manchester Utd', 'Man United', 'Man. United'],
+    'Newcastle': ['Newcastle United', 'Newcastle Utd'],
+    "Nott'm Forest": ['Nottingham Forest', 'Nottm Forest', 'Notts Forest', 'Forest'],
+    'Sheffield Utd': ['Sheffield United'],
+    'Southampton': ['Southampton FC'],
+    'Spurs': ['Tottenham', 'Tottenham Hotspur'],
+    'Sunderland': ['Sunderland AFC'],
+    'West Ham': ['West Ham United', 'West Ham Utd'],
+    'Wolves': ['Wolverhampton', 'Wolverhampton Wanderers'],
+}
+
+def normalize_team_name(name):
+    """Lower case, '&' as 'and', punctuation dropped, single spaces: "Nott'm  Forest" -> "nottm forest"."""
+    name = str(name).lower().replace('&', ' and ')
+    return ' '.join(re.sub(r"[^a-z0-9 ]", '', name).split())
+
+def build_alias_index(team_names):
+    """{normalized name or alias: column} for the official team_names, in their order."""
+    index = {}
+    for column, team in enumerate(team_names):
+        for alias in [team] + TEAM_ALIASES.get(team, []):
+            index.setdefault(normalize_team_name(alias), column)
+    # official names win over another team's alias
+    index.update({normalize_team_name(team): column for column, team in enumerate(team_names)})
+    return index
+
+def resolve_team_columns(names, alias_index):
+    """Column of each team name (-1 when unknown); each distinct name is looked up once."""
+    codes, uniques = pd.factorize(pd.Series(names), use_na_sentinel=True)
+    lookup = np.array([alias_index.get(normalize_team_name(name), -1) for name in uniques] + [-1], dtype='int64')
+    return lookup[codes], {name for name, column in zip(uniques, lookup) if column < 0}
+
+def canonical_team_names(df_predictions, team_names):
+    """df_predictions with every known alias replaced by its official name (unknown names kept)."""
+    columns, _ = resolve_team_columns(df_predictions['team'], build_alias_index(team_names))
+    official = np.asarray(team_names, dtype=object)
+    df_predictions = df_predictions.copy()
+    df_predictions['team'] = np.where(columns >= 0, official[columns], df_predictions['team'].to_numpy(dtype=object))
+    return df_predictions
+
+def validate_picks(users, picks, duplicates):
+    """One row per invalid entry: (name, problem). A valid entry uses every position 1..n_teams once."""
+    n_teams = picks.shape[1]
+    complete = (np.sort(picks, axis=1) == np.arange(1, n_teams + 1)).all(axis=1)
+    problems = []
+    for u in np.flatnonzero(~complete | duplicates):
+        row = picks[u]
+        if duplicates[u]:
+            problem = "a team is picked more than once"
+        elif (row == 0).any():
+            problem = f"{int((row == 0).sum())} teams without a pick"
+        else:
+            problem = "positions are not 1-%d each used once" % n_teams
+        problems.append((users[u], problem))
+    return pd.DataFrame(problems, columns=['name', 'problem'])
+
+def ingest_predictions(predictions_path, df_teams, chunk_rows=CHUNK_ROWS, strict=False):
+    """
+    Reads a predictions CSV (name, team, predicted_position) in chunks into a store:
+    {'users': Index of names, 'team_ids': FPL ids, 'teams': official names, 'picks': users x teams int8}.
+    Entries that aren't a complete permutation, and rows without a player name, are left out
+    with a warning (ValueError when strict).
+    """
+    if not os.path.exists(predictions_path):
+        raise FileNotFoundError(f"Missing predictions file at {predictions_path}")
+    df_teams = df_teams.sort_values('id')
+    alias_index = build_alias_index(df_teams['name'].tolist())
+    n_teams = len(df_teams)
+
+    # 1. chunks -> (user code, team column, position) arrays; player codes in order of first appearance
+    user_codes = {}
+    parts = []
+    unknown_teams = set()
+    unnamed_rows = [] # CSV line numbers of rows without a name
+    reader = pd.read_csv(predictions_path, usecols=['name', 'team', 'predicted_position'],
+                         dtype={'name': str, 'team': str}, chunksize=chunk_rows)
+    rows_read = 0
+    for chunk in reader:
+        # factorize gives a missing name code -1, which would file the row under another player
+        unnamed = (chunk['name'].fillna('').str.strip() == '').to_numpy()
+        if unnamed.any():
+            unnamed_rows += (rows_read + np.flatnonzero(unnamed) + 2).tolist() # + header, 1-based
+            chunk = chunk[~unnamed]
+        rows_read += len(unnamed)
+        codes, uniques = pd.factorize(chunk['name'])
+        to_global = np.array([user_codes.setdefault(name, len(user_codes)) for name in uniques], dtype='int64')
+        columns, unknown = resolve_team_columns(chunk['team'], alias_index)
+        unknown_teams |= unknown
+        parts.append((to_global[codes], columns, chunk['predicted_position'].to_numpy()))
+
+    users = pd.Index(list(user_codes), dtype=object)
+    u = np.concatenate([p[0] for p in parts]) if parts else np.array([], dtype='int64')
+    t = np.concatenate([p[1] for p in parts]) if parts else np.array([], dtype='int64')
+    position = np.concatenate([p[2] for p in parts]) if parts else np.array([], dtype='int64')
+
+    # 2. users x teams matrix; unknown teams and out-of-range positions stay 0 (= no pick)
+    known = (t >= 0) & (position >= 1) & (position <= n_teams)
+    picks = np.zeros((len(users), n_teams), dtype='int8')
+    picks[u[known], t[known]] = position[known]
+    pair_counts = np.bincount(u[known] * n_teams + t[known], minlength=len(users) * n_teams)
+    duplicates = (pair_counts.reshape(len(users), n_teams) > 1).any(axis=1)
+
+    # 3. every row needs a name and every entry has to be a full permutation of 1..n_teams
+    if unknown_teams:
+        print(f"Warning: teams in the CSV do not match the API: {unknown_teams}")
+    if unnamed_rows:
+        lines = ', '.join(map(str, unnamed_rows[:MAX_REPORTED])) + (', ...' if len(unnamed_rows) > MAX_REPORTED else '')
+        message = f"{len(unnamed_rows)} rows without a player name (lines {lines})"
+        if strict:
+            raise ValueError(message)
+        print(f"Warning: {message}; they are left out")
+    df_problems = validate_picks(users, picks, duplicates)
+    if len(df_problems):
+        listed = '; '.join(f"{name}: {problem}" for name, problem in df_problems.head(MAX_REPORTED).itertuples(index=False))
+        message = f"{len(df_problems)} of {len(users)} prediction entries are invalid ({listed})"
+        if strict:
+            raise ValueError(message)
+        print(f"Warning: {message}; they are left out")
+        valid = ~users.isin(df_problems['name'])
+        users, picks = users[valid], picks[valid]
+
+    return {
+        'users': users,
+        'team_ids': df_teams['id'].to_numpy(),
+        'teams': df_teams['name'].tolist(),
+        'picks': picks,
+    }
+
+def _source_key(predictions_path, df_teams):
+    """Changes when the CSV is modified or the FPL teams are different."""
+    stat = os.stat(predictions_path)
+    teams = df_teams.sort_values('id')[['id', 'name']].to_numpy().tolist()
+    return hashlib.sha256(json.dumps([stat.st_size, stat.st_mtime_ns, teams]).encode()).hexdigest()[:16]
+
+def get_store_path(predictions_path, store_dir=STORE_DIR):
+    name = os.path.splitext(os.path.basename(predictions_path))[0]
+    path_hash = hashlib.sha256(os.path.abspath(predictions_path).encode()).hexdigest()[:8]
+    return os.path.join(store_dir, f"{name}-{path_hash}.arrow")
+
+def write_prediction_store(store, path, source_key):
+    columns = {'name': pa.array(store['users'].astype(str), type=pa.string())}
+    for i, team_id in enumerate(store['team_ids']):
+        columns[str(team_id)] = pa.array(store['picks'][:, i], type=pa.int8())
+    table = pa.table(columns).replace_schema_metadata({
+        'source_key': source_key,
+        'teams': json.dumps(store['teams']),
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def read_prediction_store(path):
+    """(store, source_key) from an Arrow store file, (None, None) when there is none."""
+    if not os.path.exists(path):
+        return None, None
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    meta = table.schema.metadata or {}
+    team_cols = table.column_names[1:]
+    store = {
+        'users': pd.Index(table.column('name').to_numpy(zero_copy_only=False), dtype=object),
+        'team_ids': np.array([int(c) for c in team_cols]),
+        'teams': json.loads(meta.get(b'teams', b'[]')),
+        # one int8 block instead of a column at a time
+        'picks': np.column_stack([table.column(c).to_numpy() for c in team_cols]).astype('int8', copy=False)
+                 if team_cols else np.zeros((table.num_rows, 0), dtype='int8'),
+    }
+    return store, meta.get(b'source_key', b'').decode()
+
+def load_prediction_store(predictions_path, df_teams, store_dir=STORE_DIR):
+    """The store for a predictions CSV: read from store_dir when the CSV hasn't changed, else ingested and written."""
+    if not os.path.exists(predictions_path):
+        raise FileNotFoundError(f"Missing predictions file at {predictions_path}")
+    path = get_store_path(predictions_path, store_dir)
+    source_key = _source_key(predictions_path, df_teams)
+    store, stored_key = read_prediction_store(path)
+    if store is not None and stored_key == source_key:
+        return store
+
+    store = ingest_predictions(predictions_path, df_teams)
+    write_prediction_store(store, path, source_key)
+    print(f"Predictions store written: {len(store['users'])} players -> {path}")
+    return store
+
+def store_to_frame(store):
+    """Long df_predictions (name, team, predicted_position) with official team names, each entry in pick order."""
+    n_users, n_teams = store['picks'].shape
+    order = np.argsort(store['picks'], axis=1, kind='stable')
+    return pd.DataFrame({
+        'name': np.repeat(store['users'].to_numpy(), n_teams),
+        'team': np.asarray(store['teams'], dtype=object)[order].ravel(),
+        'predicted_position': np.take_along_axis(store['picks'], order, axis=1).ravel().astype('int64'),
+    })
+
+def get_prediction_matrix(store, teams):
+    """
+    (users, predictions, source_row) for src.scoring, with columns in the order of teams
+    (official names), straight from the store. source_row is the row in store_to_frame(store).
+    """
+    columns = pd.Index(store['teams']).get_indexer(teams)
+    predictions = np.zeros((len(store['users']), len(teams)), dtype='int8')
+    predictions[:, columns >= 0] = store['picks'][:, columns[columns >= 0]]
+
+    n_teams = store['picks'].shape[1]
+    order = np.argsort(np.argsort(store['picks'], axis=1, kind='stable'), axis=1)
+    rows = np.arange(len(store['users']))[:, None] * n_teams + order
+    source_row = np.full(predictions.shape, -1, dtype='int64')
+    source_row[:, columns >= 0] = rows[:, columns[columns >= 0]]
+
+    # src.scoring keeps players in name order
+    by_name = np.argsort(store['users'].to_numpy(dtype=str), kind='stable')
+    return pd.Index(store['users'][by_name]), predictions[by_name], source_row[by_name]
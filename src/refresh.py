@@ -0,0 +1,114 @@
+import time
+import threading
+
+import pandas as pd
+
+# src/refresh.py
+# Background refresh timed by the fixture list instead of a fixed TTL.
+# Results only change when matches finish, so the worker sleeps until a match is due to be
+# over (kickoff + MATCH_LENGTH + REFRESH_DELAY, FPL confirms results a little after the
+# final whistle), then rechecks every RECHECK_INTERVAL until the fixture is marked finished.
+# With no match coming up (international break, off-season) it checks every IDLE_INTERVAL,
+# in case fixtures were moved.
+# The refresh runs on a daemon thread and its result replaces the current value in a single
+# assignment: a reader keeps the version it started with, and nobody waits for the pipeline.
+
+MATCH_LENGTH = 2 * 3600 # kickoff to final whistle, half-time and stoppages included
+REFRESH_DELAY = 30 * 60 # FPL marks a fixture finished once bonus points are confirmed
+RECHECK_INTERVAL = 15 * 60 # a match is over but not marked finished yet
+GIVE_UP_AFTER = 12 * 3600 # after kickoff: suspended or abandoned matches stop being rechecked
+IDLE_INTERVAL = 12 * 3600 # longest sleep between checks
+RETRY_DELAY = 5 * 60 # after a failed refresh, doubled on every failure in a row (up to IDLE_INTERVAL)
+MIN_INTERVAL = 60
+
+def _matches(n):
+    return f"{n} match" if n == 1 else f"{n} matches"
+
+def next_refresh_time(fixtures_data, now=None):
+    """(unix time of the next refresh, why) from a raw fixtures payload (list of dicts)."""
+    now = time.time() if now is None else now
+    df_fixtures = pd.DataFrame(list(fixtures_data), columns=['kickoff_time', 'finished'])
+    df_pending = df_fixtures[(df_fixtures['finished'] != True) & df_fixtures['kickoff_time'].notna()]
+    kickoff = (pd.to_datetime(df_pending['kickoff_time'], utc=True) - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+    due = kickoff + MATCH_LENGTH + REFRESH_DELAY
+
+    overdue = (due <= now) & (now - kickoff < GIVE_UP_AFTER)
+    if overdue.any():
+        return now + RECHECK_INTERVAL, f"{_matches(int(overdue.sum()))} over, waiting for FPL to mark them finished"
+
+    upcoming = due[due > now]
+    if upcoming.empty:
+        return now + IDLE_INTERVAL, "no match due to finish"
+    if upcoming.min() - now > IDLE_INTERVAL:
+        return now + IDLE_INTERVAL, f"next match finishes in {(upcoming.min() - now) / 86400:.1f} days"
+    batch = int((upcoming <= upcoming.min() + MATCH_LENGTH).sum())
+    return max(upcoming.min(), now + MIN_INTERVAL), f"{_matches(batch)} due to finish"
+
+def _format_time(at):
+    return time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(at))
+
+def start_refresh_worker(refresh, current=None, fixtures_data=None, name='data-refresh'):
+    """
+    Runs refresh(current) -> (value, fixtures_data) on a daemon thread, timed by next_refresh_time.
+    refresh returns the new value (or current when nothing changed) and the fixtures payload it
+    used. Without fixtures_data the first run starts straight away. Returns the worker dict:
+    - 'current': the value to serve, swapped in one assignment after each refresh
+    - 'ready': set once there is a value
+    - 'next_at', 'reason', 'runs', 'last_run', 'last_error'
+    """
+    worker = {
+        'current': current,
+        'ready': threading.Event(),
+        'wake': threading.Event(),
+        'stop': threading.Event(),
+        'runs': 0,
+        'failures': 0,
+        'last_run': None,
+        'last_error': None,
+    }
+    if current is not None:
+        worker['ready'].set()
+    if fixtures_data is None:
+        worker['next_at'], worker['reason'] = time.time(), "first refresh"
+    else:
+        worker['next_at'], worker['reason'] = next_refresh_time(fixtures_data)
+
+    worker['thread'] = threading.Thread(target=_run_worker, args=(worker, refresh), name=name, daemon=True)
+    worker['thread'].start()
+    return worker
+
+def _run_worker(worker, refresh):
+    while not worker['stop'].is_set():
+        worker['wake'].wait(max(0, worker['next_at'] - time.time()))
+        worker['wake'].clear()
+        if worker['stop'].is_set():
+            break
+        try:
+            value, fixtures_data = refresh(worker['current'])
+        except Exception as e:
+            # keep serving what we have, try again later
+            worker['failures'] += 1
+            worker['last_error'] = f"{type(e).__name__}: {e}"
+            delay = min(RETRY_DELAY * 2 ** (worker['failures'] - 1), IDLE_INTERVAL)
+            worker['next_at'], worker['reason'] = time.time() + delay, "retry after a failed refresh"
+            print(f"Refresh failed ({worker['last_error']}), next try at {_format_time(worker['next_at'])}")
+            continue
+
+        worker['current'] = value
+        worker['ready'].set()
+        worker['runs'] += 1
+        worker['failures'] = 0
+        worker['last_error'] = None
+        worker['last_run'] = time.time()
+        worker['next_at'], worker['reason'] = next_refresh_time(fixtures_data)
+        print(f"Next refresh at {_format_time(worker['next_at'])}: {worker['reason']}")
+
+def refresh_now(worker):
+    """Moves the next refresh to now (e.g. after the predictions CSV was replaced)."""
+    worker['next_at'] = time.time()
+    worker['wake'].set()
+
+def stop_refresh_worker(worker, timeout=None):
+    worker['stop'].set()
+    worker['wake'].set()
+    worker['thread'].join(timeout)
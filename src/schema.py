@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from src.scoring import DEFAULT_RULES, get_crowd_stats
+
+# src/schema.py
+# Compact column types for the processed frames. The long df_merged frame has a row
+# per gameweek x team x player, so object strings and 64-bit numbers add up quickly on
+# hosted tiers with a RAM cap. Names and teams become categoricals, positions and
+# per-row scores int8, and the crowd stats are kept once per team (df_crowd) instead
+# of on every row.
+
+LEAGUE_SCHEMA = {
+    'gameweek': 'int8',
+    'position': 'int8',
+    'team': 'category',
+    'points': 'int16',
+    'goals_difference': 'int16',
+    'goals_scored': 'int16',
+    'goals_against': 'int16',
+}
+
+LEADERBOARD_SCHEMA = {
+    'gameweek': 'int8',
+    'name': 'category',
+    'proximity_score': 'int16',
+    'perfect_match_score': 'int16',
+    'boldness_score': 'int16',
+    'total_score': 'int16',
+    'total_score_no_boldness': 'int16',
+    'rank': 'int32',
+    'rank_no_boldness': 'int32',
+    'rank_movement': 'int32',
+    'rank_no_boldness_movement': 'int32',
+    'total_score_movement': 'int16',
+    'total_score_no_boldness_movement': 'int16',
+}
+
+MERGED_SCHEMA = {
+    'gameweek': 'int8',
+    'team': 'category',
+    'position': 'int8',
+    'name': 'category',
+    'predicted_position': 'int8',
+    'predicted_difference': 'int8',
+    'proximity_score': 'int8',
+    'perfect_match_score': 'int8',
+    'boldness_score': 'int8',
+    'total_score': 'int8',
+}
+
+# score columns, stored as float32 instead when the rules can give fractional points
+SCORE_COLS = [
+    'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score', 'total_score_no_boldness',
+    'total_score_movement', 'total_score_no_boldness_movement',
+]
+
+# per-row columns of df_merged that are dropped: crowd stats live in df_crowd and the
+# rest can be derived again with add_derived_columns
+DERIVED_COLS = ['crowd_mean', 'crowd_std', 'z_score', 'total_score_no_boldness']
+
+def enforce_schema(df, schema, frame_name='frame'):
+    """
+    Casts the columns in schema to their compact type. Raises ValueError instead of
+    silently truncating when a value is missing, fractional or out of range.
+    """
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            raise ValueError(f"{frame_name}: missing column '{col}'")
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+            continue
+
+        values = df[col].to_numpy()
+        if len(values) and pd.isna(values).any():
+            raise ValueError(f"{frame_name}.{col}: missing values can't be stored as {dtype}")
+        if np.dtype(dtype).kind == 'f':
+            df[col] = values.astype(dtype)
+            continue
+        info = np.iinfo(dtype)
+        if len(values):
+            if values.dtype.kind == 'f' and not np.array_equal(values, np.round(values)):
+                raise ValueError(f"{frame_name}.{col}: fractional values can't be stored as {dtype}")
+            if values.min() < info.min or values.max() > info.max:
+                raise ValueError(f"{frame_name}.{col}: values {values.min()}..{values.max()} don't fit {dtype}")
+        df[col] = values.astype(dtype)
+    return df
+
+def get_crowd_table(df_predictions):
+    """Crowd mean and std (0 replaced with 1) of the predicted position, one row per team."""
+    teams = pd.Index(sorted(df_predictions['team'].unique()))
+    crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+    return pd.DataFrame({'team': teams, 'crowd_mean': crowd_mean, 'crowd_std': crowd_std})
+
+def score_schema(schema, rules=DEFAULT_RULES):
+    """schema with the score columns as float32 unless every point value in rules is a whole number."""
+    points = [rules.proximity_max, rules.proximity_step, rules.perfect_match_bonus, rules.bold_bonus]
+    if all(float(p).is_integer() for p in points):
+        return schema
+    return {col: 'float32' if col in SCORE_COLS else dtype for col, dtype in schema.items()}
+
+def compact_frames(df_league, df_leaderboard, df_merged, rules=DEFAULT_RULES):
+    """The three processed frames in the compact schema (df_merged without DERIVED_COLS), scored with rules."""
+    df_league = enforce_schema(df_league, LEAGUE_SCHEMA, 'df_league')
+    df_leaderboard = enforce_schema(df_leaderboard, score_schema(LEADERBOARD_SCHEMA, rules), 'df_leaderboard')
+    df_merged = enforce_schema(df_merged.drop(columns=DERIVED_COLS, errors='ignore'), score_schema(MERGED_SCHEMA, rules), 'df_merged')
+    return df_league, df_leaderboard, df_merged
+
+def add_derived_columns(df_merged, df_crowd):
+    """Puts the per-row crowd stats, z_score and total_score_no_boldness back (float64, as calculate_leaderboard makes them)."""
+    crowd = df_crowd.set_index('team')
+    teams = df_merged['team'].astype(object)
+    df_merged = df_merged.assign(
+        crowd_mean=teams.map(crowd['crowd_mean']).to_numpy(),
+        crowd_std=teams.map(crowd['crowd_std']).to_numpy(),
+    )
+    df_merged['z_score'] = (df_merged['predicted_position'].astype(float) - df_merged['crowd_mean']).abs() / df_merged['crowd_std']
+    proximity = df_merged['proximity_score']
+    df_merged['total_score_no_boldness'] = proximity.astype('int64' if proximity.dtype.kind in 'iu' else 'float64') + df_merged['perfect_match_score']
+    return df_merged
+
+def memory_report(frames):
+    """Deep memory use of each frame (dict of name -> DataFrame), one row per column."""
+    rows = []
+    for name, df in frames.items():
+        usage = df.memory_usage(deep=True, index=True)
+        for col, size in usage.items():
+            rows.append({
+                'frame': name,
+                'column': col,
+                'dtype': str(df.index.dtype if col == 'Index' else df[col].dtype),
+                'bytes': int(size),
+            })
+    return pd.DataFrame(rows, columns=['frame', 'column', 'dtype', 'bytes'])
+
+def compare_memory(before, after):
+    """Bytes per frame before and after compacting, with the reduction factor."""
+    totals = pd.DataFrame({
+        'before_bytes': memory_report(before).groupby('frame')['bytes'].sum(),
+        'after_bytes': memory_report(after).groupby('frame')['bytes'].sum(),
+    }).fillna(0).astype('int64')
+    totals.loc['total'] = totals.sum()
+    totals['factor'] = (totals['before_bytes'] / totals['after_bytes']).round(1)
+    return totals
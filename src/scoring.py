@@ -0,0 +1,259 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+from src.aggregates import new_crowd_aggregates, add_predictions, get_crowd_mean_std
+
+# src/scoring.py
+# Array version of calculate_leaderboard for large leagues.
+# Predictions are held as a users x teams int8 matrix and actual positions as a
+# gameweeks x teams int8 matrix (0 = no entry), so scoring is plain broadcasting
+# instead of a gameweek x team x user long frame.
+
+# Scoring Parameters (same rules as calculate_leaderboard)
+PROXIMITY_MAX = 10 # Max points for proximity score
+PROXIMITY_STEP = 2 # Points decrease per position away
+PERFECT_MATCH_BONUS = 5 # Bonus for exact position
+BOLD_THRESHOLD = 1.5 # Z-Score required for a bold choice
+BOLD_ERROR = 0 # Max distance from actual to qualify for multiplier
+BOLD_BONUS = 5.0 # Bonus points for a bold choice
+
+# One rule set. Every scoring function takes rules=..., so alternatives can be compared
+# (see src/what_if.py), e.g. DEFAULT_RULES._replace(bold_bonus=3.0)
+ScoringRules = namedtuple('ScoringRules', [
+    'proximity_max', 'proximity_step', 'perfect_match_bonus', 'bold_threshold', 'bold_error', 'bold_bonus'
+])
+DEFAULT_RULES = ScoringRules(PROXIMITY_MAX, PROXIMITY_STEP, PERFECT_MATCH_BONUS, BOLD_THRESHOLD, BOLD_ERROR, BOLD_BONUS)
+
+def build_position_matrix(df_league, teams):
+    """gameweeks x teams matrix of actual league positions."""
+    gameweeks = pd.Index(np.sort(df_league['gameweek'].unique()))
+    positions = np.zeros((len(gameweeks), len(teams)), dtype='int8')
+    g = gameweeks.get_indexer(df_league['gameweek'])
+    t = teams.get_indexer(df_league['team'])
+    positions[g, t] = df_league['position'].to_numpy()
+    return gameweeks, positions
+
+def build_prediction_matrix(df_predictions, teams):
+    """users x teams matrix of predicted positions, plus each entry's row in df_predictions."""
+    df_known = df_predictions[df_predictions['team'].isin(teams)]
+    users = pd.Index(np.sort(df_known['name'].unique()))
+    u = users.get_indexer(df_known['name'])
+    t = teams.get_indexer(df_known['team'])
+    predictions = np.zeros((len(users), len(teams)), dtype='int8')
+    predictions[u, t] = df_known['predicted_position'].to_numpy()
+    source_row = np.full((len(users), len(teams)), -1, dtype='int64')
+    source_row[u, t] = np.arange(len(df_predictions))[df_predictions['team'].isin(teams).to_numpy()]
+    return users, predictions, source_row
+
+def get_crowd_stats(df_predictions, teams):
+    """Mean and std of the crowd's pick for each team (std of 0 replaced with 1)."""
+    df_stats = df_predictions.groupby('team')['predicted_position'].agg(['mean', 'std'])
+    df_stats['std'] = df_stats['std'].replace(0, 1.0)
+    df_stats = df_stats.reindex(teams)
+    return df_stats['mean'].to_numpy(), df_stats['std'].to_numpy()
+
+def get_matrix_crowd_stats(predictions):
+    """get_crowd_stats from a users x teams matrix (0 = no pick) instead of the long frame."""
+    crowd = add_predictions(new_crowd_aggregates(range(predictions.shape[1])), predictions)
+    return get_crowd_mean_std(crowd)
+
+def get_z_scores(predictions, crowd_mean, crowd_std):
+    """users x teams distance of each pick from the crowd, in crowd standard deviations."""
+    return np.abs(predictions - crowd_mean[None, :]) / crowd_std[None, :]
+
+def rank_desc(values):
+    """rank(method='min', ascending=False) along the last axis of a 2D array, for every row at once."""
+    order = np.argsort(-values, axis=1, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=1)
+    col = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+    is_new = np.ones(values.shape, dtype=bool)
+    is_new[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    # tied values share the rank of the first of their run
+    run_start = np.maximum.accumulate(np.where(is_new, col, 0), axis=1)
+    ranks = np.empty(values.shape, dtype='int64')
+    np.put_along_axis(ranks, order, run_start + 1, axis=1)
+    return ranks
+
+def _movement(values, present):
+    """Change on the previous gameweek, 0 where there is no previous week."""
+    movement = np.zeros(values.shape)
+    movement[1:] = values[1:] - values[:-1]
+    movement[1:][~present[:-1]] = 0
+    return movement
+
+def get_proximity_lut(max_distance, rules=DEFAULT_RULES):
+    """Proximity points for each absolute distance 0..max_distance, floored at 0."""
+    return np.clip(rules.proximity_max - np.arange(max_distance + 1) * rules.proximity_step, 0, None)
+
+def score_positions(positions, predictions, is_bold, rules=DEFAULT_RULES):
+    """
+    Scores a block of league tables (rows x teams, 0 = team not in the table) against every
+    user's predictions. Returns per row/user proximity points, perfect matches, bold hits
+    and whether the user had any team in that table.
+    """
+    n_teams = predictions.shape[1]
+    max_distance = max(n_teams, 1)
+    proximity_lut = get_proximity_lut(max_distance, rules)
+    if np.array_equal(proximity_lut, np.round(proximity_lut)):
+        proximity_lut = proximity_lut.astype('int16') # keeps the rows x users x teams lookup small
+
+    pos = positions[:, None, :]
+    valid = (pos > 0) & (predictions > 0)[None, :, :]
+    distance = np.abs(pos.astype('int16') - predictions[None, :, :])
+    distance = np.minimum(distance, max_distance)
+
+    return {
+        'proximity': np.where(valid, proximity_lut[distance], 0).sum(axis=2),
+        'perfect': (valid & (distance == 0)).sum(axis=2),
+        'bold_hits': (valid & (distance <= rules.bold_error) & is_bold[None, :, :]).sum(axis=2),
+        'present': valid.any(axis=2),
+    }
+
+def total_from_block(block, rules=DEFAULT_RULES):
+    """Total score from a score_positions block."""
+    return block['proximity'] + block['perfect'] * rules.perfect_match_bonus + block['bold_hits'] * rules.bold_bonus
+
+def get_league_matrix(df_league):
+    """(gameweeks, teams, positions) for df_league, shared by every league scored against it."""
+    teams = pd.Index(np.sort(df_league['team'].unique()))
+    gameweeks, positions = build_position_matrix(df_league, teams)
+    return gameweeks, teams, positions
+
+def score_predictions(df_league, df_predictions, chunk_size=8, league_matrix=None, rules=DEFAULT_RULES,
+                      prediction_matrix=None):
+    """
+    Scores every user at every gameweek on the dense matrices.
+    Returns a dict of arrays keyed by gameweek/user axes, used by leaderboard_from_scores
+    and get_merged_view. Pass a precomputed league_matrix to skip rebuilding it from df_league,
+    and a prediction_matrix (see src/predictions_store.py) to skip building it from df_predictions.
+    """
+    gameweeks, teams, positions = league_matrix if league_matrix is not None else get_league_matrix(df_league)
+    if prediction_matrix is not None:
+        users, predictions, source_row = prediction_matrix
+        crowd_mean, crowd_std = get_matrix_crowd_stats(predictions)
+    else:
+        users, predictions, source_row = build_prediction_matrix(df_predictions, teams)
+        crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+
+    has_pick = predictions > 0
+    z_score = get_z_scores(predictions, crowd_mean, crowd_std)
+    is_bold = has_pick & (z_score >= rules.bold_threshold)
+
+    n_gw, n_users = len(gameweeks), len(users)
+    proximity = np.zeros((n_gw, n_users), dtype=np.result_type(rules.proximity_max, rules.proximity_step))
+    perfect = np.zeros((n_gw, n_users), dtype='int64')
+    bold_hits = np.zeros((n_gw, n_users), dtype='int64')
+    present = np.zeros((n_gw, n_users), dtype=bool)
+
+    # a few gameweeks at a time keeps the gameweeks x users x teams block small
+    for start in range(0, n_gw, chunk_size):
+        block = score_positions(positions[start:start + chunk_size], predictions, is_bold, rules)
+        proximity[start:start + chunk_size] = block['proximity']
+        perfect[start:start + chunk_size] = block['perfect']
+        bold_hits[start:start + chunk_size] = block['bold_hits']
+        present[start:start + chunk_size] = block['present']
+
+    perfect_match_score = perfect * rules.perfect_match_bonus
+    boldness_score = bold_hits * rules.bold_bonus
+    total_score_no_boldness = proximity + perfect_match_score
+    total_score = total_score_no_boldness + boldness_score
+
+    # absent users sort below everyone (-inf) so they don't shift the ranks, then become NaN
+    rank = np.where(present, rank_desc(np.where(present, total_score, -np.inf)), np.nan)
+    rank_no_boldness = np.where(present, rank_desc(np.where(present, total_score_no_boldness, -np.inf)), np.nan)
+
+    return {
+        'rules': rules,
+        'gameweeks': gameweeks,
+        'users': users,
+        'teams': teams,
+        'positions': positions,
+        'predictions': predictions,
+        'source_row': source_row,
+        'crowd_mean': crowd_mean,
+        'crowd_std': crowd_std,
+        'z_score': z_score,
+        'is_bold': is_bold,
+        'present': present,
+        'proximity_score': proximity,
+        'perfect_match_score': perfect_match_score,
+        'boldness_score': boldness_score,
+        'total_score': total_score,
+        'total_score_no_boldness': total_score_no_boldness,
+        'rank': rank,
+        'rank_no_boldness': rank_no_boldness,
+        'rank_movement': _movement(-rank, present),
+        'rank_no_boldness_movement': _movement(-rank_no_boldness, present),
+        'total_score_movement': _movement(total_score.astype(float), present),
+        'total_score_no_boldness_movement': _movement(total_score_no_boldness.astype(float), present),
+    }
+
+def leaderboard_from_scores(scores):
+    """Long df_leaderboard frame (same layout as calculate_leaderboard) from the score arrays."""
+    g, u = np.nonzero(scores['present'])
+    df_leaderboard = pd.DataFrame({
+        'gameweek': scores['gameweeks'].to_numpy()[g],
+        'name': scores['users'].to_numpy()[u],
+    })
+    for col in ['proximity_score', 'perfect_match_score', 'boldness_score', 'total_score', 'total_score_no_boldness',
+                'rank', 'rank_no_boldness', 'rank_movement', 'rank_no_boldness_movement',
+                'total_score_movement', 'total_score_no_boldness_movement']:
+        df_leaderboard[col] = scores[col][g, u]
+    return df_leaderboard.sort_values(['gameweek', 'total_score'], ascending=[True, False])
+
+def get_merged_view(scores, df_predictions, gameweeks=None, names=None):
+    """
+    Long-form df_merged rows (gameweek x team x user) for just the requested gameweeks/users,
+    for the deep-dive views. Same columns as calculate_leaderboard's df_merged.
+    """
+    g_idx = np.arange(len(scores['gameweeks'])) if gameweeks is None else scores['gameweeks'].get_indexer(gameweeks)
+    u_idx = np.arange(len(scores['users'])) if names is None else scores['users'].get_indexer(names)
+    g_idx, u_idx = g_idx[g_idx >= 0], u_idx[u_idx >= 0]
+
+    positions = scores['positions'][g_idx][:, None, :]
+    predictions = scores['predictions'][u_idx][None, :, :]
+    valid = (positions > 0) & (predictions > 0)
+    g, u, t = np.nonzero(valid)
+    g, u = g_idx[g], u_idx[u]
+
+    position = scores['positions'][g, t].astype('int64')
+    predicted = scores['predictions'][u, t].astype('int64')
+    difference = position - predicted
+    rules = scores['rules']
+    proximity = np.clip(rules.proximity_max - np.abs(difference) * rules.proximity_step, 0, None)
+    perfect = np.where(difference == 0, rules.perfect_match_bonus, 0)
+    boldness = np.where(scores['is_bold'][u, t] & (np.abs(difference) <= rules.bold_error), rules.bold_bonus, 0.0)
+
+    df_merged = pd.DataFrame({
+        'gameweek': scores['gameweeks'].to_numpy()[g],
+        'team': scores['teams'].to_numpy()[t],
+        'position': position,
+        'name': scores['users'].to_numpy()[u],
+        'predicted_position': predicted,
+        'predicted_difference': difference,
+        'proximity_score': proximity,
+        'perfect_match_score': perfect,
+        'crowd_mean': scores['crowd_mean'][t],
+        'crowd_std': scores['crowd_std'][t],
+        'z_score': scores['z_score'][u, t],
+        'boldness_score': boldness,
+        'total_score': proximity + perfect + boldness,
+        'total_score_no_boldness': proximity + perfect,
+    })
+    # same row order as the merge in calculate_leaderboard: league order, then file order
+    order = np.lexsort((scores['source_row'][u, t], position, g))
+    return df_merged.iloc[order].reset_index(drop=True)
+
+@instrumented()
+def calculate_leaderboard_fast(df_league, df_predictions, return_merged=True, rules=DEFAULT_RULES):
+    """Drop-in for calculate_leaderboard; skip the long df_merged frame with return_merged=False."""
+    scores = score_predictions(df_league, df_predictions, rules=rules)
+    df_leaderboard = leaderboard_from_scores(scores)
+    df_merged = get_merged_view(scores, df_predictions) if return_merged else None
+
+    print("Leaderboard calculated")
+
+    return df_leaderboard, df_merged
@@ -0,0 +1,164 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+from src.scoring import get_league_matrix, build_prediction_matrix
+from src.snapshot_store import write_snapshot, load_snapshot
+
+# src/similarity.py
+# Who predicted alike. Every prediction (and every actual table) is turned into a unit
+# vector so a dot product is a rank correlation:
+# - Spearman: centred ranks / their norm       -> dot = Spearman's rho
+# - Kendall: sign of every pair of teams / norm -> dot = Kendall's tau-b
+# All-pairs similarity is then a users x users matrix product, done a block of users at a
+# time so memory stays at block x users however big the league is. Only per-player
+# summaries (closest player, mean similarity, agreement with the crowd and with the
+# actual table each gameweek) are kept, and they are cached per data version.
+#
+# data/cache/similarity/<version>/df_similarity.arrow, df_agreement.arrow, df_crowd_agreement.arrow
+
+SIMILARITY_DIR = os.path.join('data', 'cache', 'similarity')
+BLOCK_USERS = 512 # rows of the users x users product held at once
+
+def _average_ranks(values):
+    """Ranks along each row (ties get the average rank), as float."""
+    return pd.DataFrame(values).rank(axis=1, method='average').to_numpy(dtype='float64', copy=True)
+
+def spearman_vectors(ranks):
+    """Rows of ranks -> unit vectors whose dot products are Spearman correlations (NaN row when constant)."""
+    centred = ranks - ranks.mean(axis=1, keepdims=True)
+    norm = np.linalg.norm(centred, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (centred / norm).astype('float32')
+
+def kendall_vectors(ranks):
+    """Rows of ranks -> unit vectors of pairwise orderings whose dot products are Kendall's tau-b."""
+    i, j = np.triu_indices(ranks.shape[1], k=1)
+    signs = np.sign(ranks[:, i] - ranks[:, j])
+    norm = np.linalg.norm(signs, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (signs / norm).astype('float32')
+
+def blocked_neighbours(vectors, block_users=BLOCK_USERS):
+    """
+    For every row: the most similar other row, that similarity, and the mean similarity to
+    all other rows. Only a block_users x users slice of the similarity matrix exists at a time.
+    """
+    n = len(vectors)
+    nearest = np.full(n, -1, dtype='int64')
+    nearest_sim = np.full(n, np.nan, dtype='float32')
+    valid = ~np.isnan(vectors).any(axis=1)
+    clean = np.where(valid[:, None], vectors, 0)
+
+    for start in range(0, n, block_users):
+        sims = clean[start:start + block_users] @ clean.T
+        rows = np.arange(len(sims))
+        sims[rows, start + rows] = -np.inf # not your own twin
+        sims[:, ~valid] = -np.inf
+        if n > 1:
+            nearest[start:start + len(sims)] = sims.argmax(axis=1)
+            nearest_sim[start:start + len(sims)] = sims[rows, nearest[start:start + len(sims)]]
+
+    # mean over the other rows without the matrix: (v . sum(v) - v . v) / (n - 1)
+    n_valid = valid.sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_sim = (clean @ clean.sum(axis=0) - (clean * clean).sum(axis=1)) / (n_valid - 1)
+    no_twin = ~valid | (n_valid < 2)
+    nearest_sim[no_twin] = np.nan
+    mean_sim[~valid] = np.nan
+    nearest[no_twin] = -1
+    return nearest, nearest_sim, mean_sim.astype('float32')
+
+def pair_similarity(vectors, rows):
+    """Full similarity matrix for a handful of rows (e.g. the players picked in the app)."""
+    return vectors[rows] @ vectors[rows].T
+
+def get_prediction_ranks(df_merged, teams):
+    """(users, users x teams ranks of their picks) from the latest gameweek of df_merged, NaN rows when incomplete."""
+    latest = df_merged['gameweek'].max()
+    df_picks = df_merged.loc[df_merged['gameweek'] == latest, ['name', 'team', 'predicted_position']]
+    df_picks = df_picks.astype({'name': str, 'team': str})
+    users, predictions, _ = build_prediction_matrix(df_picks, teams)
+    ranks = _average_ranks(predictions)
+    # a player missing a team has no well-defined ranking, they get NaN similarities
+    ranks[(predictions == 0).any(axis=1)] = np.nan
+    return users, ranks
+
+@instrumented()
+def compute_similarity(df_league, df_merged, block_users=BLOCK_USERS):
+    """
+    Per-player and per-gameweek rank agreement as three frames:
+    - df_similarity: closest player and mean similarity (Spearman and Kendall), agreement with the crowd
+    - df_agreement: every player's correlation with the actual table at every gameweek
+    - df_crowd_agreement: the same for the crowd consensus (teams ordered by mean pick)
+    """
+    gameweeks, teams, positions = get_league_matrix(df_league)
+    teams = pd.Index(teams.astype(str))
+    users, ranks = get_prediction_ranks(df_merged, teams)
+    names = users.to_numpy(dtype=object)
+
+    # 1. player vs player
+    frames = {'name': names}
+    user_vectors = {'spearman': spearman_vectors(ranks), 'kendall': kendall_vectors(ranks)}
+    for method, vectors in user_vectors.items():
+        nearest, nearest_sim, mean_sim = blocked_neighbours(vectors, block_users)
+        frames[f'closest_{method}'] = np.where(nearest >= 0, names[np.maximum(nearest, 0)], None)
+        frames[f'closest_{method}_value'] = nearest_sim
+        frames[f'mean_{method}'] = mean_sim
+
+    # 2. player vs crowd consensus
+    complete = ~np.isnan(ranks).any(axis=1)
+    crowd_ranks = _average_ranks(ranks[complete].mean(axis=0)[None, :]) if complete.any() else np.full((1, len(teams)), np.nan)
+    crowd_vectors = {'spearman': spearman_vectors(crowd_ranks), 'kendall': kendall_vectors(crowd_ranks)}
+    for method, vectors in user_vectors.items():
+        frames[f'crowd_{method}'] = (vectors @ crowd_vectors[method].T)[:, 0]
+    df_similarity = pd.DataFrame(frames)
+    # 1 = the player whose picks are least like everyone else's
+    df_similarity['contrarian_rank'] = df_similarity['mean_spearman'].rank(method='min').astype('Int32')
+
+    # 3. players and crowd vs the actual table, every gameweek (teams without a position yet are left out)
+    table_ranks = _average_ranks(np.where(positions > 0, positions, np.nan))
+    agreement = {}
+    crowd_agreement = {}
+    for method, build in [('spearman', spearman_vectors), ('kendall', kendall_vectors)]:
+        table_vectors = build(table_ranks)
+        agreement[method] = user_vectors[method] @ table_vectors.T # users x gameweeks
+        crowd_agreement[method] = (crowd_vectors[method] @ table_vectors.T)[0]
+
+    df_agreement = pd.DataFrame({
+        'gameweek': np.tile(gameweeks.to_numpy(), len(users)).astype('int8'),
+        'name': np.repeat(names, len(gameweeks)),
+        'spearman': agreement['spearman'].ravel(),
+        'kendall': agreement['kendall'].ravel(),
+    })
+    df_crowd_agreement = pd.DataFrame({
+        'gameweek': gameweeks.to_numpy().astype('int8'),
+        'spearman': crowd_agreement['spearman'],
+        'kendall': crowd_agreement['kendall'],
+    })
+    return {'df_similarity': df_similarity, 'df_agreement': df_agreement, 'df_crowd_agreement': df_crowd_agreement}
+
+def get_similarity(df_league, df_merged, version, similarity_dir=SIMILARITY_DIR):
+    """compute_similarity for a data version, read back from similarity_dir when it was already computed."""
+    if version is not None and os.path.exists(os.path.join(similarity_dir, version, 'meta.json')):
+        frames, _ = load_snapshot(version, snapshot_dir=similarity_dir)
+        if frames is not None:
+            return frames
+    frames = compute_similarity(df_league, df_merged)
+    if version is not None:
+        write_snapshot(frames, version, similarity_dir)
+    return frames
+
+def get_similarity_cards(similarity):
+    """Most alike pair, most contrarian player and the player closest to the crowd."""
+    df = similarity['df_similarity'].dropna(subset=['closest_spearman_value'])
+    if df.empty:
+        return {'most_alike': "-", 'most_contrarian': "-", 'closest_to_crowd': "-"}
+    twin = df.loc[df['closest_spearman_value'].idxmax()]
+    return {
+        'most_alike': f"{twin['name']} & {twin['closest_spearman']}",
+        'most_contrarian': df.loc[df['mean_spearman'].idxmin(), 'name'],
+        'closest_to_crowd': df.loc[df['crowd_spearman'].idxmax(), 'name'],
+    }
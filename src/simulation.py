@@ -0,0 +1,186 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data_transform import get_team_results
+from src.scoring import (
+    build_prediction_matrix, get_crowd_stats, get_z_scores, score_positions, total_from_block, rank_desc,
+    DEFAULT_RULES
+)
+
+# src/simulation.py
+# Monte Carlo end-of-season simulator: "who can still win?"
+# The unplayed fixtures are simulated many times with Poisson goals from each team's
+# attack/defence strength so far, every simulated final table is scored with the
+# leaderboard rules, and the chance of each player finishing 1st/2nd/3rd is reported.
+
+PRIOR_GAMES = 5 # Games of league-average form mixed into each team's strength early in the season
+DEFAULT_HOME_GOALS = 1.5 # Used before any match has been played
+DEFAULT_AWAY_GOALS = 1.2
+
+def get_team_strengths(df_fixtures, teams_by_id):
+    """
+    Attack and defence multipliers per team (1.0 = league average) from finished matches,
+    plus the league's average home and away goals per game.
+    """
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+    df_results = get_team_results(df_finished_only)
+
+    if len(df_finished_only):
+        home_goals = df_finished_only['team_h_score'].mean()
+        away_goals = df_finished_only['team_a_score'].mean()
+    else:
+        home_goals, away_goals = DEFAULT_HOME_GOALS, DEFAULT_AWAY_GOALS
+    league_avg = (home_goals + away_goals) / 2
+
+    totals = df_results.groupby('id').agg(
+        games=('points', 'size'), goals_scored=('goals_scored', 'sum'), goals_against=('goals_against', 'sum')
+    ).reindex(teams_by_id, fill_value=0)
+
+    # shrink towards the league average so a couple of early results don't dominate
+    games = totals['games'].to_numpy() + PRIOR_GAMES
+    attack = (totals['goals_scored'].to_numpy() + PRIOR_GAMES * league_avg) / games / league_avg
+    defence = (totals['goals_against'].to_numpy() + PRIOR_GAMES * league_avg) / games / league_avg
+    return attack, defence, home_goals, away_goals
+
+def get_current_totals(df_fixtures, teams_by_id):
+    """Points, goal difference and goals scored per team from the finished matches."""
+    df_results = get_team_results(df_fixtures[df_fixtures['finished'] == True])
+    totals = df_results.groupby('id')[['points', 'goals_scored', 'goals_against']].sum().reindex(teams_by_id, fill_value=0)
+    points = totals['points'].to_numpy().astype('int64')
+    goals_scored = totals['goals_scored'].to_numpy().astype('int64')
+    goals_difference = goals_scored - totals['goals_against'].to_numpy().astype('int64')
+    return points, goals_difference, goals_scored
+
+def final_positions(points, goals_difference, goals_scored):
+    """League positions for every simulated table (sims x teams), ties broken by team id like the league table."""
+    # one sortable key per team: points first, then goal difference, then goals scored
+    key = points * 1_000_000 + (goals_difference + 1000) * 1000 + goals_scored
+    order = np.argsort(-key, axis=1, kind='stable')
+    positions = np.empty(key.shape, dtype='int8')
+    np.put_along_axis(positions, order, np.arange(1, key.shape[1] + 1, dtype='int8')[None, :], axis=1)
+    return positions
+
+def _simulate_chunk(seed, n_sims, model):
+    """Simulates n_sims seasons and returns the counts needed for the probabilities."""
+    rng = np.random.default_rng(seed)
+    n_teams = len(model['points'])
+    n_users = model['predictions'].shape[0]
+
+    home_goals = rng.poisson(model['lambda_home'], size=(n_sims, len(model['lambda_home'])))
+    away_goals = rng.poisson(model['lambda_away'], size=(n_sims, len(model['lambda_away'])))
+    home_points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    away_points = np.where(away_goals > home_goals, 3, np.where(home_goals == away_goals, 1, 0))
+
+    # fixture -> team incidence matrices turn per-fixture results into per-team totals with one matmul
+    # (float matmul goes through BLAS; the counts are small whole numbers so the cast back is exact)
+    home_onehot, away_onehot = model['home_onehot'], model['away_onehot']
+    def _to_teams(home_values, away_values):
+        totals = home_values.astype('float64') @ home_onehot + away_values.astype('float64') @ away_onehot
+        return np.rint(totals).astype('int64')
+
+    points = model['points'] + _to_teams(home_points, away_points)
+    new_scored = _to_teams(home_goals, away_goals)
+    new_against = _to_teams(away_goals, home_goals)
+    goals_scored = model['goals_scored'] + new_scored
+    goals_difference = model['goals_difference'] + new_scored - new_against
+
+    positions = final_positions(points, goals_difference, goals_scored)
+    block = score_positions(positions, model['predictions'], model['is_bold'], model['rules'])
+    total_score = total_from_block(block, model['rules'])
+    ranks = rank_desc(total_score)
+
+    place_counts = np.stack([(ranks == place).sum(axis=0) for place in (1, 2, 3)], axis=1)
+    flat = (np.arange(n_teams)[None, :] * n_teams + positions - 1).ravel()
+    position_counts = np.bincount(flat, minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+
+    return {
+        'place_counts': place_counts,
+        'score_sum': total_score.sum(axis=0),
+        'rank_sum': ranks.sum(axis=0),
+        'position_counts': position_counts,
+        'n_users': n_users,
+    }
+
+def build_model(df_fixtures, df_teams, df_predictions, rules=DEFAULT_RULES):
+    """Everything a simulation chunk needs, as plain arrays (cheap to send to worker processes)."""
+    df_teams = df_teams.sort_values('id')
+    teams_by_id = df_teams['id'].to_numpy()
+    teams = pd.Index(df_teams['name'])
+    id_to_col = pd.Index(teams_by_id)
+
+    attack, defence, home_goals, away_goals = get_team_strengths(df_fixtures, teams_by_id)
+    points, goals_difference, goals_scored = get_current_totals(df_fixtures, teams_by_id)
+
+    df_remaining = df_fixtures[df_fixtures['finished'] != True]
+    home = id_to_col.get_indexer(df_remaining['team_h'])
+    away = id_to_col.get_indexer(df_remaining['team_a'])
+    home_onehot = np.zeros((len(df_remaining), len(teams)))
+    away_onehot = np.zeros((len(df_remaining), len(teams)))
+    home_onehot[np.arange(len(df_remaining)), home] = 1
+    away_onehot[np.arange(len(df_remaining)), away] = 1
+
+    users, predictions, _ = build_prediction_matrix(df_predictions, teams)
+    crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+    z_score = get_z_scores(predictions, crowd_mean, crowd_std)
+    is_bold = (predictions > 0) & (z_score >= rules.bold_threshold)
+
+    return {
+        'teams': teams,
+        'users': users,
+        'n_remaining': len(df_remaining),
+        'lambda_home': home_goals * attack[home] * defence[away],
+        'lambda_away': away_goals * attack[away] * defence[home],
+        'home_onehot': home_onehot,
+        'away_onehot': away_onehot,
+        'points': points,
+        'goals_difference': goals_difference,
+        'goals_scored': goals_scored,
+        'predictions': predictions,
+        'is_bold': is_bold,
+        'rules': rules,
+    }
+
+def simulate_season(df_fixtures, df_teams, df_predictions, n_sims=100_000, seed=None, workers=None, chunk_size=10_000,
+                    rules=DEFAULT_RULES):
+    """
+    Simulates the rest of the season n_sims times.
+    Returns (df_win_probs, df_team_positions):
+    - df_win_probs: per user, chance of finishing 1st/2nd/3rd (shared places count for everyone tied),
+      expected final score and expected final rank
+    - df_team_positions: per team, chance of finishing in each league position
+    """
+    model = build_model(df_fixtures, df_teams, df_predictions, rules)
+
+    chunks = [min(chunk_size, n_sims - start) for start in range(0, n_sims, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+    if workers <= 1:
+        results = [_simulate_chunk(s, n, model) for s, n in zip(seeds, chunks)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, seeds, chunks, [model] * len(chunks)))
+
+    place_counts = sum(r['place_counts'] for r in results)
+    df_win_probs = pd.DataFrame({
+        'name': model['users'],
+        'p_first': place_counts[:, 0] / n_sims,
+        'p_second': place_counts[:, 1] / n_sims,
+        'p_third': place_counts[:, 2] / n_sims,
+        'expected_score': sum(r['score_sum'] for r in results) / n_sims,
+        'expected_rank': sum(r['rank_sum'] for r in results) / n_sims,
+    })
+    df_win_probs['p_podium'] = df_win_probs[['p_first', 'p_second', 'p_third']].sum(axis=1)
+    df_win_probs = df_win_probs.sort_values(['p_first', 'expected_score'], ascending=False).reset_index(drop=True)
+
+    position_counts = sum(r['position_counts'] for r in results)
+    df_team_positions = pd.DataFrame(
+        position_counts / n_sims, index=model['teams'], columns=range(1, len(model['teams']) + 1)
+    )
+
+    print(f"Simulated {n_sims} seasons over {model['n_remaining']} remaining fixtures")
+
+    return df_win_probs, df_team_positions
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+import pandas as pd
+import pyarrow as pa
+
+# src/snapshot_store.py
+# Versioned on-disk snapshots of the processed frames in Arrow IPC format.
+# Snapshots are written once per data version and memory-mapped on load, so a
+# restarted app (or a new worker) can render straight away without recomputing.
+#
+# data/snapshots/
+#     LATEST                   <- version of the newest complete snapshot
+#     <version>/meta.json
+#     <version>/df_league.arrow, df_leaderboard.arrow, df_merged.arrow
+
+SNAPSHOT_DIR = os.path.join('data', 'snapshots')
+FRAMES = ['df_league', 'df_leaderboard', 'df_merged']
+KEEP_SNAPSHOTS = 3
+
+def get_data_version(df_fixtures, df_predictions):
+    """Short hash of everything the processed frames depend on: finished results and predictions."""
+    df_finished_only = df_fixtures[df_fixtures['finished'] == True]
+    cols = ['id', 'event', 'kickoff_time', 'team_h', 'team_a', 'team_h_score', 'team_a_score']
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df_finished_only[cols].astype(str), index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(df_predictions, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def _write_arrow(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # uncompressed so the file can be memory-mapped without decoding
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def _read_arrow(path, memory_map=True):
+    source = pa.memory_map(path, 'r') if memory_map else pa.OSFile(path, 'rb')
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps numeric columns as views on the mapped file instead of one consolidated copy
+    return table.to_pandas(split_blocks=True)
+
+def write_snapshot(frames, version, snapshot_dir=SNAPSHOT_DIR):
+    """Writes frames (dict of name -> DataFrame) as a new snapshot and points LATEST at it."""
+    final_dir = os.path.join(snapshot_dir, version)
+    if os.path.exists(os.path.join(final_dir, 'meta.json')):
+        _set_latest(version, snapshot_dir)
+        return final_dir
+
+    # build in a temporary folder and rename, readers never see a half-written snapshot
+    tmp_dir = os.path.join(snapshot_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, df in frames.items():
+        _write_arrow(df, os.path.join(tmp_dir, f"{name}.arrow"))
+    meta = {
+        'version': version,
+        'written_at': time.time(),
+        'rows': {name: len(df) for name, df in frames.items()},
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    _set_latest(version, snapshot_dir)
+    prune_snapshots(snapshot_dir)
+
+    print(f"Snapshot {version} written: {meta['rows']}")
+    return final_dir
+
+def _set_latest(version, snapshot_dir):
+    tmp_path = os.path.join(snapshot_dir, 'LATEST.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(snapshot_dir, 'LATEST'))
+
+def latest_version(snapshot_dir=SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, 'LATEST')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip() or None
+
+def load_snapshot(version=None, snapshot_dir=SNAPSHOT_DIR, max_age=None, memory_map=True):
+    """
+    Loads a snapshot (the latest by default) as (frames, meta).
+    Returns (None, None) if there is none, or it is older than max_age seconds.
+    """
+    version = version or latest_version(snapshot_dir)
+    if version is None:
+        return None, None
+    version_dir = os.path.join(snapshot_dir, version)
+    try:
+        with open(os.path.join(version_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        if max_age is not None and time.time() - meta['written_at'] > max_age:
+            return None, None
+        frames = {name: _read_arrow(os.path.join(version_dir, f"{name}.arrow"), memory_map) for name in meta['rows']}
+    except (OSError, ValueError, KeyError, pa.ArrowInvalid) as e:
+        print(f"Snapshot {version} unreadable: {e}")
+        return None, None
+    return frames, meta
+
+def prune_snapshots(snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """Deletes all but the newest `keep` snapshots (never the one LATEST points at)."""
+    current = latest_version(snapshot_dir)
+    versions = []
+    for name in os.listdir(snapshot_dir):
+        meta_path = os.path.join(snapshot_dir, name, 'meta.json')
+        if not name.startswith('.') and os.path.exists(meta_path):
+            versions.append((os.path.getmtime(meta_path), name))
+    for _, name in sorted(versions, reverse=True)[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
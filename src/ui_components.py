@@ -1,5 +1,9 @@
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+from src.views import get_podium_tier, get_position_tier, get_accuracy_tier
+
 def metric_card(title, value):
     st.markdown(
         f"""
@@ -12,17 +16,41 @@ def metric_card(title, value):
     )
 
 # src/ui_components.py
+# Table styles are one CSS string per tier, picked for every row at once from a tier
+# array (see the get_*_tier functions in src/views.py) instead of a callback per row.
+
+GOLD = 'background-color: rgba(255, 215, 0, 0.2)'
+SILVER = 'background-color: rgba(192, 192, 192, 0.2)'
+BRONZE = 'background-color: rgba(205, 127, 50, 0.2)'
+PODIUM_CSS = np.array(['', GOLD, SILVER, BRONZE])
+
+# 1: Gold, 2-5: Light Purple, 18-20: Light Red
+POSITION_CSS = np.array([
+    '',
+    'background-color: rgba(255, 215, 0, 0.2)',    # Position 1
+    'background-color: rgba(187, 173, 230, 0.2)',  # Position 2-5
+    'background-color: rgba(255, 99, 71, 0.2)',    # Position 18-20
+])
+
+# HEX Codes with transparency, indexed by accuracy tier
+ACCURACY_CSS = np.array([
+    'background-color: #00BB7799', # Perfect (0 diff)
+    'background-color: #00BB7765', # Very Close (1 diff)
+    'background-color: #00BB7735', # Close (1-2 diff)
+    'background-color: #00BB7715', # Average (3-4 diff)
+    'background-color: #FF000010', # Poor (5 diff)
+    'background-color: #FF000030', # Way off (>5 diff)
+])
+
+def _row_styles(df, css):
+    """The same CSS across every column of a row, as the frame Styler.apply(axis=None) expects."""
+    return pd.DataFrame(np.repeat(np.asarray(css, dtype=object)[:, None], df.shape[1], axis=1),
+                        index=df.index, columns=df.columns)
 
-def style_leaderboard(df):
-    def _apply_podium_colors(row):
-        gold = 'background-color: rgba(255, 215, 0, 0.2)'
-        silver = 'background-color: rgba(192, 192, 192, 0.2)'
-        bronze = 'background-color: rgba(205, 127, 50, 0.2)'
-        
-        if row['rank'] == 1: return [gold] * len(row)
-        if row['rank'] == 2: return [silver] * len(row)
-        if row['rank'] == 3: return [bronze] * len(row)
-        return [''] * len(row)
+def style_leaderboard(df, tiers=None):
+    """Podium colours for ranks 1-3. tiers: podium tier per row, computed from 'rank' when not given."""
+    if tiers is None:
+        tiers = get_podium_tier(df['rank'].to_numpy())
 
     # 1. Start the styler
     styler = df.style
@@ -31,62 +59,22 @@ def style_leaderboard(df):
     styler = styler.format(precision=0)
     
     # 3. Apply the colors and optional alignment
-    return styler.apply(_apply_podium_colors, axis=1).set_properties(**{'text-align': 'center'})
-
-# src/ui_components.py
+    return styler.apply(_row_styles, axis=None, css=PODIUM_CSS[tiers]).set_properties(**{'text-align': 'center'})
 
 def style_user_deep_dive(df):
     """
     Styles the deep dive table based on league position.
-    1: Gold, 2-5: Light Blue, 18-20: Light Red.
+    1: Gold, 2-5: Light Purple, 18-20: Light Red.
     """
-    def _apply_position_colors(row):
-        gold = 'background-color: rgba(255, 215, 0, 0.2)'    # Position 1
-        purple = 'background-color: rgba(187, 173, 230, 0.2)'  # Position 2-5
-        red = 'background-color: rgba(255, 99, 71, 0.2)'     # Position 18-20
-        
-        pos = row['position']
-        
-        if pos == 1:
-            return [gold] * len(row)
-        elif 2 <= pos <= 5:
-            return [purple] * len(row)
-        elif 18 <= pos <= 20:
-            return [red] * len(row)
-        return [''] * len(row)
-
-    return df.style.apply(_apply_position_colors, axis=1).format(precision=0)
+    tiers = get_position_tier(df['position'].to_numpy())
+    return df.style.apply(_row_styles, axis=None, css=POSITION_CSS[tiers]).format(precision=0)
 
 def style_user_deep_dive_alt(df):
     """
     Styles the deep dive table based on how 'right' the prediction was.
-    Uses proximity_score or difference logic.
+    Uses the gap between predicted and actual position.
     """
-    def _apply_accuracy_colors(row):
-        # HEX Codes with 0.3 transparency
-        perfect_green = 'background-color: #00BB7799' # Perfect (0 diff)
-        great_green   = 'background-color: #00BB7765' # Very Close (1 diff)
-        good_green    = 'background-color: #00BB7735' # Close (1-2 diff)
-        warning_gold  = 'background-color: #00BB7715' # Average (3-4 diff)
-        light_red    = 'background-color: #FF000010' # Poor (5 diff)
-        bad_red       = 'background-color: #FF000030' # Way off (>5 diff)
-        
-        # Calculate the absolute gap
-        gap = abs(row['predicted_difference'])
-        
-        if gap == 0:
-            return [perfect_green] * len(row)
-        elif gap == 1:
-            return [great_green] * len(row)
-        elif gap <= 2:
-            return [good_green] * len(row)
-        elif gap <= 4:
-            return [warning_gold] * len(row)
-        elif gap <= 5:
-            return [light_red] * len(row)
-        else:
-            return [bad_red] * len(row)
-
-    return df.style.apply(_apply_accuracy_colors, axis=1).format({
+    tiers = get_accuracy_tier(df['predicted_difference'].to_numpy())
+    return df.style.apply(_row_styles, axis=None, css=ACCURACY_CSS[tiers]).format({
     'predicted_difference': '{:+d}' # Forces + or - to show
-}, precision=0)
\ No newline at end of file
+}, precision=0)
@@ -0,0 +1,165 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import get_gameweek_errors, crowd_aggregates_from_merged
+
+# src/views.py
+# Everything the app shows for a gameweek (and a gameweek + player) built once per data
+# version, so a widget change is a dictionary lookup instead of scanning df_leaderboard
+# and df_merged again on every Streamlit rerun.
+
+LEADERBOARD_COLS = ['rank', 'name', 'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score']
+DEEP_DIVE_COLS = [
+    'position', 'team', 'predicted_position', 'predicted_difference',
+    'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score'
+]
+PAGE_SIZE = 50 # leaderboard rows styled and sent per page, whatever the league size
+# accuracy tier = how many of these gaps |predicted_difference| is above: 0 perfect, 1, 2, 3-4, 5, >5
+ACCURACY_GAPS = [0, 1, 2, 4, 5]
+
+def get_podium_tier(rank):
+    """1/2/3 for gold/silver/bronze, 0 for everyone else."""
+    rank = np.asarray(rank)
+    return np.where((rank >= 1) & (rank <= 3), rank, 0).astype('int8')
+
+def get_position_tier(position):
+    """1 for the champion, 2 for positions 2-5, 3 for the bottom three (18-20), 0 otherwise."""
+    position = np.asarray(position)
+    return np.select([position == 1, (position >= 2) & (position <= 5), (position >= 18) & (position <= 20)],
+                     [1, 2, 3], 0).astype('int8')
+
+def get_accuracy_tier(predicted_difference):
+    """0 (spot on) to 5 (more than 5 places off), see ACCURACY_GAPS."""
+    gap = np.abs(np.asarray(predicted_difference, dtype=float))
+    return np.searchsorted(ACCURACY_GAPS, gap, side='left').astype('int8')
+
+def get_metric_cards(df_current_lb):
+    """Leader, biggest riser and biggest faller for one gameweek's leaderboard."""
+    # Logic for Gainer/Loser
+    leader_name = df_current_lb.iloc[0]['name']
+
+    # Get the actual min and max movement values
+    max_move = df_current_lb['rank_movement'].max()
+    min_move = df_current_lb['rank_movement'].min()
+
+    # Identify Riser: Only show a name if someone actually moved up
+    if max_move > 0:
+        biggest_gainer = df_current_lb.sort_values("rank_movement", ascending=False).iloc[0]['name']
+        riser_value = f"↑ {int(max_move)}"
+    else:
+        biggest_gainer = "No Change"
+        riser_value = "No Change"
+
+    # Identify Faller: Only show a name if someone actually moved down
+    if min_move < 0:
+        biggest_loser = df_current_lb.sort_values("rank_movement", ascending=True).iloc[0]['name']
+        faller_value = f"↓ {int(abs(min_move))}"
+    else:
+        biggest_loser = "No Change"
+        faller_value = "No Change"
+
+    return {
+        'leader': leader_name,
+        'biggest_gainer': biggest_gainer,
+        'riser_value': riser_value,
+        'biggest_loser': biggest_loser,
+        'faller_value': faller_value,
+    }
+
+def get_team_errors(crowd, gameweek):
+    """Mean error per team for one gameweek from the crowd aggregates, plus the meta analysis highlight cards."""
+    # position, predicted_position (average of all users), predicted_difference (average error, for the
+    # crowd error chart), error_std and count, without going back to df_merged
+    team_errors = get_gameweek_errors(crowd, gameweek)
+
+    # mean_error = Actual Position - Average Predicted Position
+    team_errors['mean_error'] = team_errors['position'] - team_errors['predicted_position']
+
+    cards = {
+        'most_overestimated': team_errors.sort_values("mean_error", ascending=False).iloc[0]['team'],
+        'most_underestimated': team_errors.sort_values("mean_error", ascending=True).iloc[0]['team'],
+        'most_predictable': team_errors.loc[team_errors['mean_error'].abs().idxmin()]['team'],
+    }
+    return team_errors, cards
+
+def build_rank_matrix(df_leaderboard):
+    """
+    Every player's rank at every gameweek as one users x gameweeks int32 array (0 = no entry),
+    so a rank history chart for any set of players is a row lookup.
+    """
+    codes, uniques = pd.factorize(df_leaderboard['name'], sort=True)
+    users = pd.Index(np.asarray(uniques).astype(str))
+    gw = df_leaderboard['gameweek'].to_numpy()
+    gameweeks = np.unique(gw).astype(int)
+    ranks = np.zeros((len(users), len(gameweeks)), dtype='int32')
+    ranks[codes, np.searchsorted(gameweeks, gw)] = df_leaderboard['rank'].to_numpy()
+    return {'users': users, 'gameweeks': gameweeks, 'ranks': ranks}
+
+def build_view_index(df_leaderboard, df_merged, crowd=None):
+    """
+    Per-gameweek views (leaderboard slice, metric cards, team errors) and row positions of
+    every (gameweek, user) deep-dive slice, from one grouping pass over each frame.
+    Team errors come from the crowd aggregates (src/aggregates.py), rebuilt from df_merged when not given.
+    """
+    if crowd is None:
+        crowd = crowd_aggregates_from_merged(df_merged)
+    views = {
+        'gameweeks': sorted(df_leaderboard['gameweek'].dropna().unique().astype(int), reverse=True),
+        'by_gw': {},
+        'deep_dive_rows': {},
+        'df_merged': df_merged,
+        'rank_matrix': build_rank_matrix(df_leaderboard),
+    }
+
+    for gw, df_current_lb in df_leaderboard.groupby('gameweek', sort=False):
+        team_errors, team_cards = get_team_errors(crowd, gw)
+        views['by_gw'][int(gw)] = {
+            'leaderboard': df_current_lb,
+            'display_lb': df_current_lb[LEADERBOARD_COLS],
+            'podium_tier': get_podium_tier(df_current_lb['rank'].to_numpy()),
+            'users': list(df_current_lb['name'].unique()),
+            'cards': get_metric_cards(df_current_lb),
+            'team_errors': team_errors,
+            'team_cards': team_cards,
+        }
+
+    # row positions only: a deep-dive table is taken from df_merged when it is first asked for
+    for (gw, name), rows in df_merged.groupby(['gameweek', 'name'], sort=False, observed=True).indices.items():
+        views['deep_dive_rows'][(int(gw), name)] = rows
+
+    return views
+
+def get_gameweek_view(views, gameweek):
+    return views['by_gw'][int(gameweek)]
+
+def get_deep_dive(views, gameweek, name):
+    """One player's table for a gameweek, sorted by actual position."""
+    rows = views['deep_dive_rows'].get((int(gameweek), name), np.array([], dtype='int64'))
+    user_data = views['df_merged'].iloc[rows]
+    return user_data[DEEP_DIVE_COLS].sort_values('position', ascending=True)
+
+def get_leaderboard_page(gw_view, query='', page=1, page_size=PAGE_SIZE):
+    """
+    One page of a gameweek's display leaderboard, optionally only the names containing query
+    (case-insensitive). Returns the page rows, their podium tiers, the number of matches and pages.
+    """
+    rows = np.arange(len(gw_view['display_lb']))
+    if query:
+        # lower-cased names are kept on the view after the first search
+        if 'search_names' not in gw_view:
+            gw_view['search_names'] = gw_view['display_lb']['name'].astype(str).str.lower()
+        rows = np.flatnonzero(gw_view['search_names'].str.contains(query.strip().lower(), regex=False).to_numpy())
+
+    matches = len(rows)
+    n_pages = max(1, math.ceil(matches / page_size))
+    page = min(max(int(page), 1), n_pages)
+    rows = rows[(page - 1) * page_size:page * page_size]
+    return {
+        'rows': gw_view['display_lb'].iloc[rows],
+        'tiers': gw_view['podium_tier'][rows],
+        'matches': matches,
+        'page': page,
+        'pages': n_pages,
+    }
@@ -0,0 +1,155 @@
+import itertools
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.scoring import (
+    ScoringRules, DEFAULT_RULES, get_league_matrix, build_prediction_matrix, get_crowd_stats,
+    get_z_scores, get_proximity_lut, rank_desc
+)
+
+# src/what_if.py
+# Re-scores a league under many alternative rule sets at once. Distances and z-scores
+# don't depend on the rules, so they are computed once and reduced to per-user
+# histograms; each rule set is then a small matrix product on those histograms.
+#
+# python -m src.what_if --bold-bonus 0 3 5 --proximity-step 1 2 3
+
+def rules_grid(**values):
+    """
+    Every combination of the given ScoringRules fields, the rest from DEFAULT_RULES, e.g.
+    rules_grid(bold_bonus=[0, 5], proximity_step=[1, 2]) -> 4 rule sets.
+    """
+    unknown = set(values) - set(ScoringRules._fields)
+    if unknown:
+        raise ValueError(f"Unknown scoring rules: {sorted(unknown)}")
+    fields = list(values)
+    return [DEFAULT_RULES._replace(**dict(zip(fields, combo))) for combo in itertools.product(*values.values())]
+
+def build_distance_histograms(df_league, df_predictions, gameweek=None, thresholds=()):
+    """
+    Rule-independent part of scoring for one gameweek (the latest by default):
+    - 'counts': users x distances, how many of each user's picks were off by d places
+    - 'bold_counts': {threshold: users x distances} the same for picks with z-score >= threshold
+    """
+    gameweeks, teams, positions = get_league_matrix(df_league)
+    g = len(gameweeks) - 1 if gameweek is None else gameweeks.get_loc(gameweek)
+    users, predictions, _ = build_prediction_matrix(df_predictions, teams)
+    crowd_mean, crowd_std = get_crowd_stats(df_predictions, teams)
+    z_score = get_z_scores(predictions, crowd_mean, crowd_std)
+
+    position = positions[g][None, :]
+    valid = (position > 0) & (predictions > 0)
+    n_distances = len(teams) + 1
+    distance = np.minimum(np.abs(position.astype('int16') - predictions), n_distances - 1)
+
+    def _histogram(mask):
+        # row-offset bincount: one pass for every user
+        rows = np.broadcast_to(np.arange(len(users))[:, None], mask.shape)[mask]
+        flat = rows * n_distances + distance[mask]
+        return np.bincount(flat, minlength=len(users) * n_distances).reshape(len(users), n_distances)
+
+    return {
+        'gameweek': gameweeks[g],
+        'users': users,
+        'present': valid.any(axis=1),
+        'counts': _histogram(valid),
+        'bold_counts': {threshold: _histogram(valid & (z_score >= threshold)) for threshold in thresholds},
+    }
+
+def score_rule_sets(histograms, rule_sets):
+    """users x rule sets matrix of total scores."""
+    counts = histograms['counts']
+    n_distances = counts.shape[1]
+
+    # proximity and perfect matches: one lookup column per rule set
+    lut = np.stack([get_proximity_lut(n_distances - 1, rules) for rules in rule_sets], axis=1).astype(float)
+    lut[0] += [rules.perfect_match_bonus for rules in rule_sets]
+    totals = counts @ lut
+
+    # bold hits: picks within bold_error places, from the cumulative histogram of each threshold
+    for threshold, bold_counts in histograms['bold_counts'].items():
+        within = np.cumsum(bold_counts, axis=1)
+        for r, rules in enumerate(rule_sets):
+            if rules.bold_threshold == threshold and rules.bold_bonus and rules.bold_error >= 0:
+                error = int(min(np.floor(rules.bold_error), n_distances - 1))
+                totals[:, r] += within[:, error] * rules.bold_bonus
+    return totals
+
+def rescore_grid(df_league, df_predictions, rule_sets, baseline=DEFAULT_RULES, gameweek=None, chunk_size=256):
+    """
+    Scores every rule set (plus the baseline) at one gameweek, the latest by default.
+    Returns (df_rules, df_ranks):
+    - df_rules: one row per rule set with its parameters, winner and how many players moved
+    - df_ranks: per rule set and player, total score, rank, baseline rank and rank change
+    """
+    rule_sets = [ScoringRules(*rules) for rules in rule_sets]
+    all_rules = [baseline] + rule_sets
+    thresholds = sorted({rules.bold_threshold for rules in all_rules})
+    histograms = build_distance_histograms(df_league, df_predictions, gameweek, thresholds)
+    users = histograms['users'][histograms['present']]
+
+    base_scores = score_rule_sets(histograms, [baseline])[histograms['present'], 0]
+    base_rank = rank_desc(base_scores[None, :])[0]
+
+    frames = []
+    # rule sets in chunks keeps the users x rule sets block bounded for big leagues
+    for start in range(0, len(rule_sets), chunk_size):
+        chunk = rule_sets[start:start + chunk_size]
+        totals = score_rule_sets(histograms, chunk)[histograms['present']].T
+        ranks = rank_desc(totals)
+        frames.append(pd.DataFrame({
+            'rule_set': np.repeat(np.arange(start, start + len(chunk)), len(users)),
+            'name': np.tile(users.to_numpy(), len(chunk)),
+            'total_score': totals.ravel(),
+            'rank': ranks.ravel(),
+            'base_rank': np.tile(base_rank, len(chunk)),
+        }))
+    df_ranks = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['rule_set', 'name', 'total_score', 'rank', 'base_rank'])
+    df_ranks['rank_change'] = df_ranks['base_rank'] - df_ranks['rank']
+
+    df_rules = pd.DataFrame(rule_sets, columns=ScoringRules._fields)
+    df_rules.index.name = 'rule_set'
+    df_winners = df_ranks[df_ranks['rank'] == 1].groupby('rule_set')['name'].agg(', '.join)
+    df_moves = df_ranks.assign(moved=df_ranks['rank_change'] != 0).groupby('rule_set').agg(
+        players_moved=('moved', 'sum'),
+        max_rank_change=('rank_change', lambda x: x.abs().max()),
+    )
+    df_rules = df_rules.join(df_winners.rename('winner')).join(df_moves).reset_index()
+
+    print(f"What-if: {len(rule_sets)} rule sets scored for {len(users)} players at GW{int(histograms['gameweek'])}")
+    return df_rules, df_ranks
+
+def parse_rule_value(text):
+    """A rule value from the command line: '2' stays an int, '1.5' becomes a float."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def main():
+    from src.data_loader import fetch_fpl_data
+    from src.data_transform import get_league_history
+
+    parser = argparse.ArgumentParser(description="Final ranks under a grid of alternative scoring rules.")
+    parser.add_argument('--predictions', default='data/epl_predictions_2026.csv')
+    parser.add_argument('--gameweek', type=int, help="defaults to the latest processed gameweek")
+    parser.add_argument('--out', help="CSV for the per-player ranks of every rule set")
+    for field, default in DEFAULT_RULES._asdict().items():
+        parser.add_argument(f"--{field.replace('_', '-')}", nargs='+', type=parse_rule_value, default=[default])
+    args = parser.parse_args()
+
+    df_predictions, df_teams, df_fixtures = fetch_fpl_data(predictions_path=args.predictions)
+    df_league = get_league_history(df_fixtures, df_teams)
+    rule_sets = rules_grid(**{field: getattr(args, field) for field in ScoringRules._fields})
+    df_rules, df_ranks = rescore_grid(df_league, df_predictions, rule_sets, gameweek=args.gameweek)
+
+    print(df_rules.to_string(index=False))
+    if args.out:
+        df_ranks.to_csv(args.out, index=False)
+        print(f"Ranks written to {args.out}")
+
+if __name__ == '__main__':
+    main()
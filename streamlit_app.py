@@ -1,11 +1,15 @@
 import streamlit as st
-import pandas as pd
 import os
 
-# Import custom modules
-from src.data_loader import fetch_fpl_data
-from src.data_transform import get_league_history, calculate_leaderboard
-from src.plotting import plot_leaderboard_bar, plot_crowd_error, plot_rank_history
+# Import custom modules (the fetch and scoring pipeline is imported in run_pipeline,
+# which only ever runs on the background refresh worker)
+from src.snapshot_store import load_snapshot, write_snapshot, get_data_version
+from src.refresh import start_refresh_worker
+from src.aggregates import crowd_to_frame, crowd_from_snapshot
+from src.instrumentation import enable_structured_logs, capture_profile, write_prometheus
+from src.similarity import get_similarity, get_similarity_cards
+from src.views import build_view_index, get_gameweek_view, get_deep_dive, get_leaderboard_page, PAGE_SIZE
+from src.plotting import plot_leaderboard_bar, plot_crowd_error, plot_rank_history, plot_agreement, MAX_SERIES
 from src.ui_components import metric_card, style_leaderboard, style_user_deep_dive, style_user_deep_dive_alt
 
 # 1. PAGE CONFIG
@@ -16,65 +20,99 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# per-stage pipeline metrics: JSON lines on stderr, Prometheus text file for scraping
+enable_structured_logs()
+METRICS_PATH = os.path.join('data', 'cache', 'pipeline.prom')
+
 # 2. LOAD ASSETS (CSS)
-css_path = os.path.join("assets", "style.css")
-if os.path.exists(css_path):
+@st.cache_resource
+def load_css(css_path=os.path.join("assets", "style.css")):
+    # read once per process; every rerun still has to emit it
+    if not os.path.exists(css_path):
+        return None
     with open(css_path) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        return f"<style>{f.read()}</style>"
 
-# 3. DATA PROCESSING
-# st.cache_data so the app doesn't re-run the math on every click
-@st.cache_data(ttl=86400)  # cache for 24 hours
-def get_processed_data():
-    df_predictions, df_teams, df_fixtures = fetch_fpl_data()
-    df_league = get_league_history(df_fixtures=df_fixtures,df_teams=df_teams)
-    df_leaderboard, df_merged = calculate_leaderboard(df_league, df_predictions)
-    return df_leaderboard, df_merged
+css = load_css()
+if css:
+    st.markdown(css, unsafe_allow_html=True)
 
-df_leaderboard, df_merged = get_processed_data()
+# 3. DATA PROCESSING
+def build_app_data(frames, version):
+    """What every rerun reads: the frames plus the views built once per data version."""
+    # per-gameweek views are built here, so reruns only do lookups; the meta analysis reads the crowd aggregates
+    views = build_view_index(frames['df_leaderboard'], frames['df_merged'], crowd_from_snapshot(frames))
+    # player similarity is cached on disk per data version as well
+    views['similarity'] = get_similarity(frames['df_league'], frames['df_merged'], version)
+    views['similarity_cards'] = get_similarity_cards(views['similarity'])
+    return {'version': version, 'df_leaderboard': frames['df_leaderboard'], 'df_merged': frames['df_merged'], 'views': views}
+
+def run_pipeline(current):
+    """One background refresh: fetch, and when the results changed recompute, snapshot, archive and rebuild the views."""
+    from src.api_cache import get_json
+    from src.data_loader import fetch_fpl_data
+    from src.incremental import refresh_processed_data
+    from src.archive import archive_season
+
+    # PIPELINE_PROFILE=<path> captures a cProfile of this refresh
+    with capture_profile():
+        # ttl=0: the worker only runs when results are due, so always revalidate (a 304 when nothing changed)
+        df_predictions, df_teams, df_fixtures = fetch_fpl_data(ttl=0)
+        version = get_data_version(df_fixtures, df_predictions)
+        if current is None or current['version'] != version:
+            # only gameweeks finished since the last run are recomputed, the rest comes from data/cache
+            df_league, df_leaderboard, df_merged, crowd = refresh_processed_data(df_fixtures, df_teams, df_predictions,
+                                                                                return_crowd=True)
+            frames = {'df_league': df_league, 'df_leaderboard': df_leaderboard, 'df_merged': df_merged,
+                      'df_crowd_stats': crowd_to_frame(crowd)}
+            write_snapshot(frames, version=version)
+            # every season stays queryable in data/archive.sqlite after the API moves on
+            archive_season(df_fixtures, df_teams, df_league, df_predictions, df_leaderboard, version=version)
+            current = build_app_data(frames, version)
+    write_prometheus(METRICS_PATH)
+    # the raw payload (just cached) still has kickoff times, which schedule the next run
+    return current, get_json('fixtures/', ttl=float('inf'))
+
+# one worker per process, shared by every session: visitors only ever read worker['current'],
+# which the worker swaps for a new version when results come in
+@st.cache_resource
+def get_refresh_worker():
+    # the last snapshot renders straight away, however old; the worker's first run brings it up to date
+    frames, meta = load_snapshot()
+    current = build_app_data(frames, meta['version']) if frames is not None else None
+    return start_refresh_worker(run_pipeline, current)
+
+worker = get_refresh_worker()
+if not worker['ready'].is_set():
+    # only on the very first start, with no snapshot on disk: wait for the worker's first run
+    with st.spinner("Fetching the latest Premier League results..."):
+        while not worker['ready'].wait(0.5):
+            if worker['last_error']:
+                st.error(f"Couldn't load the latest Premier League data: {worker['last_error']}")
+                st.stop()
+data = worker['current']
+df_leaderboard, df_merged, views = data['df_leaderboard'], data['df_merged'], data['views']
 
 # 4. SIDEBAR
 st.sidebar.header("Filters")
-gameweeks = sorted(df_leaderboard['gameweek'].dropna().unique().astype(int), reverse=True)
-selected_gw = st.sidebar.selectbox("Select Gameweek", options=gameweeks, index=0)
+selected_gw = st.sidebar.selectbox("Select Gameweek", options=views['gameweeks'], index=0)
 
-# Filter data based on selection
-df_current_lb = df_leaderboard[df_leaderboard['gameweek'] == selected_gw]
+# Everything for the selected gameweek was precomputed in build_app_data
+gw_view = get_gameweek_view(views, selected_gw)
+df_current_lb = gw_view['leaderboard']
+cards = gw_view['cards']
 
 # 5. HEADER & METRIC CARDS
 st.title('PL Predictions 2026')
 st.subheader(f"Gameweek {int(selected_gw)}")
 
-# Logic for Gainer/Loser
-leader_name = df_current_lb.iloc[0]['name']
-
-# Get the actual min and max movement values
-max_move = df_current_lb['rank_movement'].max()
-min_move = df_current_lb['rank_movement'].min()
-
-# Identify Riser: Only show a name if someone actually moved up
-if max_move > 0:
-    biggest_gainer = df_current_lb.sort_values("rank_movement", ascending=False).iloc[0]['name']
-    riser_value = f"↑ {int(max_move)}"
-else:
-    biggest_gainer = "No Change"
-    riser_value = "No Change"
-
-# Identify Faller: Only show a name if someone actually moved down
-if min_move < 0:
-    biggest_loser = df_current_lb.sort_values("rank_movement", ascending=True).iloc[0]['name']
-    faller_value = f"↓ {int(abs(min_move))}"
-else:
-    biggest_loser = "No Change"
-    faller_value = "No Change"
-
 col1, col2, col3 = st.columns(3)
 with col1:
-    metric_card("🏆 Leader", leader_name)
+    metric_card("🏆 Leader", cards['leader'])
 with col2:
-    metric_card("🔥 Biggest Riser", biggest_gainer)
+    metric_card("🔥 Biggest Riser", cards['biggest_gainer'])
 with col3:
-    metric_card("💀 Biggest Faller", biggest_loser)
+    metric_card("💀 Biggest Faller", cards['biggest_loser'])
 
 # 6. VISUALIZATIONS
 st.divider()
@@ -82,8 +120,11 @@ st.subheader('Points')
 st.plotly_chart(plot_leaderboard_bar(df_current_lb, selected_gw), use_container_width=True)
 
 # 7. LEADERBOARD TABLE
-display_df = df_current_lb[['rank', 'name', 'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score']]
-styled_lb = style_leaderboard(display_df)
+# only one page of the table is styled and sent, so big leagues render as fast as small ones
+search = st.text_input("Search players:", "") if len(gw_view['display_lb']) > PAGE_SIZE else ""
+page = st.session_state.get('leaderboard_page', 1)
+lb_page = get_leaderboard_page(gw_view, search, page)
+styled_lb = style_leaderboard(lb_page['rows'], lb_page['tiers'])
 
 # 2. Display with your existing column_config
 st.dataframe(
@@ -99,20 +140,25 @@ st.dataframe(
     hide_index=True,
     use_container_width=True
 )
+if lb_page['pages'] > 1:
+    # a narrower search can leave the stored page past the last one
+    st.session_state['leaderboard_page'] = lb_page['page']
+    st.number_input(f"Page (of {lb_page['pages']}, {lb_page['matches']} players)", min_value=1,
+                    max_value=lb_page['pages'], key='leaderboard_page')
+elif search and not lb_page['matches']:
+    st.caption(f"No players matching '{search}'")
 
 # 8. USER DEEP DIVE
 st.divider()
 st.header("Player Deep Dive")
 
 # Selection Box
-selected_user = st.selectbox("Pick a player:", df_current_lb['name'].unique())
+selected_user = st.selectbox("Pick a player:", gw_view['users'])
 
 # Prepare and style the data
-user_data = df_merged[(df_merged['name'] == selected_user) & (df_merged['gameweek'] == selected_gw)]
-display_df = user_data[['position', 'team', 'predicted_position', 'predicted_difference', 'proximity_score', 'perfect_match_score', 'boldness_score', 'total_score']].sort_values('position', ascending=True)
+display_df = get_deep_dive(views, selected_gw, selected_user)
 
 # Apply the new style
-from src.ui_components import style_user_deep_dive
 #styled_user_deep_dive = style_user_deep_dive(display_df)
 styled_user_deep_dive_alt = style_user_deep_dive_alt(display_df)    
 
@@ -136,44 +182,58 @@ st.dataframe(
 
 # 3. Chart 
 st.subheader("Rank History")
+compare_users = st.multiselect(
+    "Compare with:",
+    [user for user in gw_view['users'] if user != selected_user],
+    max_selections=MAX_SERIES - 1,
+)
 with st.container(): 
-    plot_rank_history(df_leaderboard, selected_user, selected_gw=selected_gw,key=f"trend_{selected_user}")
+    # one chart key for every player, so switching players updates the chart instead of remounting it
+    plot_rank_history(df_leaderboard, [selected_user] + compare_users, selected_gw=selected_gw, key="rank_history",
+                      rank_matrix=views['rank_matrix'])
 
 # 9. META ANALYSIS
 
 st.header("Meta Analysis")
 
-# Calculate Mean Error per team
-
-# 1. Filter for the specific gameweek first
-df_gw_data = df_merged[df_merged['gameweek'] == selected_gw]
-
-# 2. Calculate Mean Error per team for THIS gameweek
-# mean_error = Actual Position - Average Predicted Position
-team_errors = df_gw_data.groupby('team').agg({
-    'position': 'first',             # Actual league position
-    'predicted_position': 'mean'      # Average of all users
-}).reset_index()
-
-team_errors['mean_error'] = team_errors['position'] - team_errors['predicted_position']
-
-# Identify the teams
-most_overestimated = team_errors.sort_values("mean_error", ascending=False).iloc[0]['team']
-most_underestimated = team_errors.sort_values("mean_error", ascending=True).iloc[0]['team']
-most_predictable = team_errors.loc[team_errors['mean_error'].abs().idxmin()]['team']
+# Mean error per team for this gameweek (mean_error = Actual Position - Average Predicted Position)
+team_errors = gw_view['team_errors']
+team_cards = gw_view['team_cards']
 
 # --- Team Highlights Row ---
 col4, col5, col6 = st.columns(3)
 
 with col4:
-    metric_card("📉 Overestimated", most_overestimated)
+    metric_card("📉 Overestimated", team_cards['most_overestimated'])
 with col5:
-    metric_card("🚀 Underestimated", most_underestimated)
+    metric_card("🚀 Underestimated", team_cards['most_underestimated'])
 with col6:
-    metric_card("🎯 Most Predictable", most_predictable)
+    metric_card("🎯 Most Predictable", team_cards['most_predictable'])
 
 st.divider()
 
-st.plotly_chart(plot_crowd_error(df_merged, selected_gw), use_container_width=True)
+st.plotly_chart(plot_crowd_error(team_errors), use_container_width=True)
+
+# --- Who Predicted Alike ---
+st.subheader("Who Predicted Alike")
+similarity = views['similarity']
+similarity_cards = views['similarity_cards']
+
+col7, col8, col9 = st.columns(3)
+with col7:
+    metric_card("🤝 Most Alike", similarity_cards['most_alike'])
+with col8:
+    metric_card("🦄 Most Contrarian", similarity_cards['most_contrarian'])
+with col9:
+    metric_card("👥 Closest to Crowd", similarity_cards['closest_to_crowd'])
+
+user_similarity = similarity['df_similarity'][similarity['df_similarity']['name'] == selected_user]
+if len(user_similarity) and user_similarity['closest_spearman'].notna().iloc[0]:
+    row = user_similarity.iloc[0]
+    st.caption(
+        f"{selected_user}'s closest predictions: {row['closest_spearman']} (Spearman {row['closest_spearman_value']:.2f}). "
+        f"Contrarian rank {row['contrarian_rank']} of {len(similarity['df_similarity'])}."
+    )
+st.plotly_chart(plot_agreement(similarity, selected_user, selected_gw), use_container_width=True)
 
 
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+import requests
+
+from benchmarks.generators import make_bootstrap_payload, make_fixtures_payload
+from benchmarks.mock_fpl_server import MockFPLServer
+from src import fpl_client
+from src.api_cache import get_json, load_cached
+
+# tests/test_api_cache.py
+# The FPL fetch layer against the local mock server: retries, ETag revalidation,
+# serving the cached copy while the API is down, replay mode and a cold cache with no API.
+
+PAYLOADS = {'bootstrap-static/': make_bootstrap_payload(), 'fixtures/': make_fixtures_payload(5)}
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(fpl_client, 'backoff_delay', lambda attempt, backoff=0: 0)
+
+def _get(server_or_url, cache_dir, **kwargs):
+    base_url = getattr(server_or_url, 'base_url', server_or_url)
+    return get_json('fixtures/', base_url=base_url, cache_dir=str(cache_dir), replay_dir=None, **kwargs)
+
+def test_retries_recover_from_server_errors(tmp_path):
+    with MockFPLServer(PAYLOADS, fail_first=2) as server:
+        data = _get(server, tmp_path, ttl=0, retries=2)
+    assert data == PAYLOADS['fixtures/']
+    assert len(server.requests) == 3
+
+def test_retries_give_up_with_a_cold_cache(tmp_path):
+    with MockFPLServer(PAYLOADS, fail_first=5) as server:
+        with pytest.raises(requests.HTTPError):
+            _get(server, tmp_path, ttl=0, retries=2)
+    assert len(server.requests) == 3
+
+def test_fresh_cache_skips_the_api(tmp_path):
+    with MockFPLServer(PAYLOADS) as server:
+        _get(server, tmp_path, ttl=0)
+        assert _get(server, tmp_path, ttl=3600) == PAYLOADS['fixtures/']
+    assert len(server.requests) == 1
+
+def test_stale_cache_is_revalidated_with_etag(tmp_path):
+    with MockFPLServer(PAYLOADS) as server:
+        _get(server, tmp_path, ttl=0)
+        _, meta_before = load_cached('fixtures/', str(tmp_path))
+        data = _get(server, tmp_path, ttl=0)
+    assert data == PAYLOADS['fixtures/']
+    assert [etag for _, etag in server.requests] == [None, '"mock"']
+    # a 304 keeps the payload and restarts the TTL
+    _, meta = load_cached('fixtures/', str(tmp_path))
+    assert meta['etag'] == '"mock"'
+    assert meta['fetched_at'] >= meta_before['fetched_at']
+
+def test_api_down_serves_the_cached_copy(tmp_path):
+    with MockFPLServer(PAYLOADS) as server:
+        _get(server, tmp_path, ttl=0)
+    assert _get(server.base_url, tmp_path, ttl=0, retries=1) == PAYLOADS['fixtures/']
+
+def test_api_error_serves_the_cached_copy(tmp_path):
+    with MockFPLServer(PAYLOADS) as server:
+        _get(server, tmp_path, ttl=0)
+    with MockFPLServer(PAYLOADS, fail_first=5) as server:
+        assert _get(server, tmp_path, ttl=0, retries=1) == PAYLOADS['fixtures/']
+
+def test_cold_cache_with_the_api_down_raises(tmp_path):
+    with MockFPLServer(PAYLOADS) as server:
+        base_url = server.base_url
+    with pytest.raises(requests.ConnectionError):
+        _get(base_url, tmp_path, ttl=0, retries=1)
+
+def test_replay_serves_recorded_payloads_pruned(tmp_path):
+    bootstrap = {'teams': [dict(team, short_name=team['name'][:3]) for team in PAYLOADS['bootstrap-static/']['teams']],
+                 'elements': [{'id': 1}]}
+    (tmp_path / 'bootstrap-static.json').write_text(json.dumps(bootstrap))
+    data = get_json('bootstrap-static/', base_url='http://127.0.0.1:9/', replay_dir=str(tmp_path))
+    assert data == PAYLOADS['bootstrap-static/']
+    with pytest.raises(FileNotFoundError):
+        get_json('fixtures/', base_url='http://127.0.0.1:9/', replay_dir=str(tmp_path))
@@ -0,0 +1,107 @@
+import io
+import asyncio
+import threading
+import contextlib
+
+import pytest
+import requests
+
+from benchmarks import bench_api
+from benchmarks.generators import make_season
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history
+from src.scoring import calculate_leaderboard_fast
+from src.schema import compact_frames
+from src.instrumentation import get_stage_metrics
+from src.api_server import build_api_index, serve, MAX_PAGE_SIZE
+
+# tests/test_api_server.py
+# src/api_server.py on a free local port: ETags and 304s, leaderboard pages, and no
+# rescoring however many requests come in.
+
+N_USERS = 120
+
+@pytest.fixture(scope='module')
+def api():
+    bootstrap, fixtures, df_predictions = make_season(6, n_users=N_USERS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+        df_league = get_league_history(df_fixtures, df_teams)
+        _, df_leaderboard, df_merged = compact_frames(df_league, *calculate_leaderboard_fast(df_league, df_predictions))
+    index = build_api_index(df_leaderboard, df_merged, version='test')
+
+    ready = threading.Event()
+    port = {}
+
+    def on_started(bound_port):
+        port['value'] = bound_port
+        ready.set()
+
+    threading.Thread(target=lambda: asyncio.run(serve(index, port=0, on_started=on_started)), daemon=True).start()
+    assert ready.wait(30)
+    return f"http://127.0.0.1:{port['value']}", index
+
+def _scoring_runs():
+    runs = get_stage_metrics().set_index('stage')['runs']
+    return runs.get('calculate_leaderboard_fast', 0), runs.get('calculate_leaderboard', 0)
+
+def test_etag_and_304(api):
+    url, _ = api
+    response = requests.get(f"{url}/leaderboard")
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('"')
+
+    again = requests.get(f"{url}/leaderboard", headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['ETag'] == etag
+
+    other = requests.get(f"{url}/leaderboard/1", headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+    assert requests.get(f"{url}/leaderboard/99").status_code == 404
+
+def test_leaderboard_pages(api):
+    url, _ = api
+    full = requests.get(f"{url}/leaderboard/3").json()
+    assert len(full['leaderboard']) == N_USERS
+
+    rows = []
+    for offset in range(0, N_USERS, 50):
+        page = requests.get(f"{url}/leaderboard/3", params={'offset': offset, 'limit': 50}).json()
+        assert (page['total'], page['offset'], page['limit']) == (N_USERS, offset, 50)
+        assert page['gameweek'] == 3 and page['cards'] == full['cards']
+        rows += page['leaderboard']
+    assert rows == full['leaderboard']
+
+    past_end = requests.get(f"{url}/leaderboard/3", params={'offset': N_USERS, 'limit': 10}).json()
+    assert past_end['leaderboard'] == []
+
+    response = requests.get(f"{url}/leaderboard/3", params={'limit': 10})
+    etag = response.headers['ETag']
+    assert etag != requests.get(f"{url}/leaderboard/3", params={'offset': 10, 'limit': 10}).headers['ETag']
+    assert requests.get(f"{url}/leaderboard/3", params={'limit': 10}, headers={'If-None-Match': etag}).status_code == 304
+
+    for params in [{'limit': 0}, {'limit': MAX_PAGE_SIZE + 1}, {'offset': -1}, {'offset': 'x'}]:
+        assert requests.get(f"{url}/leaderboard/3", params=params).status_code == 400
+    assert requests.get(f"{url}/team-errors", params={'limit': 5}).status_code == 400
+
+def test_requests_never_rescore(api):
+    url, index = api
+    before = _scoring_runs()
+    served = index['requests']
+    with requests.Session() as session:
+        for i in range(200):
+            gw = i % 6 + 1
+            for path in [f"/leaderboard/{gw}", f"/team-errors/{gw}", "/users/Player%20001/history"]:
+                assert session.get(url + path).status_code == 200
+    assert _scoring_runs() == before
+    assert index['requests'] - served == 600
+
+def test_load_test_reports_no_recompute():
+    results = bench_api.run(n_users=50, n_gw=4, n_clients=5, n_requests=20)
+    assert results['leaderboard_recomputed'] is False
+    assert results['full']['statuses'] == {200: 100}
+    assert set(results['conditional']['statuses']) <= {200, 304}
+    assert results['conditional']['statuses'].get(304, 0) > 0
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import make_season
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history, calculate_leaderboard
+from src.incremental import refresh_processed_data
+from src.schema import compact_frames
+
+# tests/test_incremental.py
+# Replays a season one matchday at a time through the incremental pipeline and checks
+# every refresh against a full rebuild from the fixtures seen so far.
+
+SEASONS = [
+    dict(n_finished_gw=12),
+    dict(n_finished_gw=12, n_postponed=3),
+    dict(n_finished_gw=16, n_postponed=8, seed=4),
+]
+
+@pytest.mark.parametrize('season', SEASONS)
+def test_replay_matches_full_rebuild(season, tmp_path):
+    bootstrap, fixtures, df_predictions = make_season(n_users=20, **season)
+    df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+    state_path = str(tmp_path / 'state.pkl')
+
+    for day in sorted(df_fixtures.loc[df_fixtures['finished'] == True, 'kickoff_time'].unique()):
+        df_day = df_fixtures.copy()
+        df_day.loc[df_day['kickoff_time'] > day, 'finished'] = False
+
+        frames = refresh_processed_data(df_day, df_teams, df_predictions, state_path=state_path)
+        df_league = get_league_history(df_day, df_teams)
+        expected = compact_frames(df_league, *calculate_leaderboard(df_league, df_predictions))
+        for df, df_expected in zip(frames, expected):
+            pd.testing.assert_frame_equal(df.reset_index(drop=True), df_expected.reset_index(drop=True))
+
+def test_new_season_rebuilds(tmp_path):
+    # fixture ids restart at 1, so last season's state must not be carried over
+    state_path = str(tmp_path / 'state.pkl')
+    bootstrap, fixtures, df_predictions = make_season(30, n_users=20, seed=1)
+    df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+    refresh_processed_data(df_fixtures, df_teams, df_predictions, state_path=state_path)
+
+    bootstrap, fixtures, df_predictions = make_season(5, n_users=20, seed=2)
+    df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+    df_fixtures['kickoff_time'] = df_fixtures['kickoff_time'] + pd.DateOffset(years=1)
+    frames = refresh_processed_data(df_fixtures, df_teams, df_predictions, state_path=state_path)
+    df_league = get_league_history(df_fixtures, df_teams)
+    expected = compact_frames(df_league, *calculate_leaderboard(df_league, df_predictions))
+    for df, df_expected in zip(frames, expected):
+        pd.testing.assert_frame_equal(df.reset_index(drop=True), df_expected.reset_index(drop=True))
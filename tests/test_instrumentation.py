@@ -0,0 +1,63 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from src import instrumentation
+
+# tests/test_instrumentation.py
+# Peak memory per stage with PIPELINE_TRACE_MEMORY=1, nested and across threads.
+
+BIG = 20_000_000
+SMALL = 1_000_000
+
+@pytest.fixture(autouse=True)
+def trace_memory(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'TRACE_MEMORY', True)
+    yield
+    assert not tracemalloc.is_tracing()
+
+def _allocate(n_bytes):
+    data = bytearray(n_bytes)
+    del data
+
+def test_nested_stage_keeps_outer_peak():
+    with instrumentation.stage('outer') as outer:
+        _allocate(BIG)
+        with instrumentation.stage('inner') as inner:
+            _allocate(SMALL)
+    assert outer['peak_memory_bytes'] >= BIG
+    assert SMALL <= inner['peak_memory_bytes'] < BIG
+
+def test_inner_peak_counts_for_outer():
+    with instrumentation.stage('outer') as outer:
+        with instrumentation.stage('inner') as inner:
+            _allocate(BIG)
+        with instrumentation.stage('sibling') as sibling:
+            _allocate(SMALL)
+    assert inner['peak_memory_bytes'] >= BIG
+    assert sibling['peak_memory_bytes'] < BIG
+    assert outer['peak_memory_bytes'] >= BIG
+
+def test_stages_on_other_threads_keep_their_own_peaks():
+    # the worker's stage ends while a stage opened later on the main thread is still open
+    allocated, script_started = threading.Event(), threading.Event()
+    results = {}
+
+    def worker():
+        with instrumentation.stage('worker') as metrics:
+            _allocate(BIG)
+            allocated.set()
+            script_started.wait(10)
+        results['worker'] = metrics
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    allocated.wait(10)
+    with instrumentation.stage('script') as script:
+        script_started.set()
+        thread.join(10)
+        _allocate(SMALL)
+
+    assert results['worker']['peak_memory_bytes'] >= BIG
+    assert SMALL <= script['peak_memory_bytes'] < BIG
@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import make_season
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history, get_league_history_loop
+
+# tests/test_league_history.py
+# The vectorised get_league_history has to give exactly the frame the original loop gives:
+# same rows, values, dtypes and index, including postponed games and matches still in play.
+
+SEASONS = [
+    pytest.param({'n_finished_gw': 38}, id='full'),
+    pytest.param({'n_finished_gw': 12}, id='partial'),
+    pytest.param({'n_finished_gw': 20, 'n_postponed': 3}, id='postponed'),
+    pytest.param({'n_finished_gw': 20, 'n_in_play': 4}, id='in-play'),
+    pytest.param({'n_finished_gw': 30, 'n_postponed': 2, 'n_in_play': 3, 'seed': 7}, id='postponed-in-play'),
+]
+
+@pytest.mark.parametrize('season', SEASONS)
+def test_matches_loop(season):
+    bootstrap, fixtures, _ = make_season(**season)
+    df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+    pd.testing.assert_frame_equal(
+        get_league_history(df_fixtures, df_teams),
+        get_league_history_loop(df_fixtures, df_teams),
+    )
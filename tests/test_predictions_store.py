@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generators import make_bootstrap_payload, make_predictions
+from src.predictions_store import ingest_predictions
+
+# tests/test_predictions_store.py
+
+DF_TEAMS = pd.DataFrame(make_bootstrap_payload()['teams'])
+
+def _write(tmp_path, df):
+    path = tmp_path / 'predictions.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+def _picks(store, name):
+    return store['picks'][store['users'].get_loc(name)]
+
+@pytest.mark.parametrize('blank', [np.nan, '', '   '])
+@pytest.mark.parametrize('chunk_rows', [1_000, 7])
+def test_rows_without_a_name_are_left_out(tmp_path, capsys, blank, chunk_rows):
+    df = make_predictions(3).astype({'name': object})
+    # a stray row right after another player's entry, picking one of their teams
+    stray = pd.DataFrame({'name': [blank], 'team': [df['team'].iloc[59]], 'predicted_position': [1]})
+    df_csv = pd.concat([df.iloc[:60], stray, df.iloc[60:]], ignore_index=True)
+
+    clean = ingest_predictions(_write(tmp_path, df), DF_TEAMS, chunk_rows=chunk_rows)
+    capsys.readouterr()
+    store = ingest_predictions(_write(tmp_path, df_csv), DF_TEAMS, chunk_rows=chunk_rows)
+
+    assert list(store['users']) == list(clean['users'])
+    for name in clean['users']:
+        assert (_picks(store, name) == _picks(clean, name)).all()
+    assert "1 rows without a player name (lines 62)" in capsys.readouterr().out
+
+def test_rows_without_a_name_raise_when_strict(tmp_path):
+    df = make_predictions(2).astype({'name': object})
+    df.loc[5, 'name'] = np.nan
+    with pytest.raises(ValueError, match="without a player name"):
+        ingest_predictions(_write(tmp_path, df), DF_TEAMS, strict=True)
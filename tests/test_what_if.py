@@ -0,0 +1,31 @@
+import io
+import contextlib
+
+import pytest
+
+from benchmarks.generators import make_season
+from src.data_loader import payloads_to_frames
+from src.data_transform import get_league_history
+from src.scoring import calculate_leaderboard_fast
+from src.what_if import parse_rule_value, rules_grid, rescore_grid
+
+# tests/test_what_if.py
+
+@pytest.mark.parametrize('text, value', [('2', 2), ('0', 0), ('-1', -1), ('1.5', 1.5), ('0.5', 0.5), ('2.0', 2.0)])
+def test_parse_rule_value(text, value):
+    parsed = parse_rule_value(text)
+    assert parsed == value and type(parsed) is type(value)
+
+def test_fractional_rules_match_full_scoring():
+    bootstrap, fixtures, df_predictions = make_season(10, n_users=40)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_teams, df_fixtures = payloads_to_frames(bootstrap, fixtures)
+        df_league = get_league_history(df_fixtures, df_teams)
+        rule_sets = rules_grid(proximity_step=[parse_rule_value('1.5')], bold_error=[parse_rule_value('0.5')],
+                               bold_bonus=[parse_rule_value('2.5')])
+        _, df_ranks = rescore_grid(df_league, df_predictions, rule_sets)
+        df_leaderboard, _ = calculate_leaderboard_fast(df_league, df_predictions, return_merged=False, rules=rule_sets[0])
+
+    df_last = df_leaderboard[df_leaderboard['gameweek'] == df_leaderboard['gameweek'].max()].set_index('name')
+    totals = df_ranks.set_index('name')['total_score']
+    assert (totals.sort_index() == df_last['total_score'].sort_index().astype(float)).all()